@@ -0,0 +1,57 @@
+"""
+Command-line entry points.
+
+    python -m app.cli batch urls.txt [--no-persist] [--concurrency N] > results.ndjson
+    python -m app.cli worker [--concurrency N]
+"""
+from __future__ import annotations
+import argparse, asyncio, json, sys
+from app.models.db import init_db
+from app.scraper.utils import open_shared_client, close_shared_client
+from app.services.batch import run_batch
+from app.services.jobs import run_worker
+from app.services.writer import persist_writer
+
+async def _batch(args: argparse.Namespace) -> None:
+    with open(args.file, encoding="utf-8") if args.file != "-" else sys.stdin as fh:
+        urls = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+    await open_shared_client()
+    persist_writer.start()
+    try:
+        async for result in run_batch(urls, persist=args.persist, concurrency=args.concurrency):
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+            if "summary" in result:
+                print(f"{result['summary']['stores_per_minute']} stores/minute", file=sys.stderr)
+    finally:
+        await close_shared_client()
+        await asyncio.to_thread(persist_writer.stop)
+
+async def _worker(args: argparse.Namespace) -> None:
+    await open_shared_client()
+    persist_writer.start()
+    try:
+        await run_worker(concurrency=args.concurrency)
+    finally:
+        await close_shared_client()
+        await asyncio.to_thread(persist_writer.stop)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+    batch = sub.add_parser("batch", help="scrape many stores, one URL per line, results as NDJSON on stdout")
+    batch.add_argument("file", help="file with one store URL per line, or - for stdin")
+    batch.add_argument("--no-persist", dest="persist", action="store_false")
+    batch.add_argument("--concurrency", type=int, default=None, help="workers; at most Settings.batch_concurrency in app/config.py")
+    worker = sub.add_parser("worker", help="run due re-scrape jobs from the scrape_jobs queue")
+    worker.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.command == "batch":
+        asyncio.run(_batch(args))
+    elif args.command == "worker":
+        asyncio.run(_worker(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel
 
 DEFAULT_HEADERS = {
@@ -11,9 +11,114 @@ DEFAULT_HEADERS = {
 
 class Settings(BaseModel):
     request_timeout_seconds: float = 15.0
+    # End-to-end deadline for one store scrape, and per-stage budgets inside it (each
+    # also capped by what is left of the deadline). A stage that runs out keeps its
+    # partial result (the catalog pages fetched so far) and is named in scrape_meta.errors.
+    scrape_deadline_seconds: float = 45.0
+    stage_budget_seconds: Dict[str, float] = {
+        "sitemap": 8.0, "catalog": 35.0, "hero": 10.0, "policies": 15.0, "about": 10.0, "faqs": 15.0,
+    }
     max_redirects: int = 5
     verify_ssl: bool = True
     user_agent: str = DEFAULT_HEADERS["User-Agent"]
     sqlite_url: str = "sqlite:///brand_insights.db"
+    # Any SQLAlchemy URL (e.g. postgresql+psycopg://user:pw@host/db); overrides sqlite_url
+    database_url: Optional[str] = None
+    # Connection pools: general (request handlers) and write (writer thread, job queue)
+    db_pool_size: int = 8
+    db_write_pool_size: int = 2
+    db_max_overflow: int = 8
+    db_pool_timeout_seconds: float = 30.0
+    # SQLite connection pragmas
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"  # safe with WAL: only the last commits can be lost on power failure
+    sqlite_busy_timeout_ms: int = 30000
+    sqlite_mmap_bytes: int = 256 * 1024 * 1024
+    sqlite_cache_kib: int = 64 * 1024
+    # Max simultaneous in-flight requests (and so pooled connections) to a single store
+    per_host_concurrency: int = 6
+    # Per-host request governor, shared by every scrape in the process: a token bucket
+    # (halved on 429, regrown on success), Retry-After pauses, jittered retries of GETs
+    # on 429/502/503/504 and connection errors, and a circuit breaker that fails requests
+    # fast for breaker_cooldown_seconds after breaker_failures consecutive failures.
+    per_host_rate: float = 5.0  # requests/second
+    per_host_min_rate: float = 0.5
+    per_host_burst: int = 10
+    http_retries: int = 2
+    http_retry_base_seconds: float = 0.5
+    retry_after_max_seconds: float = 30.0  # longer Retry-After values are not waited out
+    breaker_failures: int = 5
+    breaker_cooldown_seconds: float = 60.0
+    host_state_limit: int = 10000
+    # Shared httpx connection pool (owned by the FastAPI app lifespan)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2: bool = False  # needs the optional `h2` package
+    # Conditional-request (ETag/Last-Modified) response cache for fetch_text/fetch_json
+    http_cache_enabled: bool = True
+    http_cache_max_bytes: int = 64 * 1024 * 1024
+    http_cache_path: Optional[str] = "http_cache.json"  # persisted across restarts; None keeps it in memory
+    # Seconds a cached response is served without revalidation, per URL class
+    http_cache_ttl_seconds: Dict[str, float] = {"catalog": 0.0, "policy": 3600.0, "page": 1800.0, "default": 0.0}
+    # Brand-level result cache in front of build_brand_context (stale-while-revalidate)
+    result_cache_fresh_seconds: float = 300.0
+    result_cache_stale_seconds: float = 3600.0
+    result_cache_max_entries: int = 1000
+    result_cache_max_bytes: int = 256 * 1024 * 1024  # by serialised size of the cached contexts
+    # Policy/about pages are streamed and converted to text until page_text_cap
+    # characters; bodies declared (or read) beyond max_page_bytes are abandoned
+    page_text_cap: int = 15000
+    max_page_bytes: int = 5 * 1024 * 1024
+    # Sitemap discovery: candidate pages are checked against /sitemap.xml first.
+    # Limits apply to child sitemaps read, URLs kept and bytes read per sitemap.
+    sitemap_enabled: bool = True
+    sitemap_max_files: int = 25
+    sitemap_max_urls: int = 50000
+    sitemap_max_bytes: int = 20 * 1024 * 1024
+    # make_soup backend: "bs4" (reference) or "lxml" (faster; needs the cssselect package)
+    parser_backend: str = "lxml"
+    # HTML extraction process pool: worker count (0 = always inline) and the
+    # document size from which parsing is offloaded instead of run on the event loop
+    parse_pool_workers: int = 2
+    parse_offload_min_bytes: int = 256 * 1024
+    # Rows per executemany batch when persisting
+    persist_chunk_size: int = 500
+    # Writer thread: queued scrapes waiting to persist, and scrapes committed per transaction
+    persist_queue_size: int = 256
+    persist_batch_size: int = 16
+    # Competitors: how many are scraped per request, the time budget for all of
+    # them, and how recent a persisted competitor must be to skip a live scrape
+    competitor_limit: int = 3
+    competitor_budget_seconds: float = 20.0
+    competitor_fresh_seconds: float = 24 * 3600
+    # Competitor discovery by catalog TF-IDF similarity (needs numpy and scipy).
+    # The matrix is rebuilt once this fraction of brands changed since the last build.
+    similarity_enabled: bool = True
+    similarity_min_score: float = 0.05
+    similarity_rebuild_fraction: float = 0.02
+    # Append-only variant price history (numpy column segments); None disables it.
+    # One process appends to a directory (the first to take its writer.lock; other
+    # workers only read); buffered rows are sealed at this size or age.
+    price_history_path: Optional[str] = "price_history"
+    price_history_segment_rows: int = 1_000_000
+    price_history_flush_seconds: float = 300.0
+    # Stores scraped at once by /fetch_insights/batch and `python -m app.cli batch`
+    batch_concurrency: int = 8
+    # Recurring re-scrape jobs (scrape_jobs table)
+    job_worker_in_app: bool = False  # also run a worker inside the API process
+    job_worker_concurrency: int = 4
+    job_poll_seconds: float = 5.0
+    job_lease_seconds: float = 600.0
+    job_default_interval_seconds: float = 3600.0
+    job_min_interval_seconds: float = 900.0
+    job_max_interval_seconds: float = 7 * 24 * 3600.0
+    job_retry_base_seconds: float = 60.0
+    job_max_backoff_seconds: float = 6 * 3600.0
+    job_max_attempts: int = 5
+    # /products.json pagination: "page" (page=N) or "since_id" (cursor on product id)
+    catalog_pagination: str = "page"
+    catalog_page_size: int = 250
+    catalog_max_pages: int = 100
 
 settings = Settings()
@@ -1,32 +1,69 @@
 from __future__ import annotations
+import asyncio, json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from app.models.schemas import FetchRequest, BrandContext
-from app.models.db import get_db, Base, engine
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.models.schemas import FetchRequest, BrandContext, BatchFetchRequest, JobRequest
+from app.models.db import get_db, get_write_db, init_db
 from sqlalchemy.orm import Session
 from app.services.competitor import find_competitors
 from pydantic import BaseModel
 from typing import List
-from app.services.insights_service import fetch_and_optionally_persist
+from app.services.insights_service import fetch_and_optionally_persist, product_changes
+from app.scraper.shopify_scraper import stream_products_catalog
+from app.scraper.utils import open_shared_client, close_shared_client
+from app.scraper.http_cache import http_cache
+from app.scraper.offload import shutdown_pool
+from app.services.writer import persist_writer
+from app.services.batch import run_batch
+from app.services import jobs, brands, price_history, similarity, search as search_service
+from app.config import settings
 from app.services.competitor import find_competitors
 
-app = FastAPI(title="Shopify Store Insights-Fetcher", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.http_cache_path:
+        http_cache.load(settings.http_cache_path)
+    # One pooled HTTP client for every scrape handled by this process
+    await open_shared_client()
+    persist_writer.start()
+    # build the competitor similarity index in the background; requests don't wait for it
+    warm = asyncio.ensure_future(asyncio.to_thread(similarity.ensure_loaded))
+    stop_worker = asyncio.Event()
+    worker = asyncio.ensure_future(jobs.run_worker(stop=stop_worker)) if settings.job_worker_in_app else None
+    try:
+        yield
+    finally:
+        if worker is not None:
+            stop_worker.set()
+            await worker
+        await asyncio.gather(warm, return_exceptions=True)
+        await close_shared_client()
+        # drain queued writes before exiting
+        await asyncio.to_thread(persist_writer.stop)
+        await asyncio.to_thread(shutdown_pool)
+        if settings.http_cache_path:
+            http_cache.save(settings.http_cache_path)
+
+app = FastAPI(title="Shopify Store Insights-Fetcher", version="1.0.0", lifespan=lifespan)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables, and add columns/indexes introduced since the database was created
+init_db()
 
 class FetchInsightsResponse(BaseModel):
     brand: BrandContext
     competitors: List[BrandContext] = []
 
 @app.post("/fetch_insights", response_model=BrandContext)
-async def fetch_insights(body: FetchRequest, db: Session = Depends(get_db)):
+async def fetch_insights(body: FetchRequest):
     try:
         # Connectivity error -> 401
         try:
             ctx = await fetch_and_optionally_persist(
                 body.website_url,
-                db if body.persist else None
+                persist=body.persist,
+                force_refresh=body.force_refresh,
+                wait_for_persist=body.wait_for_persist,
             )
         except ConnectionError as e:
             raise HTTPException(status_code=401, detail=str(e))
@@ -35,7 +72,7 @@ async def fetch_insights(body: FetchRequest, db: Session = Depends(get_db)):
         competitors = []
         if body.with_competitors:
             try:
-                competitors = await find_competitors(body.website_url, db)
+                competitors = await find_competitors(body.website_url, brand=ctx, errors=ctx.scrape_meta.errors)
             except Exception as e:
                 ctx.scrape_meta.errors.append(f"Competitor analysis failed: {str(e)}")
 
@@ -44,3 +81,102 @@ async def fetch_insights(body: FetchRequest, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+
+@app.post("/fetch_insights/batch")
+async def fetch_insights_batch(body: BatchFetchRequest):
+    """Scrape many stores; one NDJSON line per store as it completes, then a summary line."""
+    async def ndjson():
+        async for result in run_batch(body.website_urls, persist=body.persist, concurrency=body.concurrency):
+            yield json.dumps(result) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/fetch_catalog")
+async def fetch_catalog(body: FetchRequest):
+    """Stream the full product catalog as NDJSON, one product per line, as pages arrive."""
+    async def ndjson():
+        async for product in stream_products_catalog(body.website_url):
+            yield product.model_dump_json() + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return http_cache.stats()
+
+@app.get("/writes/{job_id}")
+async def write_status(job_id: str):
+    job = persist_writer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown write job")
+    return job.describe()
+
+@app.post("/jobs")
+def schedule_job(body: JobRequest, db: Session = Depends(get_write_db)):
+    """Schedule (or reschedule) recurring re-scrapes of a store."""
+    job = jobs.enqueue(db, body.website_url, priority=body.priority, interval_seconds=body.interval_seconds)
+    return {"id": job.id, "website_url": job.website_url, "next_run_at": job.next_run_at, "interval_seconds": job.interval_seconds}
+
+# Handlers that query the database are plain `def`: FastAPI runs them in its
+# threadpool, so SQLAlchemy never blocks the event loop.
+@app.get("/jobs/metrics")
+def job_metrics(db: Session = Depends(get_db)):
+    return jobs.metrics(db)
+
+@app.get("/brands/{brand_id}/changes")
+def brand_changes(brand_id: int, since: float = 0.0, after_id: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+    """Product change feed (added/removed/changed) for incremental sync; page with next_after_id."""
+    return product_changes(db, brand_id, since=since, after_id=after_id, limit=max(1, min(limit, 5000)))
+
+@app.get("/brands")
+def list_brands(after_id: int = 0, limit: int = 50, db: Session = Depends(get_db)):
+    """Persisted brands, keyset-paginated: pass next_after_id back as after_id."""
+    return brands.list_brands(db, after_id=after_id, limit=max(1, min(limit, 500)))
+
+@app.get("/brands/{brand_id}/products")
+def list_brand_products(brand_id: int, after_id: int = 0, limit: int = 100, fields: str | None = None,
+                        db: Session = Depends(get_db)):
+    """A brand's persisted products; `fields=handle,title` projects columns."""
+    try:
+        return brands.list_products(
+            db, brand_id, after_id=after_id, limit=max(1, min(limit, 1000)),
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/search")
+def search(q: str, kinds: str | None = None, brand_id: int | None = None, limit: int = 20,
+           mode: str = "all", by: str = "hit", db: Session = Depends(get_db)):
+    """
+    Ranked full-text search over persisted products, FAQs and policies.
+    kinds=products,faqs,policies; mode=all|any|phrase; by=hit (snippets) or brand.
+    """
+    if not search_service.search_available(db):
+        raise HTTPException(status_code=501, detail="Full-text search needs SQLite with FTS5")
+    try:
+        return search_service.search(
+            db, q,
+            kinds=[k.strip() for k in kinds.split(",") if k.strip()] if kinds else tuple(search_service.SEARCH_KINDS),
+            brand_id=brand_id, limit=max(1, min(limit, 200)), mode=mode, by=by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/prices/changes")
+def price_changes(days: float = 7.0, brand_id: int | None = None, limit: int = 1000, db: Session = Depends(get_db)):
+    """Variant price changes across all brands (or one) in the last `days`, newest first."""
+    if not price_history.price_history_available():
+        raise HTTPException(status_code=501, detail="Price history is disabled or numpy is not installed")
+    result = price_history.recent_changes(days, brand_id, max(1, min(limit, 10000)))
+    websites = brands.brand_websites(db, {c["brand_id"] for c in result["changes"]})
+    for change in result["changes"]:
+        change["website"] = websites.get(change["brand_id"])
+    return result
+
+# Registered last: the path converter would otherwise swallow /brands/{id}/...
+@app.get("/brands/{website:path}", response_model=BrandContext)
+def get_brand(website: str, db: Session = Depends(get_db)):
+    """A persisted brand as a BrandContext, served from the database without scraping."""
+    brand = brands.get_brand(db, website)
+    if brand is None:
+        raise HTTPException(status_code=404, detail="Brand not persisted")
+    return brands.brand_to_context(brand)
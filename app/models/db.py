@@ -1,9 +1,56 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
-engine = create_engine(settings.sqlite_url, echo=False, future=True)
+def _sqlite_pragmas(dbapi_conn, _record) -> None:
+    # Let SQLAlchemy (the "begin" hook below) issue BEGIN instead of pysqlite,
+    # which otherwise defers it and breaks SAVEPOINT handling
+    dbapi_conn.isolation_level = None
+    cursor = dbapi_conn.cursor()
+    if settings.sqlite_wal:
+        # readers no longer block behind the writer (persistent, per database file)
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_bytes)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_kib)}")  # negative = KiB
+    cursor.close()
+
+def make_engine(url: str | None = None, write: bool = False) -> Engine:
+    """
+    Engine for `url` (default: database_url, else sqlite_url). SQLite gets WAL and
+    the pragmas above on every connection. Write engines start transactions with
+    BEGIN IMMEDIATE, taking the write lock up front (waiting up to busy_timeout)
+    rather than failing with "database is locked" when a read turns into a write.
+    Other databases just get a sized, pre-pinged pool.
+    """
+    url = make_url(url or settings.database_url or settings.sqlite_url)
+    pool_size = settings.db_write_pool_size if write else settings.db_pool_size
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url, echo=False, future=True, pool_pre_ping=True, pool_size=pool_size,
+            max_overflow=settings.db_max_overflow, pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    kwargs = {}
+    if url.database and url.database != ":memory:":
+        kwargs = dict(pool_size=pool_size, max_overflow=settings.db_max_overflow, pool_timeout=settings.db_pool_timeout_seconds)
+    bind = create_engine(
+        url, echo=False, future=True,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        **kwargs,
+    )
+    event.listen(bind, "connect", _sqlite_pragmas)
+    begin = "BEGIN IMMEDIATE" if write else "BEGIN"
+    event.listen(bind, "begin", lambda conn: conn.exec_driver_sql(begin))
+    return bind
+
+engine = make_engine()
+# Persistence (writer thread, job queue) goes through its own small pool; on
+# databases other than SQLite the two pools behave the same
+write_engine = make_engine(write=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine, future=True)
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +60,49 @@ def get_db():
     finally:
         db.close()
 
+def get_write_db():
+    """Like get_db, for endpoints that write."""
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def init_db(bind=write_engine) -> None:
+    """
+    Create missing tables, then add columns and indexes that were declared on
+    models after their table was first created (create_all never alters an
+    existing table). Only additive changes are made, except that duplicates are
+    removed before a new unique index is built. On SQLite this also sets up the
+    FTS5 search indexes.
 
+    Everything runs in one transaction on the write engine: with BEGIN IMMEDIATE,
+    worker processes starting together queue for the write lock (busy_timeout)
+    and each finds the schema the first one created, instead of failing with
+    "database is locked" when a read snapshot tries to become a write.
+    """
+    import app.models.models  # noqa: F401  register every table on Base.metadata
+    with bind.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = column.type.compile(dialect=bind.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}')
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                if index.unique and "id" in table.c:
+                    # rows that would violate a new unique key: keep the oldest
+                    cols = ", ".join(c.name for c in index.columns)
+                    conn.exec_driver_sql(
+                        f"DELETE FROM {table.name} WHERE id NOT IN (SELECT min(id) FROM {table.name} GROUP BY {cols})"
+                    )
+                index.create(conn, checkfirst=True)
+        if bind.dialect.name == "sqlite":
+            from app.models.fts import create_fts
+            create_fts(conn)
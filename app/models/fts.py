@@ -0,0 +1,73 @@
+from __future__ import annotations
+import logging
+from typing import Dict, Tuple
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# FTS5 index name -> (content table, indexed columns, bm25 column weights). The
+# indexes are external-content: they store no copy of the text, only the
+# inverted index, and triggers on the content table keep them in step with
+# every write. The weights are stored as the index's default rank function so
+# ORDER BY rank can use FTS5's top-N optimisation.
+FTS_TABLES: Dict[str, Tuple[str, Tuple[str, ...], Tuple[float, ...]]] = {
+    "products_fts": ("products", ("title", "vendor", "product_type", "tags"), (10.0, 2.0, 3.0, 5.0)),
+    "faqs_fts": ("faqs", ("question", "answer"), (3.0, 1.0)),
+    "policies_fts": ("policies", ("content",), (1.0,)),
+}
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# Indexed as well (weight 0, so it never affects rank), so that a brand-scoped
+# search is one MATCH: `brand_id : "7" AND (...)` intersects the brand's doclist
+# with the query's instead of ranking every match in the corpus
+FILTER_COLUMN = "brand_id"
+
+def _ddl(name: str, table: str, columns: Tuple[str, ...], weights: Tuple[float, ...]) -> list[str]:
+    columns, weights = columns + (FILTER_COLUMN,), weights + (0.0,)
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {name} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='{TOKENIZER}')",
+        f"INSERT INTO {name}({name}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})')",
+        f"CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {name}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        # only when an indexed column changes, so hash/timestamp refreshes cost nothing
+        f"CREATE TRIGGER {name}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+        # index rows written before the search index existed
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+    ]
+
+def create_fts(conn: Connection) -> bool:
+    """
+    Create missing FTS5 indexes and their triggers (SQLite only). Returns False
+    when this SQLite build has no FTS5, in which case search is unavailable.
+    Each index is built in a savepoint, so a failure part-way leaves no table
+    without its triggers (which a later start would take for a complete index).
+    Indexes from before FILTER_COLUMN was indexed are rebuilt.
+    """
+    existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for name, (table, columns, weights) in FTS_TABLES.items():
+        outdated = False
+        if name in existing:
+            indexed = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({name})")}
+            if FILTER_COLUMN in indexed:
+                continue
+            outdated = True
+        try:
+            with conn.begin_nested():
+                if outdated:
+                    for suffix in ("ai", "ad", "au"):
+                        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}_{suffix}")
+                    conn.exec_driver_sql(f"DROP TABLE {name}")
+                for statement in _ddl(name, table, columns, weights):
+                    conn.exec_driver_sql(statement)
+        except Exception as e:  # sqlite3.OperationalError: no such module: fts5
+            logger.warning("Full-text search disabled: %s", e)
+            return False
+    return True
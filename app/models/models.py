@@ -1,5 +1,5 @@
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy import Integer, String, Text, ForeignKey
+from sqlalchemy import Integer, String, Text, ForeignKey, Float, Index
 from app.models.db import Base
 
 class Brand(Base):
@@ -7,6 +7,8 @@ class Brand(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     website: Mapped[str | None] = mapped_column(String(512), nullable=True, unique=True)
+    # unix epoch seconds of the last persisted scrape
+    scraped_at: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     products = relationship("Product", back_populates="brand", cascade="all, delete-orphan")
     faqs = relationship("FAQ", back_populates="brand", cascade="all, delete-orphan")
@@ -19,8 +21,8 @@ class Brand(Base):
 class Product(Base):
     __tablename__ = "products"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
-    handle: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
+    handle: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
     title: Mapped[str | None] = mapped_column(String(512), nullable=True)
     vendor: Mapped[str | None] = mapped_column(String(255), nullable=True)
     product_type: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -28,13 +30,30 @@ class Product(Base):
     price_range: Mapped[str | None] = mapped_column(Text, nullable=True)
     images_json: Mapped[str | None] = mapped_column(Text, nullable=True)
     url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # sha1 of the stored fields, and the store's own updated_at, for change detection
+    content_hash: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    updated_at: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     brand = relationship("Brand", back_populates="products")
 
+class ProductChange(Base):
+    """Change feed: one row per product added, removed or changed by a re-scrape."""
+    __tablename__ = "product_changes"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
+    # not a foreign key: removed products no longer exist
+    product_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    handle: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    change: Mapped[str] = mapped_column(String(16))  # added/removed/changed
+    fields: Mapped[str | None] = mapped_column(Text, nullable=True)  # comma-separated, for "changed"
+    content_hash: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    # unix epoch seconds
+    changed_at: Mapped[float] = mapped_column(Float, index=True)
+
 class FAQ(Base):
     __tablename__ = "faqs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     question: Mapped[str] = mapped_column(Text)
     answer: Mapped[str] = mapped_column(Text)
     url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
@@ -44,7 +63,7 @@ class FAQ(Base):
 class Policy(Base):
     __tablename__ = "policies"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     kind: Mapped[str | None] = mapped_column(String(64), nullable=True) 
     url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -54,7 +73,7 @@ class Policy(Base):
 class Social(Base):
     __tablename__ = "socials"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     platform: Mapped[str] = mapped_column(String(64))
     url: Mapped[str] = mapped_column(String(1024))
 
@@ -63,7 +82,7 @@ class Social(Base):
 class Contact(Base):
     __tablename__ = "contacts"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     kind: Mapped[str] = mapped_column(String(32)) # email/phone/address
     value: Mapped[str] = mapped_column(String(1024))
 
@@ -72,7 +91,7 @@ class Contact(Base):
 class Link(Base):
     __tablename__ = "links"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     label: Mapped[str | None] = mapped_column(String(255), nullable=True)
     url: Mapped[str] = mapped_column(String(1024))
 
@@ -81,7 +100,7 @@ class Link(Base):
 class About(Base):
     __tablename__ = "about"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"))
+    brand_id: Mapped[int] = mapped_column(ForeignKey("brands.id"), index=True)
     url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
 
@@ -97,9 +116,30 @@ class About(Base):
 
 class Competitor(Base):
     __tablename__ = "competitors"
-    __table_args__ = {'extend_existing': True}  # Allow redefinition of the table
+    __table_args__ = (
+        # one edge per pair; also serves lookups by website_url (leftmost column)
+        Index("ux_competitors_pair", "website_url", "competitor_website", unique=True),
+        {'extend_existing': True},  # Allow redefinition of the table
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     website_url: Mapped[str] = mapped_column(String(512), nullable=False)  # The brand's website
     competitor_website: Mapped[str] = mapped_column(String(512), nullable=False)  # Competitor's website
 
-    brand = relationship("Brand", primaryjoin="Brand.website==Competitor.website_url", foreign_keys=[website_url])
\ No newline at end of file
+    brand = relationship("Brand", primaryjoin="Brand.website==Competitor.website_url", foreign_keys=[website_url])
+
+class ScrapeJob(Base):
+    """Recurring re-scrape of one store; claimed by workers through a time-limited lease."""
+    __tablename__ = "scrape_jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    website_url: Mapped[str] = mapped_column(String(512), unique=True, nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    # times are unix epoch seconds
+    next_run_at: Mapped[float] = mapped_column(Float, index=True)
+    interval_seconds: Mapped[float] = mapped_column(Float)
+    lease_owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    runs: Mapped[int] = mapped_column(Integer, default=0)
+    last_run_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    last_changed_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
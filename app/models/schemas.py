@@ -2,6 +2,14 @@ from __future__ import annotations
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
+class Variant(BaseModel):
+    id: Optional[int] = None
+    title: Optional[str] = None
+    sku: Optional[str] = None
+    price: Optional[float] = None
+    compare_at_price: Optional[float] = None
+    available: Optional[bool] = None
+
 class Product(BaseModel):
     id: Optional[int] = None
     handle: Optional[str] = None
@@ -10,8 +18,10 @@ class Product(BaseModel):
     product_type: Optional[str] = None
     tags: Optional[List[str]] = None
     price_range: Optional[Dict[str, Any]] = None
+    variants: Optional[List[Variant]] = None
     images: Optional[List[str]] = None
     url: Optional[str] = None
+    updated_at: Optional[str] = None
 
 class Policy(BaseModel):
     url: Optional[str] = None
@@ -54,7 +64,18 @@ class Policies(BaseModel):
 class ScrapeMeta(BaseModel):
     requested_at: str
     success: bool
+    scraped_at: Optional[float] = None  # unix time the scrape started; cached results keep it
     errors: List[str] = Field(default_factory=list)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    catalog_pages: int = 0
+    # False when the catalog may be missing products (stage cut, page cap, failed page,
+    # sitemap / collection fallback); persistence then removes nothing
+    catalog_complete: bool = True
+    cut_stages: List[str] = Field(default_factory=list)  # stages that ran out of time
+    result_cache: Optional[str] = None  # fresh / stale / miss
+    persist_stats: Optional[Dict[str, Any]] = None  # inserted/updated/deleted/unchanged/seconds
+    persist_job_id: Optional[str] = None  # poll GET /writes/{id} when not waiting for persistence
 
 class BrandContext(BaseModel):
     brand_name: Optional[str] = None
@@ -73,5 +94,15 @@ class FetchRequest(BaseModel):
     website_url: str
     persist: bool = True
     with_competitors: bool = False
+    force_refresh: bool = False
+    wait_for_persist: bool = True
 
+class BatchFetchRequest(BaseModel):
+    website_urls: List[str]
+    persist: bool = True
+    concurrency: Optional[int] = Field(None, ge=1)  # capped at settings.batch_concurrency
 
+class JobRequest(BaseModel):
+    website_url: str
+    priority: int = 0
+    interval_seconds: Optional[float] = None
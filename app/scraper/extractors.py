@@ -0,0 +1,295 @@
+from __future__ import annotations
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from lxml import etree
+from app.models.schemas import FAQ
+from app.scraper.parsers import SKIP_TEXT_TAGS
+
+PRODUCT_LINK_RE = re.compile(r"/products/([a-zA-Z0-9\-\._]+)")
+
+class HomepageExtract:
+    """Everything the scraper needs from a homepage, gathered in one parse."""
+    __slots__ = ("title", "product_cards", "footer_links", "footer_urls", "links", "text")
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.product_cards: List[Tuple[str, Optional[str], Optional[str]]] = []  # (handle, title, image)
+        self.footer_links: Dict[str, str] = {}  # lowercased label -> absolute url
+        self.footer_urls: List[str] = []
+        self.links: List[str] = []  # every a[href], absolute, document order
+        self.text: str = ""
+
+class _Anchor:
+    __slots__ = ("href", "title", "parts", "img", "in_footer")
+
+    def __init__(self, href: Optional[str], title: Optional[str], in_footer: bool):
+        self.href = href
+        self.title = title
+        self.parts: List[str] = []
+        self.img: Optional[str] = None
+        self.in_footer = in_footer
+
+class _HomepageTarget:
+    """lxml parser target: SAX-style callbacks, no tree is ever built."""
+
+    def __init__(self, base: str, max_cards: int):
+        self.base = base
+        self.max_cards = max_cards
+        self.out = HomepageExtract()
+        self.skip = 0
+        self.footer = 0
+        self.in_title = False
+        self.title_parts: List[str] = []
+        self.anchors: List[_Anchor] = []
+        self.product_anchors = 0
+        self.seen_handles: set = set()
+        self.text_parts: List[str] = []
+        self.buf: List[str] = []
+
+    def _flush(self) -> None:
+        # lxml delivers one text node in several chunks; tags and comments end a node
+        if not self.buf:
+            return
+        s = "".join(self.buf)
+        self.buf = []
+        if self.skip:
+            return
+        if self.in_title:
+            self.title_parts.append(s)
+        for a in self.anchors:
+            a.parts.append(s)
+        s = s.strip()
+        if s:
+            self.text_parts.append(s)
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        if tag in SKIP_TEXT_TAGS:
+            self.skip += 1
+        elif tag == "title" and self.out.title is None:
+            self.in_title = True
+        elif tag == "footer":
+            self.footer += 1
+        elif tag == "a":
+            self.anchors.append(_Anchor(attrib.get("href"), attrib.get("title"), self.footer > 0))
+        elif tag == "img" and self.anchors:
+            a = self.anchors[-1]
+            if a.img is None:
+                a.img = attrib.get("src")
+
+    def end(self, tag) -> None:
+        self._flush()
+        if tag in SKIP_TEXT_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag == "title" and self.in_title:
+            self.in_title = False
+            self.out.title = "".join(self.title_parts).strip()
+        elif tag == "footer":
+            self.footer = max(0, self.footer - 1)
+        elif tag == "a" and self.anchors:
+            self._anchor(self.anchors.pop())
+
+    def _anchor(self, a: _Anchor) -> None:
+        if a.href is None:
+            return
+        url = urljoin(self.base, a.href)
+        self.out.links.append(url)
+        if a.in_footer:
+            self.out.footer_links["".join(a.parts).strip().lower()] = url
+            self.out.footer_urls.append(url)
+        if "/products/" in a.href:
+            self.product_anchors += 1
+            if self.product_anchors > self.max_cards:
+                return
+            m = PRODUCT_LINK_RE.search(a.href)
+            if m and m.group(1) not in self.seen_handles:
+                self.seen_handles.add(m.group(1))
+                title = (a.title or "".join(a.parts) or "").strip() or None
+                self.out.product_cards.append((m.group(1), title, a.img))
+
+    def data(self, data) -> None:
+        self.buf.append(data)
+
+    def comment(self, text) -> None:
+        self._flush()
+
+    def close(self) -> HomepageExtract:
+        self._flush()
+        self.out.text = " ".join(self.text_parts)
+        return self.out
+
+def extract_homepage(html: str, base: str, max_cards: int = 50) -> HomepageExtract:
+    """
+    Single streaming pass over the homepage collecting the title, product cards
+    (first `max_cards` product links), footer links, all links and the visible
+    text used for email/phone matching.
+    """
+    target = _HomepageTarget(base, max_cards)
+    parser = etree.HTMLParser(target=target)
+    try:
+        parser.feed(html)
+        return parser.close()
+    except etree.Error:
+        return target.close()
+
+# The functions below take raw page text and return small picklable results so
+# they can run either inline or in the parse process pool (app/scraper/offload.py).
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+FAQ_LIMIT = 100
+ANSWER_CAP = 1000
+
+class _FaqTarget:
+    """
+    lxml parser target extracting FAQs in one ordered pass:
+
+    - headings: text that follows a heading inside the heading's parent, up to
+      the next heading, is that heading's answer
+    - dl: each dt is answered by the next dd sibling
+    - details: the summary is the question, the rest of the block the answer
+
+    Duplicates are dropped as they are found and extraction stops at `limit`.
+    """
+
+    def __init__(self, url: str, limit: int):
+        self.url = url
+        self.limit = limit
+        self.faqs: List[FAQ] = []
+        self.seen: set = set()
+        self.done = False
+        self.depth = 0
+        self.skip = 0
+        self.buf: List[str] = []
+        self.heading: Optional[List[str]] = None
+        self.heading_depth = 0
+        self.section: Optional[list] = None  # [question, parts, parent_depth, length]
+        self.dts: List[str] = []
+        self.dt_parent = -1
+        self.dt_parts: Optional[List[str]] = None
+        self.dd_parts: Optional[List[str]] = None
+        self.details: List[dict] = []
+
+    def _emit(self, q: str, a: str) -> None:
+        if self.done or not q or not a:
+            return
+        key = hash((q[:200].lower(), a[:200].lower()))
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        self.faqs.append(FAQ(question=q, answer=a, url=self.url))
+        if len(self.faqs) >= self.limit:
+            self.done = True
+
+    def _close_section(self) -> None:
+        if self.section is not None:
+            q, parts, _, _ = self.section
+            self.section = None
+            a = " ".join(parts).strip()
+            if len(q) < 220:
+                self._emit(q, a[:ANSWER_CAP])
+
+    def _flush(self) -> None:
+        if not self.buf:
+            return
+        s = "".join(self.buf).strip()
+        self.buf = []
+        if not s or self.skip or self.done:
+            return
+        if self.heading is not None:
+            self.heading.append(s)
+        elif self.section is not None and self.section[3] <= ANSWER_CAP:
+            self.section[1].append(s)
+            self.section[3] += len(s) + 1
+        if self.dt_parts is not None:
+            self.dt_parts.append(s)
+        if self.dd_parts is not None:
+            self.dd_parts.append(s)
+        for frame in self.details:
+            frame["parts"].append(s)
+            if frame["summary"] is not None:
+                frame["summary"].append(s)
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        self.depth += 1
+        if tag in SKIP_TEXT_TAGS:
+            self.skip += 1
+        elif tag in HEADING_TAGS and self.heading is None:
+            self._close_section()
+            self.heading = []
+            self.heading_depth = self.depth
+        elif tag == "dt":
+            if self.dt_parent != self.depth - 1:
+                self.dts = []
+                self.dt_parent = self.depth - 1
+            self.dt_parts = []
+        elif tag == "dd" and self.dts and self.dt_parent == self.depth - 1:
+            self.dd_parts = []
+        elif tag == "details":
+            self.details.append({"parts": [], "question": None, "summary": None, "summary_depth": 0})
+        elif tag == "summary" and self.details and self.details[-1]["question"] is None and self.details[-1]["summary"] is None:
+            self.details[-1]["summary"] = []
+            self.details[-1]["summary_depth"] = self.depth
+
+    def end(self, tag) -> None:
+        self._flush()
+        if tag in SKIP_TEXT_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in HEADING_TAGS and self.heading is not None and self.depth == self.heading_depth:
+            q = " ".join(self.heading)
+            self.heading = None
+            if q:
+                self.section = [q, [], self.depth - 1, 0]
+        elif tag == "dt" and self.dt_parts is not None:
+            q = " ".join(self.dt_parts)
+            self.dt_parts = None
+            if q:
+                self.dts.append(q)
+        elif tag == "dd" and self.dd_parts is not None:
+            a = " ".join(self.dd_parts)
+            self.dd_parts = None
+            for q in self.dts:
+                self._emit(q, a)
+            self.dts = []
+        elif tag == "summary" and self.details and self.details[-1]["summary"] is not None and self.depth == self.details[-1]["summary_depth"]:
+            frame = self.details[-1]
+            frame["question"] = " ".join(frame["summary"])
+            frame["summary"] = None
+        elif tag == "details" and self.details:
+            frame = self.details.pop()
+            q = frame["question"]
+            if q:
+                a = " ".join(frame["parts"]).replace(q, "", 1).strip()
+                self._emit(q, a[:ANSWER_CAP])
+        # the parent of the current heading (or dt run) is closing
+        if self.section is not None and self.depth == self.section[2]:
+            self._close_section()
+        if self.depth == self.dt_parent:
+            self.dts = []
+            self.dt_parent = -1
+        self.depth -= 1
+
+    def data(self, data) -> None:
+        self.buf.append(data)
+
+    def comment(self, text) -> None:
+        self._flush()
+
+    def close(self) -> List[FAQ]:
+        self._flush()
+        self._close_section()
+        return self.faqs
+
+def extract_faqs(html: str, url: str, limit: int = FAQ_LIMIT) -> List[FAQ]:
+    """Linear-time FAQ extraction; stops reading the page once `limit` unique FAQs are found."""
+    target = _FaqTarget(url, limit)
+    parser = etree.HTMLParser(target=target)
+    try:
+        for i in range(0, len(html), 64 * 1024):
+            parser.feed(html[i:i + 64 * 1024])
+            if target.done:
+                break
+        return parser.close()
+    except etree.Error:
+        return target.close()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import json, os, re, time
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+import httpx
+from app.config import settings
+
+# URL classes used to pick a TTL; the first matching pattern wins
+URL_CLASSES = [
+    ("catalog", re.compile(r"/products\.json|/collections/")),
+    ("policy", re.compile(r"/policies/")),
+    ("page", re.compile(r"/pages/|/apps/|/about")),
+]
+
+# Entries holding the extracted text of a streamed page rather than its body
+TEXT_KEY_PREFIX = "text:"
+
+def classify_url(url: str) -> str:
+    for name, pattern in URL_CLASSES:
+        if pattern.search(url):
+            return name
+    return "default"
+
+class CachedResponse:
+    __slots__ = ("status", "body", "etag", "last_modified", "stored_at")
+
+    def __init__(self, status: int, body: str, etag: str | None, last_modified: str | None, stored_at: float):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+class HttpCache:
+    """
+    Size-bounded LRU cache of GET responses with their validators.
+    Entries younger than the TTL of their URL class are served without a request;
+    older ones are revalidated with If-None-Match / If-Modified-Since.
+    """
+    def __init__(self, max_bytes: int, ttls: Dict[str, float]):
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+
+    def ttl_for(self, url: str) -> float:
+        url = url[len(TEXT_KEY_PREFIX):] if url.startswith(TEXT_KEY_PREFIX) else url
+        return self.ttls.get(classify_url(url), self.ttls.get("default", 0.0))
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    def is_fresh(self, url: str, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl_for(url)
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def touch(self, entry: CachedResponse) -> None:
+        """A 304 confirmed the entry; restart its TTL."""
+        entry.stored_at = time.time()
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if not (etag or last_modified or self.ttl_for(url) > 0):
+            return
+        self.put(url, response.status_code, response.text, etag, last_modified)
+
+    def put(self, key: str, status: int, body: str, etag: str | None, last_modified: str | None) -> None:
+        # A single response may use at most a tenth of the cache
+        if len(body) > self.max_bytes // 10:
+            return
+        self._put(key, CachedResponse(status, body, etag, last_modified, time.time()))
+
+    def _put(self, url: str, entry: CachedResponse) -> None:
+        old = self._entries.pop(url, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[url] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
+
+    def save(self, path: str) -> None:
+        data = {url: [e.status, e.body, e.etag, e.last_modified, e.stored_at] for url, e in self._entries.items()}
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+        for url, (status, body, etag, last_modified, stored_at) in data.items():
+            self._put(url, CachedResponse(status, body, etag, last_modified, stored_at))
+
+http_cache = HttpCache(settings.http_cache_max_bytes, settings.http_cache_ttl_seconds)
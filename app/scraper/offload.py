@@ -0,0 +1,49 @@
+from __future__ import annotations
+import asyncio, logging, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork a process that is running the event loop and writer thread
+        _pool = ProcessPoolExecutor(max_workers=settings.parse_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    # a worker died (OOM kill, crash in lxml): the executor is unusable for good,
+    # so drop it and let the next large page start a fresh one
+    global _pool
+    if _pool is pool:
+        _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+async def run_cpu(fn: Callable[..., Any], html: str, *args: Any) -> Any:
+    """
+    Run a CPU-bound extractor `fn(html, *args)`. Small documents run inline; documents
+    of at least Settings.parse_offload_min_bytes go to the process pool so a huge
+    theme page doesn't stall every other request on the event loop. If the pool
+    breaks, it is replaced and this document is extracted inline.
+    """
+    if settings.parse_pool_workers <= 0 or len(html) < settings.parse_offload_min_bytes:
+        return fn(html, *args)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, html, *args)
+    except BrokenProcessPool as e:
+        logger.warning("Parse pool broken (%s); restarting it and extracting inline", e)
+        _discard_pool(pool)
+        return fn(html, *args)
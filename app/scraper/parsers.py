@@ -0,0 +1,150 @@
+from __future__ import annotations
+import logging
+from typing import Any, Iterator, List, Optional
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+def _cssselect_available() -> bool:
+    try:
+        import cssselect  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class LxmlNode:
+    """
+    Thin BeautifulSoup-compatible wrapper over an lxml.html element, covering what
+    the /collections/all fallback uses: select, find, get, .name, .text and
+    get_text(separator, strip).
+    """
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    @property
+    def name(self) -> str:
+        return self.el.tag
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.el.get(key, default)
+
+    def select(self, selector: str) -> List["LxmlNode"]:
+        return [LxmlNode(e) for e in self.el.cssselect(selector)]
+
+    def find(self, name: str) -> Optional["LxmlNode"]:
+        for e in self.el.iterdescendants(name):
+            return LxmlNode(e)
+        return None
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        strings = _iter_strings(self.el)
+        if strip:
+            return separator.join(s for s in (t.strip() for t in strings) if s)
+        return separator.join(strings)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    def __repr__(self) -> str:
+        return f"<LxmlNode {self.el.tag}>"
+
+def _iter_strings(root) -> Iterator[str]:
+    """Text runs of `root` in document order, as BeautifulSoup's get_text sees them."""
+    if isinstance(root.tag, str) and root.tag in SKIP_TEXT_TAGS:
+        return
+    if root.text and isinstance(root.tag, str):
+        yield root.text
+    for child in root:
+        if isinstance(child.tag, str) and child.tag not in SKIP_TEXT_TAGS:
+            yield from _iter_strings(child)
+        if child.tail:
+            yield child.tail
+
+class HtmlTextStream:
+    """
+    Incremental HTML-to-text converter: feed() chunks as they arrive and stop once
+    `full` is set. The text matches get_text("\\n", strip=True)[:cap] of the page.
+    """
+
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.runs: List[str] = []
+        self.size = 0
+        self.full = False
+        self._skip = 0
+        self._buf: List[str] = []
+        self._parser = etree.HTMLParser(target=self)
+
+    # lxml target callbacks
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        s = "".join(self._buf).strip()
+        self._buf = []
+        if s and not self._skip and not self.full:
+            self.runs.append(s)
+            self.size += len(s) + 1
+            self.full = self.size > self.cap
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        if tag in SKIP_TEXT_TAGS:
+            self._skip += 1
+
+    def end(self, tag) -> None:
+        self._flush()
+        if tag in SKIP_TEXT_TAGS:
+            self._skip = max(0, self._skip - 1)
+
+    def data(self, data) -> None:
+        if not self.full:
+            self._buf.append(data)
+
+    def comment(self, text) -> None:
+        self._flush()
+
+    def close(self) -> str:
+        self._flush()
+        return "\n".join(self.runs)[:self.cap]
+
+    # feeding
+    def feed(self, chunk: str) -> None:
+        try:
+            self._parser.feed(chunk)
+        except etree.Error:
+            self.full = True
+
+    def finish(self) -> str:
+        try:
+            return self._parser.close()
+        except etree.Error:
+            return self.close()
+
+def _bs4_document(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "lxml")
+
+def _lxml_document(html: str) -> LxmlNode:
+    try:
+        return LxmlNode(lxml.html.document_fromstring(html))
+    except (etree.ParserError, ValueError):
+        # empty or unparseable document: behave like an empty page
+        return LxmlNode(lxml.html.document_fromstring("<html></html>"))
+
+BACKENDS = {
+    "bs4": _bs4_document,
+    "lxml": _lxml_document,
+}
+
+def get_backend(name: str):
+    if name == "lxml" and not _cssselect_available():
+        logger.warning("parser_backend=lxml needs the cssselect package; falling back to bs4")
+        name = "bs4"
+    return BACKENDS.get(name, _bs4_document)
@@ -1,50 +1,143 @@
 from __future__ import annotations
-import re, datetime
-from typing import List, Dict, Any, Optional, Tuple
+import asyncio, re, datetime, time
+from contextlib import aclosing
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from urllib.parse import urljoin, urlparse
 import httpx
 from bs4 import BeautifulSoup
+from app.config import settings
 from app.scraper.utils import (
-    normalize_base, fetch_text, fetch_json, make_soup, absolute,
+    normalize_base, fetch_text, fetch_json, make_soup, absolute, PageCache, borrow_client,
     EMAIL_RE, PHONE_RE, categorize_social, unique_preserve_order
 )
+from app.scraper.extractors import extract_homepage, extract_faqs, PRODUCT_LINK_RE, FAQ_LIMIT
+from app.scraper.sitemap import sitemap_products
 from app.models.schemas import (
-    Product, Policy, FAQ, SocialHandles, ContactDetails, About, ImportantLinks, Policies, BrandContext, ScrapeMeta
+    Product, Variant, Policy, FAQ, SocialHandles, ContactDetails, About, ImportantLinks, Policies, BrandContext, ScrapeMeta
 )
 
-PRODUCT_LINK_RE = re.compile(r"/products/([a-zA-Z0-9\-\._]+)")
 
-async def fetch_products_catalog(client: httpx.AsyncClient, base: str) -> List[Product]:
-    # Try /products.json (pagination optional)
-    products: List[Product] = []
-    url = urljoin(base, "/products.json?limit=250")
-    data, status = await fetch_json(client, url)
-    if data and isinstance(data, dict) and "products" in data:
-        for p in data["products"]:
-            handle = p.get("handle")
-            title = p.get("title")
-            vendor = p.get("vendor")
-            product_type = p.get("product_type")
-            tags = p.get("tags")
-            images = [img.get("src") for img in p.get("images", []) if img.get("src")]
-            prod = Product(
-                id=p.get("id"),
-                handle=handle,
-                title=title,
-                vendor=vendor,
-                product_type=product_type,
-                tags=tags if isinstance(tags, list) else (tags.split(",") if isinstance(tags, str) else None),
-                images=images,
-                url=urljoin(base, f"/products/{handle}") if handle else None
-            )
-            products.append(prod)
-        return products
+def _money(value: Any) -> Optional[float]:
+    # products.json prices are decimal strings ("19.99"); null/"" when unset
+    try:
+        return round(float(value), 2) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def _variants_from_json(p: Dict[str, Any]) -> Tuple[List[Variant], Optional[Dict[str, Any]]]:
+    variants = [
+        Variant(
+            id=v.get("id"),
+            title=v.get("title"),
+            sku=v.get("sku") or None,
+            price=_money(v.get("price")),
+            compare_at_price=_money(v.get("compare_at_price")),
+            available=v.get("available"),
+        )
+        for v in p.get("variants") or [] if isinstance(v, dict)
+    ]
+    prices = [v.price for v in variants if v.price is not None]
+    if not prices:
+        return variants, None
+    price_range: Dict[str, Any] = {"min": min(prices), "max": max(prices)}
+    compare = [v.compare_at_price for v in variants if v.compare_at_price is not None and v.price is not None and v.compare_at_price > v.price]
+    if compare:
+        price_range["compare_at_max"] = max(compare)
+    return variants, price_range
+
+def _product_from_json(base: str, p: Dict[str, Any]) -> Product:
+    handle = p.get("handle")
+    title = p.get("title")
+    vendor = p.get("vendor")
+    product_type = p.get("product_type")
+    tags = p.get("tags")
+    images = [img.get("src") for img in p.get("images", []) if img.get("src")]
+    variants, price_range = _variants_from_json(p)
+    return Product(
+        id=p.get("id"),
+        handle=handle,
+        title=title,
+        vendor=vendor,
+        product_type=product_type,
+        tags=tags if isinstance(tags, list) else (tags.split(",") if isinstance(tags, str) else None),
+        price_range=price_range,
+        images=images,
+        variants=variants or None,
+        url=urljoin(base, f"/products/{handle}") if handle else None,
+        updated_at=p.get("updated_at"),
+    )
+
+def _catalog_page_url(base: str, page: int, since_id: Any) -> str:
+    limit = settings.catalog_page_size
+    if settings.catalog_pagination == "since_id":
+        return urljoin(base, f"/products.json?limit={limit}&since_id={since_id or 0}")
+    return urljoin(base, f"/products.json?limit={limit}&page={page}")
+
+def _catalog_page_products(data: Any) -> List[Dict[str, Any]] | None:
+    if data and isinstance(data, dict) and isinstance(data.get("products"), list):
+        return data["products"]
+    return None
+
+async def iter_products_catalog(pages: PageCache, base: str, meta: ScrapeMeta | None = None) -> AsyncIterator[Product]:
+    """
+    Stream the whole catalog from paginated /products.json, one Product at a time.
+    The next page is requested while the current one is being converted, and only
+    one or two raw pages are held in memory. Catalog pages bypass the page cache
+    for the same reason. When the JSON is blocked, falls back to the handles in
+    the product sitemaps, then to /collections/all.
+    """
+    client = pages.client
+    page, since_id = 1, None
+    seen_ids: set = set()
+    pending = asyncio.ensure_future(fetch_json(client, _catalog_page_url(base, page, since_id)))
+    try:
+        while pending is not None:
+            data, status = await pending
+            pending = None
+            items = _catalog_page_products(data)
+            if items is None:
+                if meta is not None:
+                    meta.catalog_complete = False  # a failed page, or the JSON is blocked
+                if page == 1:
+                    async for product in _iter_fallback_products(pages, base):
+                        yield product
+                break
+            if meta is not None:
+                meta.catalog_pages += 1
+            new_ids = {p.get("id") for p in items} - seen_ids
+            # Stop on short/empty pages, the page cap, or stores that ignore the page parameter
+            has_more = bool(items) and bool(new_ids) and len(items) >= settings.catalog_page_size
+            if has_more and page < settings.catalog_max_pages:
+                page += 1
+                since_id = items[-1].get("id")
+                pending = asyncio.ensure_future(fetch_json(client, _catalog_page_url(base, page, since_id)))
+            elif has_more and meta is not None:
+                meta.errors.append(f"Catalog truncated at page cap ({settings.catalog_max_pages} pages)")
+                meta.catalog_complete = False
+            seen_ids |= new_ids
+            for p in items:
+                if p.get("id") in new_ids:
+                    yield _product_from_json(base, p)
+    finally:
+        if pending is not None:
+            pending.cancel()
 
+async def _iter_fallback_products(pages: PageCache, base: str) -> AsyncIterator[Product]:
+    # The sitemap lists every handle; /collections/all is usually one page of them
+    index = await pages.sitemap(base)
+    listed = await sitemap_products(pages.client, index) if index.found else []
+    if listed:
+        for handle, title, img_src in listed:
+            yield Product(handle=handle, title=title, images=[img_src] if img_src else None, url=urljoin(base, f"/products/{handle}"))
+        return
+    async for product in _iter_collection_products(pages, base):
+        yield product
+
+async def _iter_collection_products(pages: PageCache, base: str) -> AsyncIterator[Product]:
     # Fallback: parse /collections/all
-    html, _ = await fetch_text(client, urljoin(base, "/collections/all"))
-    if not html:
-        return products
-    soup = make_soup(html)
+    soup, _ = await pages.soup(urljoin(base, "/collections/all"))
+    if soup is None:
+        return
     links = soup.select("a[href*='/products/']")
     seen = set()
     for a in links:
@@ -61,57 +154,103 @@ async def fetch_products_catalog(client: httpx.AsyncClient, base: str) -> List[P
         title = (a.get("title") or a.text or "").strip() or None
         img = a.find("img")
         img_src = img.get("src") if img else None
-        prod = Product(handle=handle, title=title, images=[img_src] if img_src else None, url=urljoin(base, f"/products/{handle}"))
-        products.append(prod)
+        yield Product(handle=handle, title=title, images=[img_src] if img_src else None, url=urljoin(base, f"/products/{handle}"))
+
+async def fetch_products_catalog(
+    pages: PageCache, base: str, meta: ScrapeMeta | None = None, into: List[Product] | None = None
+) -> List[Product]:
+    """The whole catalog as a list. Products are appended to `into` as they arrive,
+    so a caller that cancels the fetch keeps what was read."""
+    products = into if into is not None else []
+    async with aclosing(iter_products_catalog(pages, base, meta)) as catalog:
+        async for product in catalog:
+            products.append(product)
     return products
 
-def _extract_product_from_card(a_tag) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    """Return handle, title, image"""
-    href = a_tag.get("href")
-    if not href:
-        return None, None, None
-    m = PRODUCT_LINK_RE.search(href)
-    if not m:
-        return None, None, None
-    handle = m.group(1)
-    title = (a_tag.get("title") or a_tag.text or "").strip() or None
-    img = a_tag.find("img")
-    img_src = img.get("src") if img else None
-    return handle, title, img_src
-
-async def fetch_hero_products(client: httpx.AsyncClient, base: str) -> List[Product]:
-    html, _ = await fetch_text(client, base + "/")
-    prods: List[Product] = []
-    if not html:
-        return prods
-    soup = make_soup(html)
+async def stream_products_catalog(website_url: str) -> AsyncIterator[Product]:
+    """Catalog-only scrape that yields products as pages arrive (used for NDJSON output)."""
+    base = normalize_base(website_url)
+    async with borrow_client() as client:
+        async for product in iter_products_catalog(PageCache(client), base):
+            yield product
+
+async def fetch_hero_products(pages: PageCache, base: str) -> List[Product]:
+    home, _ = await pages.extract(base + "/", extract_homepage, base)
+    if home is None:
+        return []
     # Common theme patterns: product cards or featured collections on homepage
-    cards = soup.select("a[href*='/products/']")
-    seen = set()
-    for a in cards[:50]:  # limit to top 50 links for homepage
-        handle, title, img_src = _extract_product_from_card(a)
-        if not handle or handle in seen:
-            continue
-        seen.add(handle)
-        prods.append(Product(handle=handle, title=title, images=[img_src] if img_src else None, url=urljoin(base, f"/products/{handle}")))
-    return prods
-
-async def discover_footer_links(client: httpx.AsyncClient, base: str) -> Dict[str, str]:
-    html, _ = await fetch_text(client, base + "/")
-    links: Dict[str, str] = {}
-    if not html:
-        return links
-    soup = make_soup(html)
-    for a in soup.select("footer a[href]"):
-        label = (a.text or "").strip().lower()
-        href = a.get("href")
-        if not href:
-            continue
-        url = urljoin(base, href)
-        links[label] = url
-    return links
+    return [
+        Product(handle=handle, title=title, images=[img_src] if img_src else None, url=urljoin(base, f"/products/{handle}"))
+        for handle, title, img_src in home.product_cards
+    ]
+
+async def discover_footer_links(pages: PageCache, base: str) -> Dict[str, str]:
+    home, _ = await pages.extract(base + "/", extract_homepage, base)
+    return dict(home.footer_links) if home is not None else {}
+
+async def _first_success(coros) -> Any:
+    """
+    Run candidate probes concurrently and return the result of the earliest
+    candidate (in priority order) that succeeds; outstanding probes are cancelled.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        for task in tasks:
+            result = await task
+            if result is not None:
+                return result
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _probe_page_text(pages: PageCache, url: str) -> Tuple[str, str] | None:
+    text, status = await pages.page_text(url, settings.page_text_cap)
+    if text is None or (status and status >= 400):
+        return None
+    if len(text) > 50:
+        return url, text
+    return None
+
+def _candidate_urls(pages: PageCache, base: str, candidates: List[str], keywords: List[str]) -> Tuple[List[str], asyncio.Future]:
+    """
+    Absolute, deduped candidate URLs in priority order, split into those to
+    probe now and a future of the rest. With the sitemap read, candidates it
+    rules out are dropped, listed pages matching `keywords` are added, and all
+    are probed now. While it is still being read only the first candidate (the
+    theme default) is probed at once; the rest follow once it is read, so the
+    probes neither wait for it nor spend the host's rate on pages it rules out.
+    """
+    urls = unique_preserve_order([urljoin(base, path) if path.startswith("/") else path for path in candidates])
+    index = pages.sitemap_if_ready(base)
+    if index is None:
+        return urls[:1], asyncio.ensure_future(_remaining_candidates(pages, base, urls, keywords))
+    rest = asyncio.get_running_loop().create_future()
+    rest.set_result([])
+    return (unique_preserve_order(index.candidates(urls, keywords)) if index.found else urls), rest
+
+async def _remaining_candidates(pages: PageCache, base: str, urls: List[str], keywords: List[str]) -> List[str]:
+    index = await pages.sitemap(base)
+    ranked = unique_preserve_order(index.candidates(urls, keywords)) if index.found else urls
+    return [url for url in ranked if url not in urls[:1]]
+
+async def _first_page_text(pages: PageCache, base: str, candidates: List[str], keywords: List[str]) -> Tuple[str, str] | None:
+    """(url, text) of the first candidate page with text, in priority order (see _candidate_urls)."""
+    urls, rest = _candidate_urls(pages, base, candidates, keywords)
+
+    async def probe_rest() -> Tuple[str, str] | None:
+        return await _first_success(_probe_page_text(pages, url) for url in await rest)
+
+    first = asyncio.ensure_future(_first_success(_probe_page_text(pages, url) for url in urls))
+    later = asyncio.ensure_future(probe_rest())
+    try:
+        found = await first
+        return found if found is not None else await later
+    finally:
+        for task in (first, later, rest):
+            task.cancel()
 
-async def fetch_policy_page(client: httpx.AsyncClient, base: str, kind: str, links_map: Dict[str, str]) -> Policy | None:
+async def fetch_policy_page(pages: PageCache, base: str, kind: str, links_map: Dict[str, str]) -> Policy | None:
     candidates = [
         f"/policies/{kind}-policy",
         f"/pages/{kind}-policy",
@@ -122,194 +261,201 @@ async def fetch_policy_page(client: httpx.AsyncClient, base: str, kind: str, lin
         if kind in label:
             candidates.append(url)
 
-    for path in candidates:
-        url = urljoin(base, path) if path.startswith("/") else path
-        html, status = await fetch_text(client, url)
-        if not html or (status and status >= 400):
-            continue
-        soup = make_soup(html)
-        text = soup.get_text("\n", strip=True)
-        if len(text) > 50:
-            return Policy(url=url, content=text[:15000])  # cap size
+    found = await _first_page_text(pages, base, candidates, [kind])
+    if found:
+        url, text = found
+        return Policy(url=url, content=text)
     return None
 
-async def fetch_about(client: httpx.AsyncClient, base: str, links_map: Dict[str, str]) -> About | None:
+async def fetch_about(pages: PageCache, base: str, links_map: Dict[str, str]) -> About | None:
     candidates = ["/pages/about-us", "/pages/about", "/about", "/about-us"]
     for label, url in links_map.items():
         if "about" in label:
             candidates.append(url)
-    for path in candidates:
-        url = urljoin(base, path) if path.startswith("/") else path
-        html, status = await fetch_text(client, url)
-        if not html or (status and status >= 400):
-            continue
-        soup = make_soup(html)
-        text = soup.get_text("\n", strip=True)
-        if len(text) > 50:
-            return About(url=url, content=text[:15000])
+    found = await _first_page_text(pages, base, candidates, ["about"])
+    if found:
+        url, text = found
+        return About(url=url, content=text)
     return None
 
-async def fetch_faqs(client: httpx.AsyncClient, base: str, links_map: Dict[str, str]) -> List[FAQ]:
+async def fetch_faqs(pages: PageCache, base: str, links_map: Dict[str, str]) -> List[FAQ]:
     faqs: List[FAQ] = []
     candidates = ["/pages/faq", "/pages/faqs", "/pages/help", "/pages/support", "/apps/help-center", "/policies/faq"]
     for label, url in links_map.items():
         if "faq" in label or "help" in label or "support" in label:
             candidates.append(url)
-    seen_pages = set()
-    for path in candidates:
-        url = urljoin(base, path) if path.startswith("/") else path
-        if url in seen_pages:
-            continue
-        seen_pages.add(url)
-        html, status = await fetch_text(client, url)
-        if not html or (status and status >= 400):
+    urls, rest = _candidate_urls(pages, base, candidates, ["faq", "help", "support"])
+
+    async def extract_rest() -> list:
+        return await asyncio.gather(*(pages.extract(url, extract_faqs, url) for url in await rest))
+
+    # Fetch every candidate page concurrently (see _candidate_urls for when),
+    # then extract in candidate order
+    try:
+        fixed, extra = await asyncio.gather(
+            asyncio.gather(*(pages.extract(url, extract_faqs, url) for url in urls)), extract_rest()
+        )
+    finally:
+        rest.cancel()
+    results = fixed + extra
+    # Each page is already deduped and capped; merge across pages the same way
+    seen = set()
+    for page_faqs, status in results:
+        if page_faqs is None or (status and status >= 400):
             continue
-        soup = make_soup(html)
-        # Pattern 1: dl/dt/dd pairs
-        for dt in soup.select("dt"):
-            q = dt.get_text(" ", strip=True)
-            dd = dt.find_next_sibling("dd")
-            a = dd.get_text(" ", strip=True) if dd else ""
-            if q and a:
-                faqs.append(FAQ(question=q, answer=a, url=url))
-        # Pattern 2: headings + next paragraph(s)
-        for h in soup.select("h1, h2, h3, h4, h5, h6"):
-            q = h.get_text(" ", strip=True)
-            # Gather following siblings until next heading
-            answer_parts = []
-            for sib in h.next_siblings:
-                if getattr(sib, "name", None) in ["h1","h2","h3","h4","h5","h6"]:
-                    break
-                text = getattr(sib, "get_text", lambda *a, **k: str(sib))(" ", strip=True)
-                if text:
-                    answer_parts.append(text)
-            a = " ".join(answer_parts).strip()
-            if q and len(a) > 0 and len(q) < 220:
-                faqs.append(FAQ(question=q, answer=a[:1000], url=url))
-        # Pattern 3: details/summary blocks
-        for det in soup.select("details"):
-            sum_el = det.find("summary")
-            if not sum_el:
+        for f in page_faqs:
+            key = hash((f.question[:200].lower(), f.answer[:200].lower()))
+            if key in seen:
                 continue
-            q = sum_el.get_text(" ", strip=True)
-            a = det.get_text(" ", strip=True).replace(q, "", 1).strip()
-            if q and a:
-                faqs.append(FAQ(question=q, answer=a[:1000], url=url))
-    # Deduplicate by (q, a) pair
-    uniq = []
-    seen = set()
-    for f in faqs:
-        key = (f.question[:200].lower(), f.answer[:200].lower())
-        if key not in seen:
             seen.add(key)
-            uniq.append(f)
-    return uniq[:100]
-
-async def extract_socials_contacts_and_links(client: httpx.AsyncClient, base: str):
-    html, _ = await fetch_text(client, base + "/")
-    footer_links = {}
-    emails = []
-    phones = []
-    others = []
+            faqs.append(f)
+            if len(faqs) >= FAQ_LIMIT:
+                return faqs
+    return faqs
 
-    if not html:
-        return footer_links, emails, phones, others
+async def extract_socials_contacts_and_links(pages: PageCache, base: str):
+    home, _ = await pages.extract(base + "/", extract_homepage, base)
+    if home is None:
+        return {}, [], [], []
 
-    soup = make_soup(html)
-
-    # Links in footer
-    for a in soup.select("footer a[href]"):
-        label = (a.text or "").strip()
-        href = a.get("href")
-        url = urljoin(base, href)
-        footer_links[label.lower()] = url
-        others.append(url)
-
-    # Any link on homepage can also count for "others"
-    for a in soup.select("a[href]"):
-        href = a.get("href")
-        url = urljoin(base, href)
-        if url.startswith(base):
-            others.append(url)
+    # Footer links, plus any same-origin link on the homepage, count for "others"
+    others = home.footer_urls + [url for url in home.links if url.startswith(base)]
 
     # Emails and phones
-    text = soup.get_text(" ", strip=True)
-    from app.scraper.utils import EMAIL_RE, PHONE_RE, unique_preserve_order
-    emails = unique_preserve_order(EMAIL_RE.findall(text))
-    phones = unique_preserve_order(PHONE_RE.findall(text))
+    emails = unique_preserve_order(EMAIL_RE.findall(home.text))
+    phones = unique_preserve_order(PHONE_RE.findall(home.text))
 
-    return footer_links, emails, phones, unique_preserve_order(others)
+    return dict(home.footer_links), emails, phones, unique_preserve_order(others)
 
 async def build_brand_context(website_url: str) -> BrandContext:
     base = normalize_base(website_url)
-    errors: List[str] = []
-    async with httpx.AsyncClient() as client:
-        # connectivity check
-        home_html, status = await fetch_text(client, base + "/")
-        if not home_html:
-            raise ConnectionError(f"Website not reachable or returned status {status}")
-
-        soup = make_soup(home_html)
-        title = soup.find("title").get_text(strip=True) if soup.find("title") else None
-
-        products = await fetch_products_catalog(client, base)
-        hero_products = await fetch_hero_products(client, base)
-
-        footer_links, emails, phones, other_links = await extract_socials_contacts_and_links(client, base)
-
-        # Policies
-        privacy = await fetch_policy_page(client, base, "privacy", footer_links)
-        ret = await fetch_policy_page(client, base, "refund", footer_links)
-        if not ret:
-            ret = await fetch_policy_page(client, base, "return", footer_links)
-
-        # About
-        about = await fetch_about(client, base, footer_links)
-
-        # FAQs
-        faqs = await fetch_faqs(client, base, footer_links)
-
-        # Socials from footer links
-        social_map = {}
-        from app.scraper.utils import categorize_social
-        for label, url in footer_links.items():
-            platform, link = categorize_social(url)
-            if platform:
-                social_map[platform] = link
-
-        important = {}
-        # Heuristics
-        for label, url in footer_links.items():
-            ll = label.lower()
-            if "track" in ll or ("order" in ll and "track" in ll):
-                important["order_tracking"] = url
-            if "contact" in ll:
-                important["contact_us"] = url
-            if "blog" in ll:
-                important["blogs"] = url
-
-        return BrandContext(
-            brand_name=title,
-            website=base,
-            product_catalog=products,
-            hero_products=hero_products,
-            policies=Policies(
-                privacy_policy=privacy,
-                return_policy=ret,
-            ),
-            faqs=faqs,
-            social_handles=SocialHandles(**social_map),
-            contact_details=ContactDetails(emails=emails, phones=phones),
-            about_us=about,
-            important_links=ImportantLinks(
-                order_tracking=important.get("order_tracking"),
-                contact_us=important.get("contact_us"),
-                blogs=important.get("blogs"),
-                others=other_links[:100],
-            ),
-            scrape_meta=ScrapeMeta(
-                requested_at=datetime.datetime.utcnow().isoformat() + "Z",
-                success=True,
-                errors=errors,
-            )
-        )
+    async with borrow_client() as client:
+        # Every fetch/parse below goes through the per-scrape page cache
+        pages = PageCache(client)
+        try:
+            return await _scrape_brand(pages, base)
+        finally:
+            # also stops fetches left behind by stages that ran out of time
+            pages.cancel_pending()
+
+class _Budget:
+    """The scrape deadline and per-stage budgets (settings.stage_budget_seconds)."""
+    def __init__(self, meta: ScrapeMeta):
+        self.meta = meta
+        self.deadline = time.monotonic() + settings.scrape_deadline_seconds
+
+    def remaining(self, stage: str | None = None) -> float:
+        left = max(0.0, self.deadline - time.monotonic())
+        return min(left, settings.stage_budget_seconds.get(stage, left)) if stage else left
+
+    def cut(self, stage: str, seconds: float) -> None:
+        if stage in self.meta.cut_stages:
+            return
+        self.meta.cut_stages.append(stage)
+        self.meta.errors.append(f"Stage {stage} cut after {seconds:.1f}s; its results are partial or missing")
+        if stage == "catalog":
+            self.meta.catalog_complete = False
+
+    async def run(self, stage: str, coro, default: Any = None) -> Any:
+        """Await `coro` within the stage's budget; on timeout return `default`."""
+        timeout = self.remaining(stage)
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            self.cut(stage, timeout)
+            return default
+
+async def _read_sitemap_stage(pages: PageCache, base: str, budget: _Budget) -> None:
+    # the first reader: PageCache.sitemap bounds discovery by this stage's budget,
+    # so readers waiting on it then get an empty index
+    timeout = budget.remaining("sitemap")
+    try:
+        await pages.sitemap(base, timeout)
+    except asyncio.TimeoutError:
+        budget.cut("sitemap", timeout)
+
+async def _scrape_brand(pages: PageCache, base: str) -> BrandContext:
+    meta = ScrapeMeta(
+        requested_at=datetime.datetime.utcnow().isoformat() + "Z",
+        success=True,
+        scraped_at=time.time(),
+    )
+    budget = _Budget(meta)
+
+    # connectivity check; the homepage is parsed once, in a single pass, while
+    # the sitemap is read. Nothing waits for the sitemap here: the page probes
+    # start on their first candidate and take the rest once it is read, and only
+    # the catalog fallback waits for it.
+    sitemap = asyncio.ensure_future(_read_sitemap_stage(pages, base, budget))
+    try:
+        home, status = await asyncio.wait_for(pages.extract(base + "/", extract_homepage, base), budget.remaining())
+    except asyncio.TimeoutError:
+        sitemap.cancel()
+        raise ConnectionError(f"Website homepage not loaded within {settings.scrape_deadline_seconds}s")
+    if home is None:
+        sitemap.cancel()
+        raise ConnectionError(f"Website not reachable or returned status {status}")
+
+    title = home.title
+
+    # Homepage is already cached, so links/contacts need no further round-trip
+    footer_links, emails, phones, other_links = await extract_socials_contacts_and_links(pages, base)
+
+    # Independent stages run concurrently, each within its budget; the per-host
+    # governor in utils bounds the load placed on the store. The catalog keeps
+    # the pages it fetched before running out of time.
+    products: List[Product] = []
+    products, hero_products, privacy, refund, ret, about, faqs = await asyncio.gather(
+        budget.run("catalog", fetch_products_catalog(pages, base, meta, into=products), products),
+        budget.run("hero", fetch_hero_products(pages, base), []),
+        budget.run("policies", fetch_policy_page(pages, base, "privacy", footer_links)),
+        budget.run("policies", fetch_policy_page(pages, base, "refund", footer_links)),
+        budget.run("policies", fetch_policy_page(pages, base, "return", footer_links)),
+        budget.run("about", fetch_about(pages, base, footer_links)),
+        budget.run("faqs", fetch_faqs(pages, base, footer_links), []),
+    )
+    await sitemap  # bounded by its own budget; usually long done
+    ret = refund or ret
+    meta.cache_hits = pages.hits
+    meta.cache_misses = pages.misses
+
+    # Socials from footer links
+    social_map = {}
+    from app.scraper.utils import categorize_social
+    for label, url in footer_links.items():
+        platform, link = categorize_social(url)
+        if platform:
+            social_map[platform] = link
+
+    important = {}
+    # Heuristics
+    for label, url in footer_links.items():
+        ll = label.lower()
+        if "track" in ll or ("order" in ll and "track" in ll):
+            important["order_tracking"] = url
+        if "contact" in ll:
+            important["contact_us"] = url
+        if "blog" in ll:
+            important["blogs"] = url
+
+    return BrandContext(
+        brand_name=title,
+        website=base,
+        product_catalog=products,
+        hero_products=hero_products,
+        policies=Policies(
+            privacy_policy=privacy,
+            return_policy=ret,
+        ),
+        faqs=faqs,
+        social_handles=SocialHandles(**social_map),
+        contact_details=ContactDetails(emails=emails, phones=phones),
+        about_us=about,
+        important_links=ImportantLinks(
+            order_tracking=important.get("order_tracking"),
+            contact_us=important.get("contact_us"),
+            blogs=important.get("blogs"),
+            others=other_links[:100],
+        ),
+        scrape_meta=meta,
+    )
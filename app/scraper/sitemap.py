@@ -0,0 +1,188 @@
+from __future__ import annotations
+import asyncio
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse
+import httpx
+from lxml import etree
+from app.config import settings
+from app.scraper.utils import governed_stream
+from app.scraper.extractors import PRODUCT_LINK_RE
+
+# Child sitemaps by kind, judged from their URL (Shopify: sitemap_products_1.xml?from=...)
+SITEMAP_KINDS = [
+    ("products", re.compile(r"product", re.I)),
+    ("collections", re.compile(r"collection|categor", re.I)),
+    ("blogs", re.compile(r"blog|post", re.I)),
+    ("pages", re.compile(r"page", re.I)),
+]
+
+def sitemap_kind(url: str) -> str:
+    path = urlparse(url).path
+    for kind, pattern in SITEMAP_KINDS:
+        if pattern.search(path):
+            return kind
+    return "other"
+
+def _path(url: str) -> str:
+    return urlparse(url).path.rstrip("/").lower() or "/"
+
+def _section(path: str) -> str:
+    # "/pages/faq" -> "pages"
+    return path.split("/", 2)[1] if path.count("/") >= 2 else ""
+
+class SitemapIndex:
+    """
+    URLs a store lists in its sitemaps. A section ("pages", "collections", ...)
+    counts as covered once one of its sitemaps was read completely; paths in a
+    covered section that are not listed can be assumed not to exist.
+    """
+
+    def __init__(self):
+        self.found = False
+        self.paths: Set[str] = set()
+        self.pages: List[str] = []
+        self.covered: Set[str] = set()
+        self.product_sitemaps: List[str] = []
+
+    def add(self, locs: List[str], complete: bool) -> None:
+        sections = set()
+        for loc in locs:
+            path = _path(loc)
+            if path in self.paths:
+                continue
+            self.paths.add(path)
+            self.pages.append(loc)
+            sections.add(_section(path))
+        if complete:
+            self.covered |= sections - {""}
+
+    def has(self, url: str) -> bool:
+        return _path(url) in self.paths
+
+    def covers(self, url: str) -> bool:
+        return _section(_path(url)) in self.covered
+
+    def candidates(self, urls: List[str], keywords: List[str]) -> List[str]:
+        """
+        Keep candidates that are listed or outside the covered sections, then add
+        listed pages whose path mentions one of `keywords`.
+        """
+        kept = [url for url in urls if self.has(url) or not self.covers(url)]
+        listed = [url for url in self.pages if _section(_path(url)) == "pages" and any(k in _path(url) for k in keywords)]
+        return kept + [url for url in listed if url not in kept]
+
+class _SitemapReader:
+    """Incremental sitemap parser: <loc> of every <url> or <sitemap> entry, plus product image titles."""
+
+    def __init__(self):
+        self._parser = etree.XMLPullParser(events=("end",), recover=True, resolve_entities=False, no_network=True)
+        self.is_index = False
+        self.locs: List[str] = []
+        self.images: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.truncated = False
+
+    def feed(self, data: bytes) -> None:
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self) -> None:
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        self._drain()
+
+    def _drain(self) -> None:
+        for _, el in self._parser.read_events():
+            tag = etree.QName(el).localname if isinstance(el.tag, str) else ""
+            if tag not in ("url", "sitemap"):
+                continue
+            self.is_index = self.is_index or tag == "sitemap"
+            loc, image, title = None, None, None
+            for child in el:
+                if not isinstance(child.tag, str):
+                    continue
+                name = etree.QName(child).localname
+                if name == "loc":
+                    loc = (child.text or "").strip() or None
+                elif name == "image" and image is None:
+                    # <image:image><image:loc/><image:title/></image:image>
+                    for part in child:
+                        if isinstance(part.tag, str) and (part.text or "").strip():
+                            if etree.QName(part).localname == "loc":
+                                image = part.text.strip()
+                            elif etree.QName(part).localname == "title":
+                                title = part.text.strip()
+            if loc:
+                self.locs.append(loc)
+                if image or title:
+                    self.images[loc] = (title, image)
+            # Entries are not needed once read; keep the tree from growing
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+            if len(self.locs) >= settings.sitemap_max_urls:
+                self.truncated = True
+
+async def _read_sitemap(client: httpx.AsyncClient, url: str) -> Optional[_SitemapReader]:
+    reader = _SitemapReader()
+    # Sitemaps served as .xml.gz are gzip files, not gzip content-encoding
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if urlparse(url).path.endswith(".gz") else None
+    try:
+        async with governed_stream(client, url) as r:
+            if r.status_code >= 400 or "html" in r.headers.get("content-type", "").lower():
+                return None
+            received = 0
+            async for chunk in r.aiter_bytes():
+                received += len(chunk)
+                reader.feed(inflate.decompress(chunk) if inflate else chunk)
+                if reader.truncated or received > settings.sitemap_max_bytes:
+                    reader.truncated = True
+                    break
+        reader.close()
+    except (httpx.HTTPError, zlib.error, etree.Error):
+        return None
+    return reader
+
+async def discover_sitemap(client: httpx.AsyncClient, base: str) -> SitemapIndex:
+    """
+    Read /sitemap.xml and its page, collection and blog sitemaps (concurrently,
+    each streamed). Product sitemaps are only recorded; they are read on demand
+    by sitemap_products(). Returns an empty index if the store has no sitemap.
+    """
+    index = SitemapIndex()
+    if not settings.sitemap_enabled:
+        return index
+    root = await _read_sitemap(client, urljoin(base, "/sitemap.xml"))
+    if root is None:
+        return index
+    index.found = True
+    if not root.is_index:
+        index.add(root.locs, complete=not root.truncated)
+        return index
+    children = root.locs[:settings.sitemap_max_files]
+    index.product_sitemaps = [loc for loc in children if sitemap_kind(loc) == "products"]
+    eager = [loc for loc in children if sitemap_kind(loc) != "products"]
+    for reader in await asyncio.gather(*(_read_sitemap(client, loc) for loc in eager)):
+        if reader is not None and not reader.is_index:
+            index.add(reader.locs, complete=not reader.truncated)
+    return index
+
+async def sitemap_products(client: httpx.AsyncClient, index: SitemapIndex) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(handle, title, image) of every product listed in the product sitemaps, in sitemap order."""
+    products: List[Tuple[str, Optional[str], Optional[str]]] = []
+    seen: Set[str] = set()
+    readers = await asyncio.gather(*(_read_sitemap(client, loc) for loc in index.product_sitemaps))
+    # A flat /sitemap.xml lists products alongside everything else
+    sources = [(r.locs, r.images) for r in readers if r is not None] or [(index.pages, {})]
+    for locs, images in sources:
+        for loc in locs:
+            m = PRODUCT_LINK_RE.search(loc)
+            if not m or m.group(1) in seen:
+                continue
+            seen.add(m.group(1))
+            title, image = images.get(loc, (None, None))
+            products.append((m.group(1), title, image))
+    return products
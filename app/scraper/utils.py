@@ -1,10 +1,21 @@
 from __future__ import annotations
+import asyncio
+import datetime
+import json
+import random
 import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
 from urllib.parse import urljoin, urlparse
 import httpx
 from bs4 import BeautifulSoup
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, AsyncIterator
 from app.config import settings, DEFAULT_HEADERS
+from app.scraper.http_cache import http_cache, TEXT_KEY_PREFIX
+from app.scraper.parsers import get_backend, HtmlTextStream
+from app.scraper.offload import run_cpu
 
 def normalize_base(url: str) -> str:
     url = url.strip()
@@ -14,26 +25,394 @@ def normalize_base(url: str) -> str:
     base = f"{parsed.scheme}://{parsed.netloc}"
     return base
 
-async def fetch_text(client: httpx.AsyncClient, url: str) -> tuple[str | None, int | None]:
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def create_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=settings.http2 and _http2_available(),
+        verify=settings.verify_ssl,
+        max_redirects=settings.max_redirects,
+    )
+
+_shared_client: httpx.AsyncClient | None = None
+
+async def open_shared_client() -> httpx.AsyncClient:
+    """Create the process-wide pooled client; called from the app lifespan."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = create_client()
+    return _shared_client
+
+async def close_shared_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+@asynccontextmanager
+async def borrow_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Yield the shared pooled client, or a short-lived one outside the app (scripts, tests)."""
+    if _shared_client is not None:
+        yield _shared_client
+        return
+    async with create_client() as client:
+        yield client
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+class HostUnavailable(httpx.TransportError):
+    """Raised without a request while a host's circuit breaker is open."""
+
+def _retry_after(value: str | None) -> float | None:
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
     try:
-        r = await client.get(url, headers=DEFAULT_HEADERS, follow_redirects=True, timeout=settings.request_timeout_seconds)
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+class HostState:
+    """
+    Request governor for one host: concurrency cap, token bucket, Retry-After
+    pause and circuit breaker. One instance per host is shared by every scrape.
+    """
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(settings.per_host_concurrency)
+        self.rate = settings.per_host_rate
+        self.tokens = float(settings.per_host_burst)
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.failures = 0  # consecutive
+        self.open_until = 0.0
+
+    def available(self) -> bool:
+        """False while the breaker is open. Once it cools down, requests go through
+        again, but a single further failure reopens it (half-open)."""
+        return time.monotonic() >= self.open_until
+
+    async def acquire(self) -> None:
+        while True:
+            if not self.available():
+                raise HostUnavailable("circuit open")
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(float(settings.per_host_burst), self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def succeeded(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self.rate = min(settings.per_host_rate, self.rate + 0.1)
+
+    def failed(self) -> None:
+        self.failures += 1
+        if self.failures >= settings.breaker_failures:
+            self.open_until = time.monotonic() + settings.breaker_cooldown_seconds
+
+    def throttled(self, retry_after: float | None) -> None:
+        self.rate = max(settings.per_host_min_rate, self.rate / 2)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, settings.retry_after_max_seconds))
+
+_hosts: "OrderedDict[str, HostState]" = OrderedDict()
+
+def host_state(url: str) -> HostState:
+    """The shared governor for a URL's host (least recently used idle hosts are dropped)."""
+    host = urlparse(url).netloc.lower()
+    state = _hosts.get(host)
+    if state is None:
+        state = _hosts[host] = HostState()
+        if len(_hosts) > settings.host_state_limit:
+            for old, candidate in list(_hosts.items())[:len(_hosts) // 10]:
+                if not candidate.semaphore.locked() and candidate.available():
+                    del _hosts[old]
+    else:
+        _hosts.move_to_end(host)
+    return state
+
+def _backoff(attempt: int) -> float:
+    # full jitter
+    return random.uniform(0, settings.http_retry_base_seconds * 2 ** attempt)
+
+@asynccontextmanager
+async def governed_stream(client: httpx.AsyncClient, url: str, headers: Dict[str, str] | None = None) -> AsyncIterator[httpx.Response]:
+    """
+    Open a streamed GET under the host's governor and yield the response, body
+    unread. Throttled (429 + Retry-After), 502/503/504 and connection-error
+    responses are retried with jittered backoff before anything is yielded;
+    timeouts, connection errors and 5xx count toward the host's breaker.
+    Raises HostUnavailable while the breaker is open.
+    """
+    state = host_state(url)
+    for attempt in range(settings.http_retries + 1):
+        last = attempt == settings.http_retries
+        await state.acquire()
+        delay, yielded = None, False
+        try:
+            async with state.semaphore:
+                async with client.stream("GET", url, headers={**DEFAULT_HEADERS, **(headers or {})}, follow_redirects=True, timeout=settings.request_timeout_seconds) as r:
+                    if r.status_code == 429:
+                        retry_after = _retry_after(r.headers.get("retry-after"))
+                        state.throttled(retry_after)
+                        if not last and (retry_after or 0) <= settings.retry_after_max_seconds:
+                            delay = max(retry_after or 0, _backoff(attempt))
+                    elif r.status_code >= 500:
+                        state.failed()
+                        if not last and r.status_code in RETRY_STATUSES and state.available():
+                            delay = _backoff(attempt)
+                    else:
+                        state.succeeded()
+                    if delay is None:
+                        yielded = True
+                        yield r
+                        return
+        except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError):
+            if yielded:
+                raise
+            state.failed()
+            if last or not state.available():
+                raise
+            delay = _backoff(attempt)
+        except httpx.TimeoutException:
+            # not retried: a slow store would cost another full timeout
+            state.failed()
+            raise
+        await asyncio.sleep(delay)
+
+async def _get(client: httpx.AsyncClient, url: str, headers: Dict[str, str] | None = None) -> httpx.Response:
+    async with governed_stream(client, url, headers) as r:
+        await r.aread()
+        return r
+
+async def _fetch_body(client: httpx.AsyncClient, url: str) -> tuple[str | None, int | None]:
+    """GET through the conditional-request cache; returns (body, status) or (None, status) on >= 400."""
+    if not settings.http_cache_enabled:
+        r = await _get(client, url)
         if r.status_code >= 400:
             return None, r.status_code
         return r.text, r.status_code
+
+    entry = http_cache.get(url)
+    if entry is not None and http_cache.is_fresh(url, entry):
+        http_cache.hits += 1
+        return entry.body, entry.status
+    r = await _get(client, url, http_cache.conditional_headers(entry))
+    if r.status_code == 304 and entry is not None:
+        http_cache.revalidated += 1
+        http_cache.touch(entry)
+        return entry.body, entry.status
+    if r.status_code >= 400:
+        return None, r.status_code
+    http_cache.misses += 1
+    http_cache.store(url, r)
+    return r.text, r.status_code
+
+async def fetch_text(client: httpx.AsyncClient, url: str) -> tuple[str | None, int | None]:
+    try:
+        return await _fetch_body(client, url)
     except Exception:
         return None, None
 
 async def fetch_json(client: httpx.AsyncClient, url: str) -> tuple[dict | None, int | None]:
     try:
-        r = await client.get(url, headers=DEFAULT_HEADERS, follow_redirects=True, timeout=settings.request_timeout_seconds)
-        if r.status_code >= 400:
-            return None, r.status_code
-        return r.json(), r.status_code
+        body, status = await _fetch_body(client, url)
+        if body is None:
+            return None, status
+        return json.loads(body), status
+    except Exception:
+        return None, None
+
+def _is_html(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return not content_type or "html" in content_type or content_type.startswith("text/plain")
+
+async def _stream_page_text(client: httpx.AsyncClient, url: str, cap: int, headers: Dict[str, str]) -> tuple[str | None, int | None, httpx.Headers | None]:
+    async with governed_stream(client, url, headers) as r:
+        if r.status_code >= 300:
+            return None, r.status_code, r.headers
+        # Reject from headers alone, before reading any of the body
+        length = r.headers.get("content-length")
+        if not _is_html(r.headers.get("content-type", "")) or (length and length.isdigit() and int(length) > settings.max_page_bytes):
+            return None, r.status_code, r.headers
+        converter = HtmlTextStream(cap)
+        received = 0
+        async for chunk in r.aiter_text():
+            received += len(chunk)
+            converter.feed(chunk)
+            if converter.full or received > settings.max_page_bytes:
+                break  # leaving the context closes the connection mid-body
+        return converter.finish(), r.status_code, r.headers
+
+async def fetch_page_text(client: httpx.AsyncClient, url: str, cap: int) -> tuple[str | None, int | None]:
+    """
+    Stream a page and return its visible text (one run per line, at most `cap`
+    characters), reading only as much of the body as needed. Non-HTML and
+    oversized responses are rejected from their headers. Extracted text is kept
+    in the HTTP cache with the page's validators.
+    """
+    key = TEXT_KEY_PREFIX + url
+    try:
+        entry = http_cache.get(key) if settings.http_cache_enabled else None
+        if entry is not None and http_cache.is_fresh(key, entry):
+            http_cache.hits += 1
+            return entry.body, entry.status
+        text, status, headers = await _stream_page_text(client, url, cap, http_cache.conditional_headers(entry))
+        if status == 304 and entry is not None:
+            http_cache.revalidated += 1
+            http_cache.touch(entry)
+            return entry.body, entry.status
+        if status is None or status >= 300:
+            return None, status
+        if text is not None and settings.http_cache_enabled:
+            http_cache.misses += 1
+            http_cache.put(key, status, text, headers.get("etag"), headers.get("last-modified"))
+        return text, status
     except Exception:
         return None, None
 
-def make_soup(html: str) -> BeautifulSoup:
-    return BeautifulSoup(html, "lxml")
+def make_soup(html: str, backend: str | None = None):
+    """
+    Parse HTML with the configured backend (Settings.parser_backend). "bs4" returns a
+    BeautifulSoup document and is the reference; "lxml" returns a faster LxmlNode
+    exposing the same subset of the API the scraper uses.
+    """
+    return get_backend(backend or settings.parser_backend)(html)
+
+def cache_key(url: str) -> str:
+    """Normalize a URL for per-scrape caching: lowercase scheme/host, drop fragment, default path."""
+    parsed = urlparse(url.strip())
+    path = parsed.path or "/"
+    key = f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{path}"
+    if parsed.query:
+        key += "?" + parsed.query
+    return key
+
+class PageCache:
+    """
+    Request-scoped fetch-and-parse cache. Every URL is downloaded at most once
+    per scrape and its BeautifulSoup tree is built at most once. Concurrent
+    requests for the same URL share a single in-flight fetch.
+    """
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.hits = 0
+        self.misses = 0
+        self._texts: Dict[str, asyncio.Task] = {}
+        self._json: Dict[str, asyncio.Task] = {}
+        self._soups: Dict[str, BeautifulSoup] = {}
+        self._extracts: Dict[tuple, asyncio.Task] = {}
+        self._page_texts: Dict[str, asyncio.Task] = {}
+        self._sitemaps: Dict[str, asyncio.Task] = {}
+
+    async def _cached(self, store: Dict[str, asyncio.Task], url: str, fetch) -> tuple[Any, int | None]:
+        key = cache_key(url)
+        task = store.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(fetch(self.client, url))
+            store[key] = task
+        else:
+            self.hits += 1
+        # shield: a cancelled waiter must not cancel the fetch other stages share
+        return await asyncio.shield(task)
+
+    def cancel_pending(self) -> None:
+        """Cancel fetches nobody is waiting for any more (e.g. losing candidate probes)."""
+        for task in [*self._texts.values(), *self._json.values(), *self._extracts.values(), *self._page_texts.values(), *self._sitemaps.values()]:
+            if not task.done():
+                task.cancel()
+
+    async def text(self, url: str) -> tuple[str | None, int | None]:
+        return await self._cached(self._texts, url, fetch_text)
+
+    async def json(self, url: str) -> tuple[Any, int | None]:
+        return await self._cached(self._json, url, fetch_json)
+
+    async def page_text(self, url: str, cap: int) -> tuple[str | None, int | None]:
+        """Visible text of a page via the early-exit streaming fetch (see fetch_page_text)."""
+        return await self._cached(self._page_texts, url, lambda client, u: fetch_page_text(client, u, cap))
+
+    async def sitemap(self, base: str, timeout: float | None = None):
+        """
+        The store's SitemapIndex, discovered once per scrape. The first caller's
+        `timeout` bounds discovery: past it, discovery is cancelled, that caller
+        gets TimeoutError, and every reader (waiting or later) carries on with an
+        empty index (as for a store without a sitemap).
+        """
+        task = self._sitemaps.get(base)
+        if task is None:
+            task = asyncio.ensure_future(self._discover_sitemap(base, timeout))
+            self._sitemaps[base] = task
+            index, timed_out = await asyncio.shield(task)
+            if timed_out:
+                raise asyncio.TimeoutError
+            return index
+        index, _ = await asyncio.shield(task)
+        return index
+
+    def sitemap_if_ready(self, base: str):
+        """The store's SitemapIndex if discovery has finished, else None (never waits)."""
+        task = self._sitemaps.get(base)
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()[0]
+
+    async def _discover_sitemap(self, base: str, timeout: float | None):
+        from app.scraper.sitemap import discover_sitemap, SitemapIndex
+        try:
+            return await asyncio.wait_for(discover_sitemap(self.client, base), timeout), False
+        except asyncio.TimeoutError:
+            return SitemapIndex(), True
+
+    async def soup(self, url: str) -> tuple[BeautifulSoup | None, int | None]:
+        html, status = await self.text(url)
+        if not html:
+            return None, status
+        key = cache_key(url)
+        soup = self._soups.get(key)
+        if soup is None:
+            soup = make_soup(html)
+            self._soups[key] = soup
+        return soup, status
+
+    async def extract(self, url: str, extractor, *args) -> tuple[Any, int | None]:
+        """
+        Run `extractor(html, *args)` over a page once per scrape; (None, status) if
+        unavailable. Large pages are extracted in the parse process pool.
+        """
+        html, status = await self.text(url)
+        if not html:
+            return None, status
+        key = (cache_key(url), extractor.__name__, args)
+        task = self._extracts.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_cpu(extractor, html, *args))
+            self._extracts[key] = task
+        return await asyncio.shield(task), status
 
 def absolute(base: str, path: str | None) -> str | None:
     if not path:
@@ -0,0 +1,61 @@
+from __future__ import annotations
+import asyncio, time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.config import settings
+from app.scraper.utils import normalize_base, unique_preserve_order
+from app.services.insights_service import fetch_and_optionally_persist
+
+async def _scrape_one(url: str, persist: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        ctx = await fetch_and_optionally_persist(url, persist=persist)
+        return {"website_url": url, "ok": True, "seconds": round(time.perf_counter() - started, 3), "brand": ctx.model_dump()}
+    except Exception as e:
+        return {"website_url": url, "ok": False, "seconds": round(time.perf_counter() - started, 3), "error": f"{type(e).__name__}: {e}"}
+
+async def run_batch(urls: List[str], persist: bool = True, concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Scrape many stores through a bounded pool of workers, yielding one result per
+    store as it completes and a final summary with throughput. The global cap is the
+    number of workers (`concurrency`, never more than batch_concurrency); the
+    per-host cap is the shared per-host fetch limiter.
+    """
+    stores = unique_preserve_order([normalize_base(u) for u in urls if u and u.strip()])
+    # a caller may ask for fewer workers than configured, never more
+    workers = max(1, min(concurrency or settings.batch_concurrency, settings.batch_concurrency, len(stores) or 1))
+    todo: "asyncio.Queue[str]" = asyncio.Queue()
+    for store in stores:
+        todo.put_nowait(store)
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    async def worker() -> None:
+        while True:
+            try:
+                store = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await results.put(await _scrape_one(store, persist))
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    succeeded = failed = 0
+    try:
+        for _ in range(len(stores)):
+            result = await results.get()
+            if result["ok"]:
+                succeeded += 1
+            else:
+                failed += 1
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+    elapsed = time.perf_counter() - started
+    yield {"summary": {
+        "total": len(stores),
+        "succeeded": succeeded,
+        "failed": failed,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "stores_per_minute": round(len(stores) / elapsed * 60, 2) if elapsed > 0 else None,
+    }}
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import ast
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+from app.models import models
+from app.models.schemas import (
+    About, BrandContext, ContactDetails, FAQ, ImportantLinks, Policies, Policy, Product, SocialHandles
+)
+from app.scraper.utils import normalize_base
+
+# Columns GET /brands/{id}/products may project; id is always returned (it is the cursor)
+PRODUCT_COLUMNS = ("handle", "title", "vendor", "product_type", "tags", "price_range", "images_json", "url",
+                   "content_hash", "updated_at")
+
+def _literal(value: Optional[str]) -> Any:
+    # images_json / price_range hold str() of a list / dict
+    if not value:
+        return None
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+
+def list_brands(db: Session, after_id: int = 0, limit: int = 50) -> Dict[str, Any]:
+    """Brands in id order with their product counts; keyset-paginated on id."""
+    counts = (
+        select(models.Product.brand_id, func.count().label("products"))
+        .group_by(models.Product.brand_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(models.Brand.id, models.Brand.name, models.Brand.website, func.coalesce(counts.c.products, 0))
+        .outerjoin(counts, counts.c.brand_id == models.Brand.id)
+        .where(models.Brand.id > after_id)
+        .order_by(models.Brand.id)
+        .limit(limit)
+    ).all()
+    return {
+        "brands": [{"id": r[0], "name": r[1], "website": r[2], "products": r[3]} for r in rows],
+        "next_after_id": rows[-1][0] if rows else after_id,
+        "has_more": len(rows) == limit,
+    }
+
+def brand_websites(db: Session, brand_ids: Iterable[int]) -> Dict[int, str]:
+    ids = list(brand_ids)
+    if not ids:
+        return {}
+    return dict(db.execute(select(models.Brand.id, models.Brand.website).where(models.Brand.id.in_(ids))).all())
+
+def get_brand(db: Session, website: str) -> Optional[models.Brand]:
+    """A brand with every relationship loaded up front (one SELECT ... IN per relationship)."""
+    return db.execute(
+        select(models.Brand)
+        .where(models.Brand.website == normalize_base(website))
+        .options(
+            selectinload(models.Brand.products),
+            selectinload(models.Brand.faqs),
+            selectinload(models.Brand.policies),
+            selectinload(models.Brand.socials),
+            selectinload(models.Brand.contacts),
+            selectinload(models.Brand.links),
+            selectinload(models.Brand.about),
+        )
+    ).scalar_one_or_none()
+
+def product_to_schema(p: models.Product) -> Product:
+    return Product(
+        handle=p.handle,
+        title=p.title,
+        vendor=p.vendor,
+        product_type=p.product_type,
+        tags=p.tags.split(",") if p.tags else None,
+        price_range=_literal(p.price_range),
+        images=_literal(p.images_json),
+        url=p.url,
+        updated_at=p.updated_at,
+    )
+
+def brand_to_context(brand: models.Brand) -> BrandContext:
+    """Rebuild the BrandContext a brand was persisted from (scrape_meta is not stored)."""
+    policies = {p.kind: Policy(url=p.url, content=p.content) for p in brand.policies}
+    labelled = {l.label: l.url for l in brand.links if l.label}
+    return BrandContext(
+        brand_name=brand.name,
+        website=brand.website,
+        product_catalog=[product_to_schema(p) for p in brand.products],
+        policies=Policies(privacy_policy=policies.get("privacy"), return_policy=policies.get("return")),
+        faqs=[FAQ(question=f.question, answer=f.answer, url=f.url) for f in brand.faqs],
+        social_handles=SocialHandles(**{s.platform: s.url for s in brand.socials if s.platform in SocialHandles.model_fields}),
+        contact_details=ContactDetails(
+            emails=[c.value for c in brand.contacts if c.kind == "email"],
+            phones=[c.value for c in brand.contacts if c.kind == "phone"],
+        ),
+        about_us=About(url=brand.about.url, content=brand.about.content) if brand.about else None,
+        important_links=ImportantLinks(
+            order_tracking=labelled.get("order_tracking"),
+            contact_us=labelled.get("contact_us"),
+            blogs=labelled.get("blogs"),
+            others=[l.url for l in brand.links if not l.label],
+        ),
+    )
+
+def list_products(db: Session, brand_id: int, after_id: int = 0, limit: int = 100,
+                  fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    A brand's products in id order, keyset-paginated on id. `fields` projects the
+    selected columns (unknown names raise ValueError); all columns by default.
+    """
+    fields = list(fields or PRODUCT_COLUMNS)
+    unknown = [f for f in fields if f not in PRODUCT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    columns = [getattr(models.Product, f) for f in fields]
+    rows = db.execute(
+        select(models.Product.id, *columns)
+        .where(models.Product.brand_id == brand_id, models.Product.id > after_id)
+        .order_by(models.Product.id)
+        .limit(limit)
+    ).all()
+    return {
+        "brand_id": brand_id,
+        "products": [dict(zip(("id", *fields), row)) for row in rows],
+        "next_after_id": rows[-1][0] if rows else after_id,
+        "has_more": len(rows) == limit,
+    }
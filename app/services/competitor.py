@@ -11,69 +11,175 @@
 #     # db.query returns list of tuples → extract values
 #     return [c[0] for c in competitors]
 
-from typing import List
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.models.models import Competitor  # Correct import
-from app.models.schemas import BrandContext
+from app.config import settings
+from app.models.db import SessionLocal, WriteSessionLocal
+from app.models.models import Brand, Competitor  # Correct import
+from app.models.schemas import BrandContext, Product
+from app.services import brands
 from app.services.insights_service import fetch_and_optionally_persist
-import httpx
-from bs4 import BeautifulSoup
-from app.scraper.utils import normalize_base, fetch_text
+from app.services.similarity import catalog_terms, ensure_loaded, similarity_available, similarity_index
+from app.scraper.extractors import extract_homepage
+from app.scraper.utils import normalize_base, borrow_client, PageCache
 
-async def find_competitors(website_url: str, db: Session) -> List[BrandContext]:
+logger = logging.getLogger(__name__)
+
+def _save_competitors(website_url: str, competitor_urls: List[str]) -> None:
+    # Replace the store's edges: drop those no longer listed, then INSERT OR IGNORE /
+    # ON CONFLICT DO NOTHING against the (website_url, competitor_website) key,
+    # in a short transaction of its own on the write engine
+    rows = [{"website_url": website_url, "competitor_website": url} for url in competitor_urls]
+    if not rows:
+        return
+    with WriteSessionLocal() as db:
+        db.execute(delete(Competitor).where(Competitor.website_url == website_url,
+                                            Competitor.competitor_website.not_in(competitor_urls)))
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            db.execute(insert(Competitor).on_conflict_do_nothing(), rows)
+        else:
+            known = set(db.scalars(select(Competitor.competitor_website).where(Competitor.website_url == website_url)))
+            db.add_all(Competitor(**row) for row in rows if row["competitor_website"] not in known)
+        db.commit()
+
+def _fresh_context(db: Session, website_url: str) -> Optional[BrandContext]:
+    """The persisted competitor, if it was scraped within competitor_fresh_seconds."""
+    scraped_at = db.scalar(select(Brand.scraped_at).where(Brand.website == website_url))
+    if scraped_at is None or time.time() - scraped_at > settings.competitor_fresh_seconds:
+        return None
+    brand = brands.get_brand(db, website_url)
+    return brands.brand_to_context(brand) if brand is not None else None
+
+def _fresh_contexts(website_urls: List[str]) -> List[Optional[BrandContext]]:
+    # whole catalogs are loaded: runs in a thread, on a session of its own
+    with SessionLocal() as db:
+        return [_fresh_context(db, url) for url in website_urls]
+
+def _stored_competitors(website_url: str) -> List[str]:
+    with SessionLocal() as db:
+        return list(db.scalars(
+            select(Competitor.competitor_website).where(Competitor.website_url == website_url).order_by(Competitor.id)
+        ))
+
+async def find_competitors(
+    website_url: str,
+    brand: Optional[BrandContext] = None,
+    errors: Optional[List[str]] = None,
+) -> List[BrandContext]:
     """
     Find competitors for a given Shopify store and fetch their insights.
+    Database work runs in threads, on sessions of its own.
+    Pass the store's own scrape as `brand` so discovery needs no refetch.
+    Competitors persisted recently are served from the database; the rest are
+    scraped concurrently within competitor_budget_seconds, and those still
+    running at the deadline are dropped (noted in `errors`).
     """
-    competitors = []
-    
+    website_url = normalize_base(website_url)
+
     # Step 1: Query existing competitors from the database
-    stored_competitors = (
-        db.query(Competitor.competitor_website)
-        .filter(Competitor.website_url == website_url)
-        .all()
-    )
-    competitor_urls = [c[0] for c in stored_competitors]
-    
-    # Step 2: If no competitors in DB, discover new ones
-    if not competitor_urls:
-        competitor_urls = await discover_competitors(website_url)
-        # Save discovered competitors to the database
-        for comp_url in competitor_urls:
-            db.add(Competitor(website_url=website_url, competitor_website=comp_url))
-        db.commit()
+    competitor_urls = await asyncio.to_thread(_stored_competitors, website_url)
+
+    # Step 2: Similar catalogs in the index replace the stored edges when they differ;
+    # keyword guesses are only used while nothing better is known, and not stored
+    similar = await similar_competitors(website_url, brand)
+    if similar:
+        if set(similar) != set(competitor_urls):
+            # BEGIN IMMEDIATE may wait on the writer thread's lock: keep it off the event loop
+            await asyncio.to_thread(_save_competitors, website_url, similar)
+        competitor_urls = similar
+    elif not competitor_urls:
+        competitor_urls = await keyword_competitors(website_url, brand)
+
+    # Step 3: Fetch insights for each competitor, limited to avoid performance issues
+    competitor_urls = competitor_urls[:settings.competitor_limit]
+    results: List[Optional[BrandContext]] = await asyncio.to_thread(_fresh_contexts, competitor_urls)
+    tasks = {
+        asyncio.ensure_future(fetch_and_optionally_persist(url, persist=True, wait_for_persist=False)): i
+        for i, url in enumerate(competitor_urls)
+        if results[i] is None
+    }
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=settings.competitor_budget_seconds)
+        for task in pending:
+            task.cancel()
+            if errors is not None:
+                errors.append(f"Competitor {competitor_urls[tasks[task]]} not scraped within {settings.competitor_budget_seconds}s")
+        for task in done:
+            if task.exception() is not None:
+                # Log error but continue with other competitors
+                logger.warning("Error fetching insights for competitor %s: %s", competitor_urls[tasks[task]], task.exception())
+                continue
+            results[tasks[task]] = task.result()
 
-    # Step 3: Fetch insights for each competitor
-    for comp_url in competitor_urls[:3]:  # Limit to 3 competitors to avoid performance issues
-        try:
-            ctx = await fetch_and_optionally_persist(comp_url, db)
-            competitors.append(ctx)
-        except Exception as e:
-            # Log error but continue with other competitors
-            print(f"Error fetching insights for competitor {comp_url}: {str(e)}")
-    
-    return competitors
-
-async def discover_competitors(website_url: str) -> List[str]:
+    return [ctx for ctx in results if ctx is not None]
+
+def _rank_similar(website_url: str, products: Optional[List[Product]], k: int) -> List[Tuple[int, str, float]]:
+    # in a thread: the index lock may be held by a rebuild, and term extraction
+    # walks the whole catalog
+    brand_id = similarity_index.brand_id(website_url)
+    if products:
+        return similarity_index.similar(catalog_terms(products), k, brand_id)
+    return similarity_index.similar_to_brand(brand_id, k) if brand_id else []
+
+async def similar_competitors(website_url: str, brand: Optional[BrandContext] = None) -> List[str]:
+    """
+    The persisted brands whose catalogs are most similar (TF-IDF cosine over
+    product titles, tags, types and vendors); [] when numpy/scipy are missing,
+    the index is still loading, or nothing similar is stored. `brand` is the
+    caller's scrape of the store, if it has one.
+    """
+    website_url = normalize_base(website_url)
+    if not similarity_available():
+        return []
+    if not similarity_index.loaded:
+        # normally warmed by the app lifespan; never wait for it inside a request
+        asyncio.get_running_loop().run_in_executor(None, ensure_loaded)
+        return []
+    products = brand.product_catalog if brand is not None else None
+    ranked = await asyncio.to_thread(_rank_similar, website_url, products, settings.competitor_limit + 1)
+    similar = [website for _, website, _ in ranked if website and website != website_url]
+    return similar[:settings.competitor_limit]
+
+async def discover_competitors(website_url: str, brand: Optional[BrandContext] = None) -> List[str]:
     """
-    Discover potential competitors by analyzing the website's content.
-    This is a placeholder; in a real implementation, use web search or product similarity.
+    Discover potential competitors by catalog similarity (similar_competitors),
+    falling back to a keyword match on the homepage title. `brand` is the
+    caller's scrape of the store, if it has one, so its homepage and catalog
+    are not fetched again.
     """
-    async with httpx.AsyncClient() as client:
-        html, _ = await fetch_text(client, normalize_base(website_url) + "/")
-        if not html:
+    website_url = normalize_base(website_url)
+    similar = await similar_competitors(website_url, brand)
+    if similar:
+        return similar
+    return await keyword_competitors(website_url, brand)
+
+async def keyword_competitors(website_url: str, brand: Optional[BrandContext] = None) -> List[str]:
+    """Placeholder guesses from homepage title keywords; never persisted."""
+    if brand is not None:
+        brand_name = brand.brand_name or ""
+    else:
+        async with borrow_client() as client:
+            home, _ = await PageCache(client).extract(website_url + "/", extract_homepage, website_url)
+        if home is None:
             return []
-        
-        soup = BeautifulSoup(html, "lxml")
-        title = soup.find("title").get_text(strip=True) if soup.find("title") else ""
-        keywords = title.lower().split()  # Simple keyword extraction
-        
-        # Simulate competitor discovery based on keywords
-        competitor_urls = []
-        if "hair" in keywords:
-            competitor_urls = ["https://hairoriginals.com", "https://examplehair.com"]
-        elif "fashion" in keywords:
-            competitor_urls = ["https://memy.co.in", "https://examplefashion.com"]
-        else:
-            competitor_urls = ["https://colourpop.com", "https://examplegeneric.com"]
-        
-        return [normalize_base(url) for url in competitor_urls[:3]]
\ No newline at end of file
+        brand_name = home.title or ""
+
+    keywords = brand_name.lower().split()  # Simple keyword extraction
+
+    # Simulate competitor discovery based on keywords
+    competitor_urls = []
+    if "hair" in keywords:
+        competitor_urls = ["https://hairoriginals.com", "https://examplehair.com"]
+    elif "fashion" in keywords:
+        competitor_urls = ["https://memy.co.in", "https://examplefashion.com"]
+    else:
+        competitor_urls = ["https://colourpop.com", "https://examplegeneric.com"]
+
+    return [normalize_base(url) for url in competitor_urls[:3]]
@@ -1,97 +1,283 @@
 from __future__ import annotations
-from typing import Optional
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.scraper.shopify_scraper import build_brand_context
-from app.models.schemas import BrandContext
+from app.models.schemas import BrandContext, Product
 from app.models import models
+from app.services.result_cache import brand_cache
+from app.services.writer import persist_writer
 
-async def fetch_and_optionally_persist(website_url: str, db: Optional[Session] = None) -> BrandContext:
-    ctx = await build_brand_context(website_url)
-
-    if db is not None:
-        # Upsert brand by website
-        brand = db.query(models.Brand).filter(models.Brand.website == ctx.website).one_or_none()
-        if brand is None:
-            brand = models.Brand(name=ctx.brand_name, website=ctx.website)
-            db.add(brand)
-            db.flush()
-        else:
-            brand.name = ctx.brand_name
-
-        # Clear existing children for simplicity (idempotent persistence)
-        db.query(models.Product).filter(models.Product.brand_id == brand.id).delete()
-        db.query(models.FAQ).filter(models.FAQ.brand_id == brand.id).delete()
-        db.query(models.Policy).filter(models.Policy.brand_id == brand.id).delete()
-        db.query(models.Social).filter(models.Social.brand_id == brand.id).delete()
-        db.query(models.Contact).filter(models.Contact.brand_id == brand.id).delete()
-        db.query(models.Link).filter(models.Link.brand_id == brand.id).delete()
-        db.query(models.About).filter(models.About.brand_id == brand.id).delete()
-
-        # Persist products
-        for p in ctx.product_catalog:
-            db.add(models.Product(
-                brand_id=brand.id,
-                handle=p.handle,
-                title=p.title,
-                vendor=p.vendor,
-                product_type=p.product_type,
-                tags=",".join(p.tags) if p.tags else None,
-                price_range=str(p.price_range) if p.price_range else None,
-                images_json=str(p.images) if p.images else None,
-                url=p.url,
-            ))
-
-        # Persist FAQs
-        for f in ctx.faqs:
-            db.add(models.FAQ(
-                brand_id=brand.id,
-                question=f.question,
-                answer=f.answer,
-                url=f.url
-            ))
-
-        # Policies
-        if ctx.policies.privacy_policy:
-            db.add(models.Policy(
-                brand_id=brand.id,
-                kind="privacy",
-                url=ctx.policies.privacy_policy.url,
-                content=ctx.policies.privacy_policy.content
-            ))
-        if ctx.policies.return_policy:
-            db.add(models.Policy(
-                brand_id=brand.id,
-                kind="return",
-                url=ctx.policies.return_policy.url,
-                content=ctx.policies.return_policy.content
-            ))
-
-        # Socials
-        socials = ctx.social_handles.model_dump(exclude_none=True)
-        for platform, url in socials.items():
-            db.add(models.Social(brand_id=brand.id, platform=platform, url=url))
-
-        # Contacts
-        for e in ctx.contact_details.emails:
-            db.add(models.Contact(brand_id=brand.id, kind="email", value=e))
-        for p in ctx.contact_details.phones:
-            db.add(models.Contact(brand_id=brand.id, kind="phone", value=p))
-
-        # Links (others)
-        if ctx.important_links:
-            if ctx.important_links.order_tracking:
-                db.add(models.Link(brand_id=brand.id, label="order_tracking", url=ctx.important_links.order_tracking))
-            if ctx.important_links.contact_us:
-                db.add(models.Link(brand_id=brand.id, label="contact_us", url=ctx.important_links.contact_us))
-            if ctx.important_links.blogs:
-                db.add(models.Link(brand_id=brand.id, label="blogs", url=ctx.important_links.blogs))
-            for url in (ctx.important_links.others or [])[:50]:
-                db.add(models.Link(brand_id=brand.id, label=None, url=url))
-
-        # About
-        if ctx.about_us:
-            db.add(models.About(brand_id=brand.id, url=ctx.about_us.url, content=ctx.about_us.content))
-
-        db.commit()
+def _chunks(rows: List[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _bulk_insert(db: Session, model, rows: List[Dict[str, Any]]) -> None:
+    # executemany-style core insert, chunked so huge catalogs don't build one giant batch
+    for chunk in _chunks(rows, settings.persist_chunk_size):
+        db.execute(insert(model), chunk)
+
+def _insert_products(db: Session, rows: List[Dict[str, Any]], after_id: int) -> Dict[Any, int]:
+    """Insert new product rows; returns their ids by product key."""
+    key_columns = (models.Product.id, models.Product.handle, models.Product.url, models.Product.title)
+    if db.get_bind().dialect.insert_executemany_returning:
+        ids: Dict[Any, int] = {}
+        for chunk in _chunks(rows, settings.persist_chunk_size):
+            for row in db.execute(insert(models.Product).returning(*key_columns), chunk).mappings():
+                ids[_product_key(row)] = row["id"]
+        return ids
+    # no RETURNING with executemany: read the brand's rows added after `after_id` back
+    _bulk_insert(db, models.Product, rows)
+    if not rows:
+        return {}
+    query = select(*key_columns).where(models.Product.brand_id == rows[0]["brand_id"], models.Product.id > after_id)
+    return {_product_key(row): row["id"] for row in db.execute(query).mappings()}
+
+PRODUCT_FIELDS = ("handle", "title", "vendor", "product_type", "tags", "price_range", "images_json", "url")
+
+def _content_hash(values: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps([values[f] for f in PRODUCT_FIELDS]).encode()).hexdigest()
+
+def _product_row(brand_id: Optional[int], p: Product) -> Dict[str, Any]:
+    row = {
+        "brand_id": brand_id,
+        "handle": p.handle,
+        "title": p.title,
+        "vendor": p.vendor,
+        "product_type": p.product_type,
+        "tags": ",".join(p.tags) if p.tags else None,
+        "price_range": str(p.price_range) if p.price_range else None,
+        "images_json": str(p.images) if p.images else None,
+        "url": p.url,
+        "updated_at": p.updated_at,
+    }
+    row["content_hash"] = _content_hash(row)
+    return row
+
+def catalog_complete(ctx: BrandContext) -> bool:
+    return ctx.scrape_meta is None or ctx.scrape_meta.catalog_complete
+
+def _product_key(row: Dict[str, Any]) -> Any:
+    return row["handle"] or row["url"] or row["title"]
+
+def _incoming_products(products: List[Product]) -> Dict[Any, Dict[str, Any]]:
+    # Rows and hashes are built before the write transaction starts (brand_id is set later)
+    incoming: Dict[Any, Dict[str, Any]] = {}
+    for p in products:
+        row = _product_row(None, p)
+        incoming[_product_key(row)] = row
+    return incoming
+
+def _sync_products(db: Session, brand_id: int, incoming: Dict[Any, Dict[str, Any]], complete: bool = True) -> Dict[str, int]:
+    """
+    Diff the scraped catalog against stored rows by content hash. Only added,
+    changed and removed products are written, and each one is recorded in the
+    product_changes feed. An incomplete catalog (complete=False) adds and
+    updates but removes nothing: missing products were just not fetched.
+    """
+    now = time.time()
+    for row in incoming.values():
+        row["brand_id"] = brand_id
+
+    columns = [getattr(models.Product, f) for f in PRODUCT_FIELDS]
+    existing: Dict[Any, Tuple[int, Optional[str], Optional[str], Dict[str, Any]]] = {}
+    duplicate_ids: List[int] = []
+    query = select(models.Product.id, models.Product.content_hash, models.Product.updated_at, *columns)
+    for row in db.execute(query.where(models.Product.brand_id == brand_id)):
+        values = dict(zip(PRODUCT_FIELDS, row[3:]))
+        key = _product_key(values)
+        if key in existing:
+            duplicate_ids.append(row.id)  # left by older full rewrites
+            continue
+        existing[key] = (row.id, row.content_hash, row.updated_at, values)
+
+    max_id = max([current[0] for current in existing.values()] + duplicate_ids, default=0)
+    to_insert, to_update, to_refresh, changes = [], [], [], []
+    added: List[Tuple[Any, Dict[str, Any]]] = []  # filled in with the new rows' ids after the insert
+    for key, row in incoming.items():
+        current = existing.pop(key, None)
+        if current is None:
+            to_insert.append(row)
+            change = {"brand_id": brand_id, "product_id": None, "handle": row["handle"], "change": "added",
+                      "fields": None, "content_hash": row["content_hash"], "changed_at": now}
+            changes.append(change)
+            added.append((key, change))
+            continue
+        product_id, stored_hash, updated_at, values = current
+        if (stored_hash or _content_hash(values)) != row["content_hash"]:
+            fields = [f for f in PRODUCT_FIELDS if values[f] != row[f]]
+            changes.append({"brand_id": brand_id, "product_id": product_id, "handle": row["handle"], "change": "changed",
+                            "fields": ",".join(fields), "content_hash": row["content_hash"], "changed_at": now})
+            to_update.append({"id": product_id, **row})
+        elif stored_hash is None or updated_at != row["updated_at"]:
+            # same content; backfill the hash or take the new updated_at
+            to_refresh.append({"id": product_id, "content_hash": row["content_hash"], "updated_at": row["updated_at"]})
+    if not complete:
+        existing = {}
+    for product_id, stored_hash, _, values in existing.values():
+        changes.append({"brand_id": brand_id, "product_id": product_id, "handle": values["handle"], "change": "removed",
+                        "fields": None, "content_hash": stored_hash, "changed_at": now})
+    stale_ids = duplicate_ids + [product_id for product_id, _, _, _ in existing.values()]
+
+    ids = _insert_products(db, to_insert, max_id)
+    for key, change in added:
+        change["product_id"] = ids.get(key)
+    # bulk UPDATE by primary key; refreshes leave the indexed text columns alone
+    for rows in (to_update, to_refresh):
+        for chunk in _chunks(rows, settings.persist_chunk_size):
+            db.execute(update(models.Product), chunk)
+    for i in range(0, len(stale_ids), settings.persist_chunk_size):
+        db.execute(delete(models.Product).where(models.Product.id.in_(stale_ids[i:i + settings.persist_chunk_size])))
+    _bulk_insert(db, models.ProductChange, changes)
+
+    return {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "deleted": len(stale_ids),
+        "unchanged": len(incoming) - len(to_insert) - len(to_update),
+        "refreshed": len(to_refresh),
+    }
+
+def product_changes(db: Session, brand_id: int, since: float = 0.0, after_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+    """
+    Page through a brand's change feed, oldest first. `since` is a unix time;
+    pass the returned next_after_id back as `after_id` to continue.
+    """
+    rows = db.execute(
+        select(models.ProductChange)
+        .where(models.ProductChange.brand_id == brand_id,
+               models.ProductChange.changed_at >= since,
+               models.ProductChange.id > after_id)
+        .order_by(models.ProductChange.id)
+        .limit(limit)
+    ).scalars().all()
+    return {
+        "brand_id": brand_id,
+        "changes": [
+            {
+                "id": c.id,
+                "change": c.change,
+                "product_id": c.product_id,
+                "handle": c.handle,
+                "fields": c.fields.split(",") if c.fields else [],
+                "content_hash": c.content_hash,
+                "changed_at": c.changed_at,
+            }
+            for c in rows
+        ],
+        "next_after_id": rows[-1].id if rows else after_id,
+        "has_more": len(rows) == limit,
+    }
+
+def persist_brand_context(db: Session, ctx: BrandContext, commit: bool = True) -> Dict[str, Any]:
+    """
+    Write a scraped brand in a single transaction; returns row counts and elapsed seconds.
+    With commit=False the caller owns the transaction (the writer thread batches commits).
+    """
+    started = time.perf_counter()
+    try:
+        stats = _persist(db, ctx)
+        if commit:
+            db.commit()
+    except Exception:
+        if commit:
+            db.rollback()
+        raise
+    stats["seconds"] = round(time.perf_counter() - started, 4)
+    return stats
+
+def _persist(db: Session, ctx: BrandContext) -> Dict[str, Any]:
+    # CPU work first: on SQLite the first query below takes the write lock
+    incoming = _incoming_products(ctx.product_catalog)
+
+    # A cached result keeps the time it was scraped, so re-submitting it neither
+    # makes the stored brand look fresher nor overwrites a newer scrape
+    scraped_at = (ctx.scrape_meta.scraped_at if ctx.scrape_meta is not None else None) or time.time()
+
+    # Upsert brand by website
+    brand = db.query(models.Brand).filter(models.Brand.website == ctx.website).one_or_none()
+    if brand is None:
+        brand = models.Brand(name=ctx.brand_name, website=ctx.website, scraped_at=scraped_at)
+        db.add(brand)
+        db.flush()
+    elif brand.scraped_at is not None and scraped_at <= brand.scraped_at:
+        return {"brand_id": brand.id, "inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0,
+                "refreshed": 0, "skipped": True}
+    else:
+        brand.name = ctx.brand_name
+        brand.scraped_at = scraped_at
+
+    meta = ctx.scrape_meta
+    stats: Dict[str, Any] = {"brand_id": brand.id, **_sync_products(db, brand.id, incoming, catalog_complete(ctx))}
+
+    # Small child tables are simply replaced, except those whose stage ran out of
+    # time: their stored rows are kept rather than wiped by a partial result
+    cut = set(meta.cut_stages) if meta is not None else set()
+    replaced = {"faqs": models.FAQ, "policies": models.Policy, "about": models.About}
+    kept = {model for stage, model in replaced.items() if stage in cut}
+    for model in (models.FAQ, models.Policy, models.Social, models.Contact, models.Link, models.About):
+        if model not in kept:
+            db.execute(delete(model).where(model.brand_id == brand.id))
+
+    if models.FAQ not in kept:
+        _bulk_insert(db, models.FAQ, [
+            {"brand_id": brand.id, "question": f.question, "answer": f.answer, "url": f.url}
+            for f in ctx.faqs
+        ])
+
+    policies = []
+    if ctx.policies.privacy_policy:
+        policies.append({"brand_id": brand.id, "kind": "privacy", "url": ctx.policies.privacy_policy.url, "content": ctx.policies.privacy_policy.content})
+    if ctx.policies.return_policy:
+        policies.append({"brand_id": brand.id, "kind": "return", "url": ctx.policies.return_policy.url, "content": ctx.policies.return_policy.content})
+    if models.Policy not in kept:
+        _bulk_insert(db, models.Policy, policies)
+
+    socials = ctx.social_handles.model_dump(exclude_none=True)
+    _bulk_insert(db, models.Social, [
+        {"brand_id": brand.id, "platform": platform, "url": url} for platform, url in socials.items()
+    ])
+
+    contacts = [{"brand_id": brand.id, "kind": "email", "value": e} for e in ctx.contact_details.emails]
+    contacts += [{"brand_id": brand.id, "kind": "phone", "value": p} for p in ctx.contact_details.phones]
+    _bulk_insert(db, models.Contact, contacts)
+
+    links = []
+    if ctx.important_links:
+        for label in ("order_tracking", "contact_us", "blogs"):
+            url = getattr(ctx.important_links, label)
+            if url:
+                links.append({"brand_id": brand.id, "label": label, "url": url})
+        for url in (ctx.important_links.others or [])[:50]:
+            links.append({"brand_id": brand.id, "label": None, "url": url})
+    _bulk_insert(db, models.Link, links)
+
+    if ctx.about_us and models.About not in kept:
+        _bulk_insert(db, models.About, [{"brand_id": brand.id, "url": ctx.about_us.url, "content": ctx.about_us.content}])
+
+    db.flush()
+    return stats
+
+async def fetch_and_optionally_persist(
+    website_url: str,
+    persist: bool = False,
+    force_refresh: bool = False,
+    wait_for_persist: bool = True,
+) -> BrandContext:
+    ctx = await brand_cache.get(website_url, build_brand_context, force_refresh=force_refresh)
+
+    if persist:
+        # Persistence runs on the writer thread, never on the event loop
+        job = await persist_writer.submit(ctx)
+        if ctx.scrape_meta is not None:
+            ctx.scrape_meta.persist_job_id = job.id
+        if wait_for_persist:
+            stats = await job.wait()
+            if ctx.scrape_meta is not None:
+                ctx.scrape_meta.persist_stats = stats
 
     return ctx
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import asyncio, logging, os, random, socket, time, uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.db import WriteSessionLocal
+from app.models import models
+from app.scraper.utils import normalize_base
+from app.services.insights_service import fetch_and_optionally_persist
+
+logger = logging.getLogger(__name__)
+
+def enqueue(db: Session, website_url: str, priority: int = 0, interval_seconds: Optional[float] = None, run_at: Optional[float] = None) -> models.ScrapeJob:
+    """Create or update the recurring job for a store."""
+    website = normalize_base(website_url)
+    job = db.query(models.ScrapeJob).filter(models.ScrapeJob.website_url == website).one_or_none()
+    if job is None:
+        job = models.ScrapeJob(website_url=website, attempts=0, runs=0)
+        db.add(job)
+    job.priority = priority
+    job.interval_seconds = interval_seconds or settings.job_default_interval_seconds
+    job.next_run_at = run_at if run_at is not None else time.time()
+    db.commit()
+    return job
+
+def _available(now: float):
+    return or_(models.ScrapeJob.lease_expires_at.is_(None), models.ScrapeJob.lease_expires_at < now)
+
+def claim(db: Session, worker_id: str, limit: int) -> List[models.ScrapeJob]:
+    """
+    Lease up to `limit` due jobs. Each lease is a compare-and-set UPDATE, so
+    several worker processes can share the table without double-claiming.
+    """
+    now = time.time()
+    candidates = db.execute(
+        select(models.ScrapeJob.id)
+        .where(models.ScrapeJob.next_run_at <= now, _available(now))
+        .order_by(models.ScrapeJob.priority.desc(), models.ScrapeJob.next_run_at)
+        .limit(limit * 2)
+    ).scalars().all()
+    claimed: List[int] = []
+    for job_id in candidates:
+        result = db.execute(
+            update(models.ScrapeJob)
+            .where(models.ScrapeJob.id == job_id, _available(now))
+            .values(lease_owner=worker_id, lease_expires_at=now + settings.job_lease_seconds)
+        )
+        db.commit()
+        if result.rowcount == 1:
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    if not claimed:
+        return []
+    return db.query(models.ScrapeJob).filter(models.ScrapeJob.id.in_(claimed)).all()
+
+def complete(db: Session, job_id: int, worker_id: str, changed: bool) -> None:
+    """Release the lease and adapt the interval: halve it when the store changed, stretch it when not."""
+    job = db.get(models.ScrapeJob, job_id)
+    if job is None or job.lease_owner != worker_id:
+        return
+    now = time.time()
+    factor = 0.5 if changed else 1.5
+    job.interval_seconds = min(settings.job_max_interval_seconds, max(settings.job_min_interval_seconds, job.interval_seconds * factor))
+    job.next_run_at = now + job.interval_seconds
+    job.last_run_at = now
+    if changed:
+        job.last_changed_at = now
+    job.runs = (job.runs or 0) + 1
+    job.attempts = 0
+    job.last_error = None
+    job.lease_owner = None
+    job.lease_expires_at = None
+    db.commit()
+
+def fail(db: Session, job_id: int, worker_id: str, error: str) -> None:
+    """Release the lease and retry with jittered exponential backoff."""
+    job = db.get(models.ScrapeJob, job_id)
+    if job is None or job.lease_owner != worker_id:
+        return
+    job.attempts = (job.attempts or 0) + 1
+    backoff = min(settings.job_max_backoff_seconds, settings.job_retry_base_seconds * 2 ** (job.attempts - 1))
+    if job.attempts > settings.job_max_attempts:
+        # give up retrying for now; try again on the normal schedule
+        backoff = job.interval_seconds
+        job.attempts = 0
+    job.next_run_at = time.time() + backoff * random.uniform(0.5, 1.5)
+    job.last_error = error[:2000]
+    job.lease_owner = None
+    job.lease_expires_at = None
+    db.commit()
+
+def metrics(db: Session) -> Dict[str, Any]:
+    now = time.time()
+    total = db.scalar(select(func.count(models.ScrapeJob.id))) or 0
+    due_filter = (models.ScrapeJob.next_run_at <= now, _available(now))
+    due = db.scalar(select(func.count(models.ScrapeJob.id)).where(*due_filter)) or 0
+    leased = db.scalar(select(func.count(models.ScrapeJob.id)).where(models.ScrapeJob.lease_expires_at >= now)) or 0
+    oldest_due = db.scalar(select(func.min(models.ScrapeJob.next_run_at)).where(*due_filter))
+    retrying = db.scalar(select(func.count(models.ScrapeJob.id)).where(models.ScrapeJob.attempts > 0)) or 0
+    return {
+        "jobs": total,
+        "queue_depth": due,
+        "leased": leased,
+        "retrying": retrying,
+        "lag_seconds": round(now - oldest_due, 3) if oldest_due is not None else 0.0,
+    }
+
+def _with_session(fn, *args):
+    db = WriteSessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def _run_job(job_id: int, website_url: str, worker_id: str) -> None:
+    try:
+        ctx = await fetch_and_optionally_persist(website_url, persist=True, force_refresh=True)
+        stats = (ctx.scrape_meta.persist_stats if ctx.scrape_meta else None) or {}
+        changed = any(stats.get(k) for k in ("inserted", "updated", "deleted"))
+        await asyncio.to_thread(_with_session, complete, job_id, worker_id, changed)
+    except Exception as e:
+        logger.warning("Job %s (%s) failed: %s", job_id, website_url, e)
+        await asyncio.to_thread(_with_session, fail, job_id, worker_id, f"{type(e).__name__}: {e}")
+
+async def run_worker(concurrency: Optional[int] = None, stop: Optional[asyncio.Event] = None, worker_id: Optional[str] = None) -> None:
+    """Poll the queue and run due jobs, at most `concurrency` at a time, until `stop` is set."""
+    concurrency = concurrency or settings.job_worker_concurrency
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    stop = stop or asyncio.Event()
+    running: set = set()
+    while not stop.is_set():
+        free = concurrency - len(running)
+        jobs = await asyncio.to_thread(_with_session, claim, worker_id, free) if free > 0 else []
+        for job in jobs:
+            task = asyncio.ensure_future(_run_job(job.id, job.website_url, worker_id))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if not jobs:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(0)
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,370 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from app.config import settings
+from app.models.schemas import Product
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: a single writing process is assumed
+    fcntl = None
+
+try:  # optional: without numpy no price history is kept
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# One .npy file per column per segment. Prices are integer cents; -1 means unknown.
+COLUMNS = {
+    "observed_at": "int64",  # unix seconds
+    "brand_id": "int32",
+    "product_id": "int64",   # Shopify ids
+    "variant_id": "int64",
+    "price": "int32",
+    "prev_price": "int32",   # the variant's price at its previous observation, -1 if first seen
+    "compare_at": "int32",
+    "available": "int8",     # 1 / 0 / -1
+}
+MANIFEST = "manifest.json"
+LATEST = ("latest_variants.npy", "latest_prices.npy")
+WRITER_LOCK = "writer.lock"
+SPOOL = "spool"  # batches appended by processes that are not the writer
+
+def price_history_available() -> bool:
+    return np is not None and bool(settings.price_history_path)
+
+def _cents(value: Optional[float]) -> int:
+    return int(round(value * 100)) if value is not None else -1
+
+class PriceHistory:
+    """
+    Append-only, columnar history of variant prices.
+
+    Observations are buffered and sealed into immutable segments (a directory of
+    column arrays) of `segment_rows`. Each row carries the variant's previous
+    price, so "what changed since T" is a vectorised scan of the segments whose
+    time range reaches T, with no sort or join. The last price per variant is
+    kept as two sorted arrays and saved with the newest segment.
+
+    One process seals segments (it holds writer.lock); any number may read.
+    The others (e.g. extra uvicorn workers) spool their batches to spool/,
+    which the writer folds in, oldest first, whenever it appends, flushes or
+    reads; a spool file is deleted only once its rows are in a sealed segment.
+    If the writer exits, the next process to append takes the lock over.
+    Segment names are unique, so an unlisted one left by a crash is simply
+    removed when the writer next opens the directory.
+    """
+
+    def __init__(self, path: str, segment_rows: int = 1_000_000, flush_seconds: float = 60.0):
+        self.path = path
+        self.segment_rows = segment_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.RLock()
+        self._opened = False
+
+    # storage
+    def _open(self) -> None:
+        if self._opened:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self.segments: List[Dict[str, Any]] = []
+        self._manifest_mtime = None
+        self._load_manifest()
+        self._writer = None  # lock file handle once this process is the writer
+        self._lock_file = None
+        self._spooled: List[str] = []  # spool files folded into the buffer, deleted at the next flush
+        self._variants = np.zeros(0, dtype=np.int64)
+        self._prices = np.zeros(0, dtype=np.int32)
+        self._buffer: List[Dict[str, "np.ndarray"]] = []
+        self._buffered = 0
+        self._buffer_started = 0.0
+        self._columns: Dict[str, Dict[str, "np.ndarray"]] = {}  # segment name -> memory-mapped columns
+        self._opened = True
+
+    def _load_manifest(self) -> None:
+        # readers in other processes pick up segments sealed since they last looked
+        manifest = os.path.join(self.path, MANIFEST)
+        try:
+            mtime = os.stat(manifest).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            with open(manifest, encoding="utf-8") as fh:
+                self.segments = json.load(fh)["segments"]
+            self._manifest_mtime = mtime
+
+    def writable(self) -> bool:
+        """
+        Whether this process seals segments: takes the directory's writer lock if
+        it is free (again on every call while another process holds it, so the
+        role moves on when that process exits).
+        """
+        with self._lock:
+            self._open()
+            if self._writer is None:
+                if self._lock_file is None:
+                    self._lock_file = open(os.path.join(self.path, WRITER_LOCK), "a+")
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return False
+                self._writer = self._lock_file
+                self._load_manifest()
+                if self.segments:
+                    newest = os.path.join(self.path, self.segments[-1]["name"])
+                    self._variants = np.load(os.path.join(newest, LATEST[0]))
+                    self._prices = np.load(os.path.join(newest, LATEST[1]))
+                # segments sealed but never listed (a crash before the manifest write)
+                listed = {s["name"] for s in self.segments}
+                for entry in os.listdir(self.path):
+                    if entry.startswith("seg-") and entry not in listed:
+                        shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+            return True
+
+    def _spool(self, rows: Dict[str, "np.ndarray"]) -> None:
+        directory = os.path.join(self.path, SPOOL)
+        os.makedirs(directory, exist_ok=True)
+        name = os.path.join(directory, f"{time.time_ns():020d}-{os.getpid()}")
+        with open(name + ".tmp", "wb") as fh:
+            np.savez(fh, **rows)
+        os.replace(name + ".tmp", name + ".npz")
+
+    def _drain_spool(self) -> None:
+        # writer only: fold in other processes' batches in the order they were spooled
+        directory = os.path.join(self.path, SPOOL)
+        try:
+            names = sorted(n for n in os.listdir(directory) if n.endswith(".npz"))
+        except FileNotFoundError:
+            return
+        done = set(self._spooled)
+        for name in names:
+            path = os.path.join(directory, name)
+            if path in done:
+                continue
+            try:
+                with np.load(path) as data:
+                    rows = {c: data[c] for c in data.files}
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable price history spool file %s: %s", path, e)
+                continue
+            self._spooled.append(path)
+            self._ingest(rows)
+
+    def _segment(self, name: str) -> Dict[str, "np.ndarray"]:
+        columns = self._columns.get(name)
+        if columns is None:
+            directory = os.path.join(self.path, name)
+            columns = self._columns[name] = {
+                c: np.load(os.path.join(directory, f"{c}.npy"), mmap_mode="r") for c in COLUMNS
+            }
+        return columns
+
+    def flush(self) -> None:
+        """Seal buffered observations (and, in the writer, spooled ones) into a segment."""
+        with self._lock:
+            if not self._opened or not self._writer:
+                return
+            self._drain_spool()
+            if not self._buffered:
+                return
+            rows = {c: np.concatenate([chunk[c] for chunk in self._buffer]) for c in COLUMNS}
+            name = f"seg-{time.time_ns():020d}-{os.getpid()}"
+            directory = os.path.join(self.path, name)
+            staging = directory + ".tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for c, values in rows.items():
+                np.save(os.path.join(staging, f"{c}.npy"), values)
+            np.save(os.path.join(staging, LATEST[0]), self._variants)
+            np.save(os.path.join(staging, LATEST[1]), self._prices)
+            os.replace(staging, directory)
+
+            times = rows["observed_at"]
+            self.segments.append({"name": name, "rows": int(len(times)),
+                                  "t_min": int(times.min()), "t_max": int(times.max())})
+            tmp = os.path.join(self.path, MANIFEST + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"columns": COLUMNS, "segments": self.segments}, fh)
+            os.replace(tmp, os.path.join(self.path, MANIFEST))
+            self._manifest_mtime = os.stat(os.path.join(self.path, MANIFEST)).st_mtime_ns
+            for path in self._spooled:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._spooled = []
+            # only the newest segment needs the latest-price snapshot
+            if len(self.segments) > 1:
+                previous = os.path.join(self.path, self.segments[-2]["name"])
+                for filename in LATEST:
+                    try:
+                        os.remove(os.path.join(previous, filename))
+                    except FileNotFoundError:
+                        pass
+            self._buffer, self._buffered = [], 0
+
+    # ingest
+    def append(self, columns: Dict[str, "np.ndarray"]) -> None:
+        """
+        Append observations given as column arrays (every COLUMNS key except
+        prev_price). Rows may be in any order and repeat a variant. Outside the
+        writer process they are spooled for the writer.
+        """
+        with self._lock:
+            if not len(columns["variant_id"]):
+                return
+            if not self.writable():
+                self._spool({c: np.asarray(columns[c], dtype=COLUMNS[c]) for c in COLUMNS if c != "prev_price"})
+                return
+            self._drain_spool()
+            self._ingest(columns)
+            if self._buffered >= self.segment_rows or time.time() - self._buffer_started >= self.flush_seconds:
+                self.flush()
+
+    def _ingest(self, columns: Dict[str, "np.ndarray"]) -> None:
+        # caller holds self._lock
+        n = len(columns["variant_id"])
+        order = np.lexsort((columns["observed_at"], columns["variant_id"]))
+        rows = {c: np.asarray(columns[c], dtype=COLUMNS[c])[order] for c in COLUMNS if c != "prev_price"}
+        variants, prices = rows["variant_id"], rows["price"]
+
+        # previous price: the row before within the batch, else the stored last price
+        first = np.ones(n, dtype=bool)
+        first[1:] = variants[1:] != variants[:-1]
+        prev = np.empty(n, dtype=np.int32)
+        prev[1:] = prices[:-1]
+        prev[first] = self._lookup(variants[first])
+        rows["prev_price"] = prev
+
+        # fold each variant's last price in this batch into the sorted state
+        last = np.ones(n, dtype=bool)
+        last[:-1] = variants[:-1] != variants[1:]
+        keys, values = variants[last], prices[last]
+        pos = np.searchsorted(self._variants, keys)
+        hit = pos < len(self._variants)
+        hit[hit] = self._variants[pos[hit]] == keys[hit]
+        self._prices[pos[hit]] = values[hit]
+        self._variants = np.insert(self._variants, pos[~hit], keys[~hit])
+        self._prices = np.insert(self._prices, pos[~hit], values[~hit])
+
+        if not self._buffered:
+            self._buffer_started = time.time()
+        self._buffer.append(rows)
+        self._buffered += n
+
+    def _lookup(self, variants: "np.ndarray") -> "np.ndarray":
+        if not len(self._variants):
+            return np.full(len(variants), -1, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self._variants, variants), len(self._variants) - 1)
+        return np.where(self._variants[pos] == variants, self._prices[pos], -1).astype(np.int32)
+
+    def record(self, brand_id: int, products: Sequence[Product], observed_at: Optional[float] = None) -> int:
+        """Append one scrape's variant prices; returns the number of observations."""
+        rows = [
+            (p.id, v.id, _cents(v.price), _cents(v.compare_at_price), -1 if v.available is None else int(v.available))
+            for p in products for v in (p.variants or [])
+            if p.id is not None and v.id is not None and v.price is not None
+        ]
+        if not rows:
+            return 0
+        product_ids, variant_ids, prices, compare_at, available = zip(*rows)
+        self.append({
+            "observed_at": np.full(len(rows), int(observed_at or time.time()), dtype=np.int64),
+            "brand_id": np.full(len(rows), brand_id, dtype=np.int32),
+            "product_id": np.asarray(product_ids, dtype=np.int64),
+            "variant_id": np.asarray(variant_ids, dtype=np.int64),
+            "price": np.asarray(prices, dtype=np.int32),
+            "compare_at": np.asarray(compare_at, dtype=np.int32),
+            "available": np.asarray(available, dtype=np.int8),
+        })
+        return len(rows)
+
+    # queries
+    def changes(self, since: float, until: Optional[float] = None, brand_id: Optional[int] = None) -> Dict[str, "np.ndarray"]:
+        """Column arrays of every observation in [since, until) whose price differed from the one before."""
+        with self._lock:
+            self._open()
+            if self._writer:
+                self._drain_spool()
+            else:
+                self._load_manifest()
+            sources = [self._segment(s["name"]) for s in self.segments
+                       if s["t_max"] >= since and (until is None or s["t_min"] < until)]
+            sources += self._buffer
+        parts: List[Dict[str, "np.ndarray"]] = []
+        for cols in sources:
+            times = cols["observed_at"]
+            mask = (cols["price"] != cols["prev_price"]) & (cols["prev_price"] >= 0) & (times >= since)
+            if until is not None:
+                mask &= times < until
+            if brand_id is not None:
+                mask &= cols["brand_id"] == brand_id
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                parts.append({c: np.asarray(cols[c][rows]) for c in COLUMNS})
+        if not parts:
+            return {c: np.zeros(0, dtype=t) for c, t in COLUMNS.items()}
+        return {c: np.concatenate([part[c] for part in parts]) for c in COLUMNS}
+
+    def changes_frame(self, since: float, until: Optional[float] = None, brand_id: Optional[int] = None):
+        """changes() as a pandas DataFrame, prices in currency units."""
+        import pandas as pd
+
+        cols = self.changes(since, until, brand_id)
+        frame = pd.DataFrame(cols)
+        for c in ("price", "prev_price", "compare_at"):
+            frame[c] = frame[c].where(frame[c] >= 0) / 100
+        frame["observed_at"] = pd.to_datetime(frame["observed_at"], unit="s", utc=True)
+        return frame
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._open()
+            return {"segments": len(self.segments), "rows": sum(s["rows"] for s in self.segments),
+                    "buffered": self._buffered, "variants": len(self._variants)}
+
+price_history = PriceHistory(
+    settings.price_history_path or "price_history",
+    settings.price_history_segment_rows,
+    settings.price_history_flush_seconds,
+)
+
+def on_persisted(brand_id: int, products: Sequence[Product], observed_at: Optional[float] = None) -> None:
+    """Writer-thread hook: append a committed scrape's variant prices, as of its scrape time."""
+    if price_history_available():
+        price_history.record(brand_id, products, observed_at)
+
+def recent_changes(days: float = 7.0, brand_id: Optional[int] = None, limit: int = 1000) -> Dict[str, Any]:
+    """Price changes across all brands (or one) in the last `days`, newest first."""
+    since = time.time() - days * 86400
+    cols = price_history.changes(since, brand_id=brand_id)
+    newest = np.argsort(-cols["observed_at"], kind="stable")[:limit]
+
+    def money(cents: int) -> Optional[float]:
+        return cents / 100 if cents >= 0 else None
+
+    return {
+        "since": since,
+        "total": int(len(cols["observed_at"])),
+        "changes": [
+            {
+                "brand_id": int(cols["brand_id"][i]),
+                "product_id": int(cols["product_id"][i]),
+                "variant_id": int(cols["variant_id"][i]),
+                "old_price": money(int(cols["prev_price"][i])),
+                "new_price": money(int(cols["price"][i])),
+                "compare_at_price": money(int(cols["compare_at"][i])),
+                "available": None if cols["available"][i] < 0 else bool(cols["available"][i]),
+                "changed_at": int(cols["observed_at"][i]),
+            }
+            for i in newest.tolist()
+        ],
+    }
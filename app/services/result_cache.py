@@ -0,0 +1,103 @@
+from __future__ import annotations
+import asyncio, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+from app.config import settings
+from app.models.schemas import BrandContext
+from app.scraper.utils import normalize_base
+
+SIZE_SAMPLE = 32
+
+def estimated_size(ctx: BrandContext) -> int:
+    """
+    Serialised size of `ctx`, a proxy for the memory it holds. The catalog is
+    sampled: dumping a 10k-SKU store whole would stall the event loop for ~80ms.
+    """
+    products = ctx.product_catalog
+    size = len(ctx.model_dump_json(exclude={"product_catalog"}))
+    if products:
+        sample = products[::max(1, len(products) // SIZE_SAMPLE)][:SIZE_SAMPLE]
+        size += sum(len(p.model_dump_json()) for p in sample) * len(products) // len(sample)
+    return size
+
+class BrandResultCache:
+    """
+    In-process cache of scraped BrandContexts keyed by normalized store base.
+
+    - fresh (age < fresh_seconds): returned as-is
+    - stale (age < fresh_seconds + stale_seconds): returned as-is, refreshed in the background
+    - missing/expired: scraped now
+    Concurrent requests for the same store share a single in-flight scrape.
+    Entries are evicted least recently used first.
+    """
+    def __init__(self, fresh_seconds: float, stale_seconds: float, max_entries: int, max_bytes: int):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[BrandContext, float, int]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, website_url: str, loader: Callable[[str], Awaitable[BrandContext]], force_refresh: bool = False) -> BrandContext:
+        base = normalize_base(website_url)
+        entry = None if force_refresh else self._entries.get(base)
+        if entry is not None:
+            ctx, stored_at, _ = entry
+            age = time.time() - stored_at
+            self._entries.move_to_end(base)
+            if age < self.fresh_seconds:
+                return self._copy(ctx, "fresh")
+            if age < self.fresh_seconds + self.stale_seconds:
+                self._start(base, website_url, loader)
+                return self._copy(ctx, "stale")
+        task = self._start(base, website_url, loader)
+        # shield: one caller disconnecting must not cancel the scrape others are waiting on
+        ctx = await asyncio.shield(task)
+        return self._copy(ctx, "miss")
+
+    def _start(self, base: str, website_url: str, loader: Callable[[str], Awaitable[BrandContext]]) -> asyncio.Task:
+        task = self._inflight.get(base)
+        if task is None:
+            task = asyncio.ensure_future(loader(website_url))
+            self._inflight[base] = task
+            task.add_done_callback(lambda t: self._finish(base, t))
+        return task
+
+    def _finish(self, base: str, task: asyncio.Task) -> None:
+        self._inflight.pop(base, None)
+        if task.cancelled() or task.exception() is not None:
+            # failed background refreshes keep serving the previous entry
+            return
+        self.invalidate(base)
+        ctx = task.result()
+        size = estimated_size(ctx)
+        if size > self.max_bytes:
+            return
+        self._entries[base] = (ctx, time.time(), size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def invalidate(self, website_url: str) -> None:
+        entry = self._entries.pop(normalize_base(website_url), None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    @staticmethod
+    def _copy(ctx: BrandContext, status: str) -> BrandContext:
+        # Callers only mutate scrape_meta (errors, persist ids), so that is the one
+        # part copied; the catalog and other lists are shared and must stay read-only
+        if ctx.scrape_meta is None:
+            return ctx.model_copy()
+        meta = ctx.scrape_meta.model_copy(deep=True)
+        meta.result_cache = status
+        return ctx.model_copy(update={"scrape_meta": meta})
+
+brand_cache = BrandResultCache(
+    settings.result_cache_fresh_seconds,
+    settings.result_cache_stale_seconds,
+    settings.result_cache_max_entries,
+    settings.result_cache_max_bytes,
+)
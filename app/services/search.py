@@ -0,0 +1,105 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.fts import FILTER_COLUMN, FTS_TABLES
+
+# kind -> (FTS index, content column shown as the hit's title)
+SEARCH_KINDS = {
+    "products": ("products_fts", "title"),
+    "faqs": ("faqs_fts", "question"),
+    "policies": ("policies_fts", "kind"),
+}
+
+SEARCH_MODES = ("all", "any", "phrase")
+SEARCH_BY = ("hit", "brand")
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+def search_available(db: Session) -> bool:
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    names = [name for name, _ in SEARCH_KINDS.values()]
+    found = db.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN (%s)" % ", ".join(f"'{n}'" for n in names))
+    ).scalar()
+    return found == len(names)
+
+def match_expression(q: str, mode: str = "all") -> str:
+    """
+    Turn free text into an FTS5 query: every word is quoted (so user input can
+    never be FTS syntax) and joined as AND ("all"), OR ("any") or one phrase.
+    A trailing * on a word keeps prefix matching.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode} (expected one of {', '.join(SEARCH_MODES)})")
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        for token in TERM_RE.findall(word):
+            terms.append(f'"{token}"')
+        if prefix and terms:
+            terms[-1] += "*"
+    if not terms:
+        raise ValueError("Query has no searchable terms")
+    if mode == "phrase":
+        return '"' + " ".join(t.strip('"*') for t in terms) + '"'
+    return (" OR " if mode == "any" else " ").join(terms)
+
+def _hits_sql(kind: str, snippets: bool, top_n: bool) -> str:
+    index, title_col = SEARCH_KINDS[kind]
+    table = FTS_TABLES[index][0]
+    snippet = f"snippet({index}, -1, '[', ']', '…', 16)" if snippets else "NULL"
+    # rank is the index's configured bm25; a brand filter is part of :q, so
+    # only the top `limit` matches per kind are ever joined back to the content table
+    matches = (
+        f"SELECT rowid, rank, {snippet} AS snippet FROM {index} WHERE {index} MATCH :q"
+        + (" ORDER BY rank LIMIT :limit" if top_n else "")
+    )
+    return (
+        f"SELECT '{kind}' AS kind, c.id AS id, c.brand_id AS brand_id, c.url AS url, c.{title_col} AS title, "
+        f"f.rank AS rank, f.snippet AS snippet FROM ({matches}) f JOIN {table} c ON c.id = f.rowid"
+    )
+
+def search(
+    db: Session,
+    q: str,
+    kinds: Sequence[str] = tuple(SEARCH_KINDS),
+    brand_id: Optional[int] = None,
+    limit: int = 20,
+    mode: str = "all",
+    by: str = "hit",
+) -> Dict[str, Any]:
+    """
+    Ranked full-text search across products, FAQs and policies (lower bm25
+    rank = better). by="hit" returns the best matching rows with snippets;
+    by="brand" returns brands ordered by their best hit, with hit counts.
+    """
+    unknown = [k for k in kinds if k not in SEARCH_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown search kinds: {', '.join(unknown)}")
+    if by not in SEARCH_BY:
+        raise ValueError(f"Unknown search grouping: by={by} (expected one of {', '.join(SEARCH_BY)})")
+    # the query's terms never match the brand id column; a brand filter does
+    expression = f"- {{{FILTER_COLUMN}}} : ({match_expression(q, mode)})"
+    if brand_id is not None:
+        expression = f'{FILTER_COLUMN} : "{int(brand_id)}" AND {expression}'
+    params: Dict[str, Any] = {"q": expression, "limit": limit}
+    hits = " UNION ALL ".join(_hits_sql(kind, snippets=by == "hit", top_n=by == "hit") for kind in kinds)
+
+    if by == "brand":
+        sql = (
+            f"SELECT h.brand_id, b.name, b.website, count(*) AS hits, min(h.rank) AS best_rank "
+            f"FROM ({hits}) h JOIN brands b ON b.id = h.brand_id "
+            f"GROUP BY h.brand_id ORDER BY best_rank LIMIT :limit"
+        )
+        rows = db.execute(text(sql), params).mappings().all()
+        return {"query": q, "brands": [dict(r) for r in rows]}
+
+    sql = (
+        f"SELECT h.*, b.name AS brand_name, b.website AS website "
+        f"FROM ({hits}) h JOIN brands b ON b.id = h.brand_id ORDER BY h.rank LIMIT :limit"
+    )
+    rows = db.execute(text(sql), params).mappings().all()
+    return {"query": q, "results": [dict(r) for r in rows]}
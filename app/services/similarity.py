@@ -0,0 +1,277 @@
+from __future__ import annotations
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from app.config import settings
+from app.models import models
+from app.models.schemas import Product
+
+try:  # optional: without numpy/scipy competitor discovery falls back to keywords
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover
+    np = None
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]{2,}")
+STOPWORDS = frozenset(
+    "and the for with new set pack size one two of default title product products all from your our you "
+    "men women mens womens kids unisex".split()
+)
+
+def similarity_available() -> bool:
+    return np is not None and settings.similarity_enabled
+
+def product_terms(title: Optional[str], tags: Optional[str], product_type: Optional[str], vendor: Optional[str]) -> List[str]:
+    """Terms of one product: words of its title, tags and type, plus the vendor as a single term."""
+    text = " ".join(t for t in (title, tags, product_type) if t).lower()
+    terms = [t for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+    if vendor:
+        terms.append("vendor:" + vendor.strip().lower())
+    return terms
+
+def catalog_terms(products: Iterable[Product]) -> Counter:
+    counts: Counter = Counter()
+    for p in products:
+        counts.update(product_terms(p.title, ",".join(p.tags) if p.tags else None, p.product_type, p.vendor))
+    return counts
+
+class SimilarityIndex:
+    """
+    TF-IDF vectors (sublinear tf, L2-normalised) of every persisted brand's
+    catalog, for ranking brands by cosine similarity.
+
+    Queries run against a term-major CSR matrix, so a ranking only touches the
+    postings of the query's terms. Brands updated since the matrix was built are
+    kept aside and scored directly; the matrix (and idf) is rebuilt once they
+    exceed similarity_rebuild_fraction of all brands.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.loaded = False
+        self._replay: Optional[list] = None  # updates made while load() builds a new index
+        self.vocab: Dict[str, int] = {}
+        self.df: List[int] = []
+        self.docs: Dict[int, Tuple["np.ndarray", "np.ndarray"]] = {}  # brand_id -> (columns, 1 + log tf)
+        self.websites: Dict[int, str] = {}
+        self._ids: Dict[str, int] = {}  # website -> brand_id
+        self._postings = None  # terms x brands, L2-normalised tf-idf, from the last build
+        self._brand_ids = None  # matrix column -> brand_id
+        self._column: Dict[int, int] = {}
+        self._idf = None
+        self._dirty: set = set()  # brands set or removed since the last build
+        self._delta = None  # (brand_ids, terms x brands postings) of the dirty brands
+
+    # updates
+    def _doc(self, counts: Counter, add_terms: bool) -> Tuple["np.ndarray", "np.ndarray"]:
+        columns, weights = [], []
+        for term, n in counts.items():
+            col = self.vocab.get(term)
+            if col is None:
+                if not add_terms:
+                    continue
+                col = self.vocab[term] = len(self.vocab)
+                self.df.append(0)
+            columns.append(col)
+            weights.append(1.0 + math.log(n))
+        order = np.argsort(columns)
+        return np.asarray(columns, dtype=np.int64)[order], np.asarray(weights, dtype=np.float64)[order]
+
+    @property
+    def loading(self) -> bool:
+        return self._replay is not None
+
+    def set_brand(self, brand_id: int, website: Optional[str], counts: Counter) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((brand_id, website, counts))
+            self.remove_brand(brand_id)
+            if not counts:
+                return
+            doc = self._doc(counts, add_terms=True)
+            for col in doc[0].tolist():
+                self.df[col] += 1
+            self.docs[brand_id] = doc
+            self.websites[brand_id] = website or ""
+            if website:
+                self._ids[website] = brand_id
+            self._dirty.add(brand_id)
+            self._delta = None
+
+    def remove_brand(self, brand_id: int) -> None:
+        with self._lock:
+            doc = self.docs.pop(brand_id, None)
+            if doc is None:
+                return
+            for col in doc[0].tolist():
+                self.df[col] -= 1
+            website = self.websites.pop(brand_id, None)
+            if website and self._ids.get(website) == brand_id:
+                del self._ids[website]
+            self._dirty.add(brand_id)
+            self._delta = None
+
+    # building
+    def _postings_for(self, brand_ids: List[int], idf: "np.ndarray") -> "sparse.csr_matrix":
+        # terms x brands CSR of L2-normalised tf-idf columns
+        docs = [self.docs[b] for b in brand_ids]
+        lengths = np.fromiter((len(doc[0]) for doc in docs), dtype=np.int64, count=len(docs))
+        if docs:
+            cols = np.concatenate([doc[0] for doc in docs])
+            data = np.concatenate([doc[1] for doc in docs]) * self._idf_of(cols, idf)
+        else:
+            cols, data = np.zeros(0, dtype=np.int64), np.zeros(0)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1])) if len(data) else np.zeros(0)
+        data = data / np.repeat(norms, lengths)
+        return sparse.csr_matrix((data, cols, indptr), shape=(len(docs), len(self.vocab))).T.tocsr()
+
+    def _rebuild(self) -> None:
+        n = len(self.docs)
+        self._idf = np.log((1.0 + n) / (1.0 + np.asarray(self.df, dtype=np.float64))) + 1.0
+        brand_ids = list(self.docs)
+        self._postings = self._postings_for(brand_ids, self._idf)
+        self._brand_ids = np.asarray(brand_ids, dtype=np.int64)
+        self._column = {b: i for i, b in enumerate(brand_ids)}
+        self._dirty = set()
+        self._delta = None
+
+    def _ensure_built(self) -> None:
+        if self._postings is None or len(self._dirty) > max(64, settings.similarity_rebuild_fraction * len(self.docs)):
+            self._rebuild()
+
+    def _idf_of(self, columns: "np.ndarray", idf: "np.ndarray") -> "np.ndarray":
+        # idf as of the last build; terms first seen since then get their current idf
+        inside = columns < len(idf)
+        if inside.all():
+            return idf[columns]
+        out = np.empty(len(columns))
+        out[inside] = idf[columns[inside]]
+        n = len(self.docs)
+        out[~inside] = [math.log((1.0 + n) / (1.0 + self.df[c])) + 1.0 for c in columns[~inside].tolist()]
+        return out
+
+    # queries
+    def _rank(self, columns: "np.ndarray", tf: "np.ndarray", k: int, exclude: Optional[int]) -> List[Tuple[int, str, float]]:
+        self._ensure_built()
+        if not len(columns):
+            return []
+        weights = tf * self._idf_of(columns, self._idf)
+        query = weights / math.sqrt(float(weights @ weights))
+        candidates: Dict[int, float] = {}
+        # only the postings rows of the query's terms are read
+        built = columns < self._postings.shape[0]
+        scores = np.asarray(self._postings[columns[built]].T @ query[built]).ravel()
+        if self._dirty:
+            # brands changed since the build: their matrix columns are stale, and
+            # their current vectors are scored from a small side matrix instead
+            for brand_id in self._dirty:
+                col = self._column.get(brand_id)
+                if col is not None:
+                    scores[col] = 0.0
+            if self._delta is None:
+                ids = [b for b in self._dirty if b in self.docs]
+                self._delta = (ids, self._postings_for(ids, self._idf))
+            ids, delta = self._delta
+            delta_scores = np.asarray(delta[columns].T @ query).ravel()
+            candidates.update(zip(ids, delta_scores.tolist()))
+        if exclude in self._column:
+            scores[self._column[exclude]] = 0.0
+        candidates.pop(exclude, None)
+        if len(scores):
+            top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+            for col in top.tolist():
+                if scores[col] > 0:
+                    candidates[int(self._brand_ids[col])] = float(scores[col])
+        ranked = sorted(candidates.items(), key=lambda item: -item[1])[:k]
+        return [(b, self.websites.get(b, ""), round(s, 4)) for b, s in ranked if s >= settings.similarity_min_score]
+
+    def similar(self, counts: Counter, k: int = 10, exclude: Optional[int] = None) -> List[Tuple[int, str, float]]:
+        """Top-k (brand_id, website, cosine) for a catalog's term counts."""
+        with self._lock:
+            if not self.docs or not counts:
+                return []
+            columns, tf = self._doc(counts, add_terms=False)
+            return self._rank(columns, tf, k, exclude)
+
+    def similar_to_brand(self, brand_id: int, k: int = 10) -> List[Tuple[int, str, float]]:
+        with self._lock:
+            doc = self.docs.get(brand_id)
+            return self._rank(doc[0], doc[1], k, exclude=brand_id) if doc is not None else []
+
+    def brand_id(self, website: str) -> Optional[int]:
+        with self._lock:
+            return self._ids.get(website)
+
+    def load(self, db) -> None:
+        """
+        (Re)build the index from the products table, streaming rows brand by
+        brand. The new index is built without holding this one's lock, then
+        swapped in; brands set meanwhile (by the writer thread) are applied again.
+        """
+        with self._lock:
+            self._replay = []
+        fresh = SimilarityIndex()
+        try:
+            websites = dict(db.execute(select(models.Brand.id, models.Brand.website)).all())
+            query = (
+                select(models.Product.brand_id, models.Product.title, models.Product.tags,
+                       models.Product.product_type, models.Product.vendor)
+                .order_by(models.Product.brand_id)
+                .execution_options(yield_per=10000)
+            )
+            current, counts = None, Counter()
+            for brand_id, title, tags, product_type, vendor in db.execute(query):
+                if brand_id != current:
+                    if current is not None:
+                        fresh.set_brand(current, websites.get(current), counts)
+                    current, counts = brand_id, Counter()
+                counts.update(product_terms(title, tags, product_type, vendor))
+            if current is not None:
+                fresh.set_brand(current, websites.get(current), counts)
+            fresh._rebuild()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            replay = self._replay
+            state = dict(fresh.__dict__)
+            state.pop("_lock")
+            self.__dict__.update(state)
+            for brand_id, website, counts in replay:
+                self.set_brand(brand_id, website, counts)
+            self.loaded = True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"brands": len(self.docs), "terms": len(self.vocab), "pending": len(self._dirty)}
+
+similarity_index = SimilarityIndex()
+_load_lock = threading.Lock()
+
+def ensure_loaded() -> bool:
+    """Load the index from the database once (blocking; the app lifespan runs it in a thread)."""
+    if not similarity_available():
+        return False
+    with _load_lock:
+        if not similarity_index.loaded:
+            from app.models.db import SessionLocal
+            with SessionLocal() as db:
+                similarity_index.load(db)
+    return True
+
+def on_persisted(brand_id: int, website: Optional[str], products: Sequence[Product]) -> None:
+    """Writer-thread hook: refresh one brand's vector after its catalog was committed."""
+    if similarity_available() and (similarity_index.loaded or similarity_index.loading):
+        similarity_index.set_brand(brand_id, website, catalog_terms(products))
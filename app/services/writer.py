@@ -0,0 +1,147 @@
+from __future__ import annotations
+import asyncio, logging, queue, threading, uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.models.db import WriteSessionLocal
+from app.models.schemas import BrandContext
+
+logger = logging.getLogger(__name__)
+
+class WriteJob:
+    def __init__(self, ctx: BrandContext):
+        self.id = uuid.uuid4().hex
+        self.website = ctx.website
+        self.ctx: Optional[BrandContext] = ctx  # released once written
+        self.status = "queued"  # queued / running / done / failed
+        self.stats: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future: Future = Future()
+
+    async def wait(self) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.future)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"id": self.id, "website": self.website, "status": self.status, "stats": self.stats, "error": self.error}
+
+class PersistWriter:
+    """
+    Single writer thread that owns all persistence. Scrapes enqueue their
+    BrandContext on a bounded queue and the thread drains it in batches,
+    committing each batch once, so SQLAlchemy work never blocks the event loop.
+    """
+    def __init__(self, max_queue: int, batch_size: int, history: int = 10000):
+        self.batch_size = batch_size
+        self.history = history
+        self._queue: "queue.Queue[Optional[WriteJob]]" = queue.Queue(maxsize=max_queue)
+        self._jobs: "OrderedDict[str, WriteJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="persist-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush queued writes and stop the thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+        from app.services.price_history import price_history
+        price_history.flush()
+
+    async def submit(self, ctx: BrandContext) -> WriteJob:
+        self.start()
+        job = WriteJob(ctx)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # backpressure: wait for room without blocking the event loop
+            await asyncio.to_thread(self._queue.put, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[WriteJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch: List[WriteJob] = [job]
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[WriteJob]) -> None:
+        from app.services.insights_service import catalog_complete, persist_brand_context
+        from app.services import price_history, similarity
+
+        db = WriteSessionLocal()
+        done: List[WriteJob] = []
+        try:
+            for job in batch:
+                job.status = "running"
+                try:
+                    # savepoint per brand so one bad write doesn't sink the batch
+                    with db.begin_nested():
+                        job.stats = persist_brand_context(db, job.ctx, commit=False)
+                    done.append(job)
+                except Exception as e:
+                    logger.exception("Persisting %s failed", job.website)
+                    self._fail(job, e)
+            db.commit()
+        except Exception as e:
+            logger.exception("Committing persist batch failed")
+            db.rollback()
+            for job in done:
+                self._fail(job, e)
+            done = []
+        finally:
+            db.close()
+        for job in done:
+            job.status = "done"
+            if job.stats.get("skipped"):
+                # not newer than what is stored (e.g. a cached result submitted again)
+                job.ctx = None
+                job.future.set_result(job.stats)
+                continue
+            try:
+                # a partial catalog would skew the brand's vector
+                if catalog_complete(job.ctx):
+                    similarity.on_persisted(job.stats["brand_id"], job.website, job.ctx.product_catalog)
+            except Exception:
+                logger.exception("Updating the similarity index for %s failed", job.website)
+            try:
+                price_history.on_persisted(job.stats["brand_id"], job.ctx.product_catalog,
+                                           job.ctx.scrape_meta.scraped_at if job.ctx.scrape_meta else None)
+            except Exception:
+                logger.exception("Recording prices for %s failed", job.website)
+            job.ctx = None
+            job.future.set_result(job.stats)
+
+    @staticmethod
+    def _fail(job: WriteJob, error: Exception) -> None:
+        job.status = "failed"
+        job.error = str(error)
+        job.ctx = None
+        if not job.future.done():
+            job.future.set_exception(error)
+
+persist_writer = PersistWriter(settings.persist_queue_size, settings.persist_batch_size)
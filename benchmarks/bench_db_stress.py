@@ -0,0 +1,106 @@
+"""
+Concurrent read/write stress test for the SQLite storage settings.
+
+    python -m benchmarks.bench_db_stress [writers] [readers] [seconds]
+
+Runs separate processes against one database file (as several uvicorn workers
+would): writers re-persist brands, each changing a slice of the catalog;
+readers load whole brands and page products. Runs once with a plain
+create_engine() (rollback journal, deferred BEGIN) and once with make_engine()
+(WAL, pragmas, BEGIN IMMEDIATE for writers), and reports throughput, read
+latency and "database is locked" failures.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import os, random, statistics, sys, tempfile, time
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.models.db import init_db, make_engine
+from app.models.schemas import BrandContext, Product
+from app.services import brands
+from app.services.insights_service import persist_brand_context
+
+BRANDS = 20
+PRODUCTS = 2000
+
+def make_ctx(brand: int, version: int) -> BrandContext:
+    products = [
+        Product(handle=f"p{i}", title=f"Product {i}" + (f" v{version}" if i % 10 == version % 10 else ""),
+                vendor="Vendor", tags=["a", "b"], url=f"https://s{brand}.example.com/products/p{i}")
+        for i in range(PRODUCTS)
+    ]
+    return BrandContext(brand_name=f"Store {brand}", website=f"https://s{brand}.example.com", product_catalog=products)
+
+def engines(mode: str, url: str):
+    if mode == "tuned":
+        return make_engine(url), make_engine(url, write=True)
+    plain = create_engine(url, future=True)
+    return plain, plain
+
+def run(role: str, mode: str, url: str, seconds: float, results) -> None:
+    read_engine, write_engine = engines(mode, url)
+    Session = sessionmaker(bind=write_engine if role == "writer" else read_engine, future=True)
+    rng = random.Random(os.getpid())
+    ops, locked, latencies = 0, 0, []
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        db = Session()
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                persist_brand_context(db, make_ctx(rng.randrange(BRANDS), rng.randrange(1000)))
+            else:
+                brand = brands.get_brand(db, f"https://s{rng.randrange(BRANDS)}.example.com")
+                if brand is not None:
+                    brands.brand_to_context(brand)
+                    brands.list_products(db, brand.id, limit=100, fields=["handle", "title"])
+            ops += 1
+            latencies.append(time.perf_counter() - started)
+        except OperationalError as e:
+            db.rollback()
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            locked += 1
+        finally:
+            db.close()
+    results.put((role, ops, locked, latencies))
+
+def scenario(mode: str, writers: int, readers: int, seconds: float) -> None:
+    path = os.path.join(tempfile.mkdtemp(), f"stress_{mode}.db")
+    url = f"sqlite:///{path}"
+    read_engine, write_engine = engines(mode, url)
+    init_db(write_engine)
+    db = sessionmaker(bind=write_engine, future=True)()
+    for brand in range(BRANDS):
+        persist_brand_context(db, make_ctx(brand, 0))
+    db.close()
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=run, args=(role, mode, url, seconds, results))
+             for role in ["writer"] * writers + ["reader"] * readers]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    for role in ("writer", "reader"):
+        rows = [r for r in collected if r[0] == role]
+        ops = sum(r[1] for r in rows)
+        locked = sum(r[2] for r in rows)
+        latencies = sorted(l for r in rows for l in r[3])
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        print(f"{mode:<6} {role}s: {ops / seconds:8.1f} ops/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  locked errors {locked}")
+
+def main() -> None:
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+    print(f"{writers} writer and {readers} reader processes, {seconds:.0f}s each")
+    for mode in ("plain", "tuned"):
+        scenario(mode, writers, readers, seconds)
+
+if __name__ == "__main__":
+    main()
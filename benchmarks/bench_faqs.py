@@ -0,0 +1,89 @@
+"""
+FAQ extraction benchmark: the previous tree walk vs the single-pass extractor.
+
+    python -m benchmarks.bench_faqs [headings]
+
+Builds a synthetic help-center page (5k headings by default, grouped into
+category sections with dl and details blocks) and times both implementations.
+"""
+from __future__ import annotations
+import sys, time
+from typing import List
+from app.models.schemas import FAQ
+from app.scraper.extractors import extract_faqs
+from app.scraper.utils import make_soup
+
+def faqs_from_soup(soup, url: str) -> List[FAQ]:
+    """The pre-streaming extractor, kept as the reference (no dedupe, no cap)."""
+    faqs: List[FAQ] = []
+    # Pattern 1: dl/dt/dd pairs
+    for dt in soup.select("dt"):
+        q = dt.get_text(" ", strip=True)
+        dd = dt.find_next_sibling("dd")
+        a = dd.get_text(" ", strip=True) if dd else ""
+        if q and a:
+            faqs.append(FAQ(question=q, answer=a, url=url))
+    # Pattern 2: headings + next paragraph(s)
+    for h in soup.select("h1, h2, h3, h4, h5, h6"):
+        q = h.get_text(" ", strip=True)
+        # Gather following siblings until next heading
+        answer_parts = []
+        for sib in h.next_siblings:
+            if getattr(sib, "name", None) in ["h1","h2","h3","h4","h5","h6"]:
+                break
+            text = getattr(sib, "get_text", lambda *a, **k: str(sib))(" ", strip=True)
+            if text:
+                answer_parts.append(text)
+        a = " ".join(answer_parts).strip()
+        if q and len(a) > 0 and len(q) < 220:
+            faqs.append(FAQ(question=q, answer=a[:1000], url=url))
+    # Pattern 3: details/summary blocks
+    for det in soup.select("details"):
+        sum_el = det.find("summary")
+        if not sum_el:
+            continue
+        q = sum_el.get_text(" ", strip=True)
+        a = det.get_text(" ", strip=True).replace(q, "", 1).strip()
+        if q and a:
+            faqs.append(FAQ(question=q, answer=a[:1000], url=url))
+    return faqs
+
+def legacy(html: str, url: str) -> List[FAQ]:
+    uniq, seen = [], set()
+    for f in faqs_from_soup(make_soup(html, "bs4"), url):
+        key = (f.question[:200].lower(), f.answer[:200].lower())
+        if key not in seen:
+            seen.add(key)
+            uniq.append(f)
+    return uniq[:100]
+
+def help_center(headings: int) -> str:
+    per_section = 100
+    sections = []
+    for c in range(max(1, headings // per_section)):
+        items = "".join(
+            f"<div class='item'><h3>Question {c}-{i}?</h3><p>Answer {c}-{i} with <a href='#'>a link</a>.</p>"
+            f"<details><summary>More {c}-{i}</summary><p>Details {c}-{i}</p></details></div>"
+            for i in range(per_section)
+        )
+        sections.append(f"<section><h2>Category {c}</h2><div class='items'>{items}</div><dl><dt>Term {c}</dt><dd>Def {c}</dd></dl></section>")
+    return "<html><body>" + "".join(sections) + "</body></html>"
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+def main() -> None:
+    headings = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    html = help_center(headings)
+    print(f"{headings} headings, {len(html) / 1024:.0f} KiB")
+    t_old, old = timed(legacy, html, "u")
+    t_new, new = timed(extract_faqs, html, "u")
+    t_all, everything = timed(extract_faqs, html, "u", 10 ** 9)
+    print(f"tree walk (old)           {t_old * 1000:9.1f} ms  {len(old)} faqs")
+    print(f"single pass, cap 100      {t_new * 1000:9.1f} ms  {len(new)} faqs")
+    print(f"single pass, no cap       {t_all * 1000:9.1f} ms  {len(everything)} faqs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Homepage extraction benchmark: the previous BeautifulSoup walks vs extract_homepage.
+
+    python -m benchmarks.bench_homepage [page.html ...]
+
+Without arguments a synthetic heavy theme page is used. Prints per-page timings
+and fails loudly if the two implementations disagree.
+"""
+from __future__ import annotations
+import sys, time
+from urllib.parse import urljoin
+from app.scraper.extractors import extract_homepage, PRODUCT_LINK_RE
+from app.scraper.utils import make_soup, EMAIL_RE, PHONE_RE, unique_preserve_order
+
+BASE = "https://bench.example.com"
+
+def synthetic_page(cards: int = 1500) -> str:
+    card = (
+        '<div class="card"><div class="card__media"><a href="/products/item-{i}" class="full-unstyled-link">'
+        '<img src="//cdn.example.com/{i}.jpg" alt=""><span class="visually-hidden">Item {i}</span></a></div>'
+        '<div class="card__info"><h3><a href="/products/item-{i}?variant=1">Item {i}</a></h3>'
+        '<span class="price">Rs. {i}.00</span><a href="/collections/c{c}">Collection {c}</a></div></div>'
+    )
+    grid = "".join(card.format(i=i, c=i % 20) for i in range(cards))
+    script = "<script>window.theme = " + ("{\"k\": \"v\"}," * 5000) + "null;</script>"
+    footer = "<footer>" + "".join(f'<a href="/pages/p{i}">Page {i}</a>' for i in range(40)) + (
+        '<a href="https://instagram.com/bench">Instagram</a><p>support@bench.example.com +91 98765 43210</p></footer>'
+    )
+    return f"<html><head><title>Bench Store</title>{script}</head><body><main>{grid}</main>{footer}</body></html>"
+
+def legacy(html: str, base: str):
+    """The pre-extractor implementation: one tree, three CSS walks and a get_text."""
+    soup = make_soup(html, "bs4")
+    title = soup.find("title").get_text(strip=True) if soup.find("title") else None
+    cards, seen = [], set()
+    for a in soup.select("a[href*='/products/']")[:50]:
+        m = PRODUCT_LINK_RE.search(a.get("href") or "")
+        if not m or m.group(1) in seen:
+            continue
+        seen.add(m.group(1))
+        img = a.find("img")
+        cards.append((m.group(1), (a.get("title") or a.text or "").strip() or None, img.get("src") if img else None))
+    footer_links, others = {}, []
+    for a in soup.select("footer a[href]"):
+        url = urljoin(base, a.get("href"))
+        footer_links[(a.text or "").strip().lower()] = url
+        others.append(url)
+    for a in soup.select("a[href]"):
+        url = urljoin(base, a.get("href"))
+        if url.startswith(base):
+            others.append(url)
+    text = soup.get_text(" ", strip=True)
+    return title, cards, footer_links, unique_preserve_order(others), EMAIL_RE.findall(text), PHONE_RE.findall(text)
+
+def single_pass(html: str, base: str):
+    home = extract_homepage(html, base)
+    others = home.footer_urls + [u for u in home.links if u.startswith(base)]
+    return (home.title, home.product_cards, home.footer_links, unique_preserve_order(others),
+            EMAIL_RE.findall(home.text), PHONE_RE.findall(home.text))
+
+def best_of(fn, *args, runs: int = 5) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main() -> None:
+    pages = [(path, open(path, encoding="utf-8", errors="replace").read()) for path in sys.argv[1:]]
+    if not pages:
+        pages = [("synthetic", synthetic_page())]
+    for name, html in pages:
+        assert legacy(html, BASE) == single_pass(html, BASE), f"output mismatch on {name}"
+        old, new = best_of(legacy, html, BASE), best_of(single_pass, html, BASE)
+        print(f"{name}: {len(html) / 1024:.0f} KiB  bs4 walks {old * 1000:.1f} ms  single pass {new * 1000:.1f} ms  ({old / new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Event-loop responsiveness with inline vs process-pool HTML extraction.
+
+    python -m benchmarks.bench_offload [heavy_pages] [page_kib]
+
+Runs a stream of cheap "requests" (a 1 ms await each) while heavy pages are
+extracted concurrently, and reports p50/p99 latency of the cheap requests with
+parsing inline on the loop and offloaded to the process pool.
+"""
+from __future__ import annotations
+import asyncio, statistics, sys, time
+from app.config import settings
+from app.scraper.extractors import extract_faqs, extract_homepage
+from app.scraper.offload import run_cpu, shutdown_pool
+
+def heavy_page(kib: int) -> str:
+    block = "<div><h3>Question {i}?</h3><p>Answer {i} with some <b>markup</b> in it.</p></div>"
+    parts, size, i = [], 0, 0
+    while size < kib * 1024:
+        chunk = block.format(i=i)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    return "<html><body>" + "".join(parts) + "</body></html>"
+
+async def light_requests(stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        latencies.append(time.perf_counter() - started)
+
+async def scenario(html: str, heavy: int) -> list:
+    latencies: list = []
+    stop = asyncio.Event()
+    probes = [asyncio.ensure_future(light_requests(stop, latencies)) for _ in range(20)]
+    await asyncio.gather(*(run_cpu(fn, html, arg) for _ in range(heavy) for fn, arg in ((extract_faqs, "u"), (extract_homepage, "https://u"))))
+    stop.set()
+    await asyncio.gather(*probes)
+    return latencies
+
+def report(label: str, latencies: list, elapsed: float) -> None:
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{label:<10} light-request p50 {q[49] * 1000:7.1f} ms  p99 {q[98] * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms  total {elapsed:.2f}s")
+
+def main() -> None:
+    heavy = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    html = heavy_page(int(sys.argv[2]) if len(sys.argv) > 2 else 2048)
+    for label, workers in (("inline", 0), ("offload", max(settings.parse_pool_workers, 2))):
+        settings.parse_pool_workers = workers
+        settings.parse_offload_min_bytes = 256 * 1024
+        if workers:
+            asyncio.run(run_cpu(extract_faqs, html, "u", 1))  # warm up the pool outside the measurement
+        started = time.perf_counter()
+        latencies = asyncio.run(scenario(html, heavy))
+        report(label, latencies, time.perf_counter() - started)
+    shutdown_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Parser backend parity check and per-page parse benchmark.
+
+    python -m benchmarks.bench_parsers [corpus_dir_or_files ...]
+
+Point it at saved Shopify /collections/all pages (*.html), the only pages the
+scraper still parses into a tree. Without arguments synthetic collection pages
+are used. The fallback's product-link extraction is run through the "bs4"
+reference and the "lxml" backend; any difference is reported, followed by
+per-page parse+extract timings.
+"""
+from __future__ import annotations
+import glob, os, sys, time
+from app.scraper.utils import make_soup
+
+def synthetic_pages() -> dict:
+    cards = "".join(
+        f"<li class='grid__item'><div class='card'><div class='card__media'><img src='//cdn.test/{i}.jpg' alt=''></div>"
+        f"<h3><a href='/collections/all/products/p-{i}?variant={i}' class='full-unstyled-link'>P &amp; {i}</a></h3>"
+        f"<a href='/products/p-{i}' title='P {i}'>Quick view</a></div></li>"
+        for i in range(2000)
+    )
+    script = "<script>" + "var products=['/products/x'];" * 2000 + "</script>"
+    return {
+        "collection.html": f"<html><head>{script}</head><body><main><ul>{cards}</ul></main></body></html>",
+        "collection_small.html": f"<html><body>{cards[:20000]}</body></html>",
+    }
+
+def run(html: str, backend: str) -> dict:
+    """Parse once and read the product links the way _iter_collection_products does."""
+    soup = make_soup(html, backend)
+    links = []
+    for a in soup.select("a[href*='/products/']"):
+        img = a.find("img")
+        links.append((a.get("href"), (a.get("title") or a.text or "").strip(), img.get("src") if img else None))
+    return {"product_links": links}
+
+def timed(html: str, backend: str, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        run(html, backend)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def load(args) -> dict:
+    paths = []
+    for arg in args:
+        paths.extend(sorted(glob.glob(os.path.join(arg, "*.html"))) if os.path.isdir(arg) else [arg])
+    return {os.path.basename(p): open(p, encoding="utf-8", errors="replace").read() for p in paths}
+
+def main() -> None:
+    pages = load(sys.argv[1:]) or synthetic_pages()
+    mismatches = 0
+    for name, html in pages.items():
+        ref, fast = run(html, "bs4"), run(html, "lxml")
+        diff = [k for k in ref if ref[k] != fast[k]]
+        mismatches += bool(diff)
+        t_ref, t_fast = timed(html, "bs4"), timed(html, "lxml")
+        status = "OK " if not diff else "DIFF " + ",".join(diff)
+        print(f"{status:<12} {name:<30} {len(html) / 1024:7.0f} KiB  bs4 {t_ref * 1000:8.1f} ms  lxml {t_fast * 1000:7.1f} ms  ({t_ref / t_fast:.1f}x)")
+    print(f"{len(pages)} pages, {mismatches} with differences")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
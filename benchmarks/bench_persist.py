@@ -0,0 +1,60 @@
+"""
+Persist-time benchmark for a large brand.
+
+    python -m benchmarks.bench_persist [n_products]
+
+Compares the old per-row ``db.add`` persistence with persist_brand_context
+(first write, unchanged re-persist, and a re-persist with 10% of products changed).
+"""
+from __future__ import annotations
+import sys, time
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+from app.models.db import init_db
+from app.models import models
+from app.models.schemas import BrandContext, Product
+from app.services.insights_service import persist_brand_context
+
+def make_ctx(n: int, version: int = 0) -> BrandContext:
+    products = [
+        Product(
+            id=i, handle=f"product-{i}", title=f"Product {i}" + (f" v{version}" if i % 10 == 0 else ""),
+            vendor="Vendor", product_type="Type", tags=["a", "b"],
+            images=[f"https://cdn.example.com/{i}.jpg"], url=f"https://bench.example.com/products/product-{i}",
+        )
+        for i in range(n)
+    ]
+    return BrandContext(brand_name="Bench", website="https://bench.example.com", product_catalog=products)
+
+def per_row_persist(db, ctx: BrandContext) -> None:
+    brand = db.query(models.Brand).filter(models.Brand.website == ctx.website).one()
+    db.query(models.Product).filter(models.Product.brand_id == brand.id).delete()
+    for p in ctx.product_catalog:
+        db.add(models.Product(
+            brand_id=brand.id, handle=p.handle, title=p.title, vendor=p.vendor, product_type=p.product_type,
+            tags=",".join(p.tags) if p.tags else None, images_json=str(p.images) if p.images else None, url=p.url,
+        ))
+    db.commit()
+
+def timed(label: str, fn) -> None:
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<34} {time.perf_counter() - started:8.3f}s  {result or ''}")
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    engine = create_engine("sqlite:///:memory:", future=True)
+    init_db(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    print(f"{n} products")
+
+    timed("bulk: first persist", lambda: persist_brand_context(db, make_ctx(n)))
+    timed("per-row db.add (old path)", lambda: per_row_persist(db, make_ctx(n)))
+    db.execute(delete(models.Product))
+    db.commit()
+    timed("bulk: first persist", lambda: persist_brand_context(db, make_ctx(n)))
+    timed("bulk: unchanged re-persist", lambda: persist_brand_context(db, make_ctx(n)))
+    timed("bulk: 10% changed re-persist", lambda: persist_brand_context(db, make_ctx(n, version=1)))
+
+if __name__ == "__main__":
+    main()
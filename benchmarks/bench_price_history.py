@@ -0,0 +1,64 @@
+"""
+Ingest and query speed of the columnar price history.
+
+    python -m benchmarks.bench_price_history [n_observations] [path]
+
+Simulates daily scrapes of 1M variants across 10,000 brands (n_observations
+defaults to 100M, i.e. 100 days) with ~2% of prices changing each day, appended
+in one batch per day. Then times "price changes in the last N days" across all
+brands and for one brand, on a freshly opened store (segments memory-mapped).
+"""
+from __future__ import annotations
+import os, statistics, sys, tempfile, time
+import numpy as np
+from app.services.price_history import PriceHistory
+
+VARIANTS = 1_000_000
+BRANDS = 10_000
+DAY = 86400
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "price_history")
+    days = max(1, n // VARIANTS)
+    rng = np.random.default_rng(1)
+    variant_id = np.arange(VARIANTS, dtype=np.int64) + 10**12
+    product_id = variant_id // 3
+    brand_id = (np.arange(VARIANTS) % BRANDS + 1).astype(np.int32)
+    price = rng.integers(500, 20000, VARIANTS).astype(np.int32)
+    compare_at = np.where(rng.random(VARIANTS) < 0.3, price + 500, -1).astype(np.int32)
+    available = np.ones(VARIANTS, dtype=np.int8)
+    end = int(time.time())
+    start = end - days * DAY
+
+    store = PriceHistory(path, flush_seconds=float("inf"))
+    ingest = 0.0
+    for day in range(days):
+        changed = rng.random(VARIANTS) < 0.02
+        price = np.where(changed, (price * rng.uniform(0.8, 1.2, VARIANTS)).astype(np.int32), price)
+        batch = {"observed_at": np.full(VARIANTS, start + day * DAY, dtype=np.int64), "brand_id": brand_id,
+                 "product_id": product_id, "variant_id": variant_id, "price": price,
+                 "compare_at": compare_at, "available": available}
+        began = time.perf_counter()
+        store.append(batch)
+        ingest += time.perf_counter() - began
+    began = time.perf_counter()
+    store.flush()
+    ingest += time.perf_counter() - began
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    rows = days * VARIANTS
+    print(f"ingested {rows:,} observations in {ingest:.1f}s ({rows / ingest / 1e6:.1f}M rows/s), "
+          f"{size / 1e9:.2f} GB on disk, {store.stats()['segments']} segments")
+
+    for label, window, brand in (("last 7 days", 7, None), ("last 7 days, one brand", 7, 42),
+                                 ("last 30 days", 30, None), ("all time", days + 1, None)):
+        timings, found = [], 0
+        for attempt in range(5):
+            reader = PriceHistory(path)  # cold open each time: manifest + mmap
+            began = time.perf_counter()
+            found = len(reader.changes(end - window * DAY, brand_id=brand)["price"])
+            timings.append(time.perf_counter() - began)
+        print(f"{label:<24} p50 {statistics.median(timings) * 1000:8.1f} ms  max {max(timings) * 1000:8.1f} ms  ({found:,} changes)")
+
+if __name__ == "__main__":
+    main()
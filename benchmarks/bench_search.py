@@ -0,0 +1,75 @@
+"""
+Full-text search latency over a large synthetic catalog.
+
+    python -m benchmarks.bench_search [n_products] [db_path]
+
+Builds a file-backed SQLite database with n_products (default 1M) spread over
+1,000 brands, indexed by the FTS5 triggers as rows are inserted, plus a policy
+and a few FAQs per brand. Then reports p50/p95 latency of typical queries.
+"""
+from __future__ import annotations
+import os, random, statistics, sys, tempfile, time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.models.db import init_db
+from app.models import models
+from app.services.search import search
+
+WORDS = ("keratin shampoo conditioner serum argan oil repair mask curl cream scalp tonic dry frizz "
+         "volume silk protein vegan sulfate free travel size bond color care smoothing balm").split()
+VENDORS = ["Acme", "Lumen", "Nori", "Verde", "Halo", "Kite"]
+BRANDS = 1000
+QUERIES = [
+    ("common term", dict(q="shampoo")),
+    ("rare term", dict(q="bond balm")),
+    ("phrase", dict(q="argan oil", mode="phrase")),
+    ("prefix", dict(q="cond*")),
+    ("brand filter", dict(q="keratin", brand_id=7)),
+    ("policies only", dict(q="free returns 30 days", kinds=("policies",))),
+    ("brands by best hit", dict(q="keratin serum", by="brand")),
+]
+
+def build(db, n: int) -> None:
+    rng = random.Random(1)
+    db.execute(insert(models.Brand), [{"id": b, "name": f"Brand {b}", "website": f"https://b{b}.example.com"} for b in range(1, BRANDS + 1)])
+    for start in range(0, n, 50_000):
+        db.execute(insert(models.Product), [
+            {"brand_id": i % BRANDS + 1, "handle": f"p{i}", "title": " ".join(rng.sample(WORDS, 4)).title(),
+             "vendor": rng.choice(VENDORS), "product_type": rng.choice(("Hair", "Skin", "Body")),
+             "tags": ",".join(rng.sample(WORDS, 3)), "url": f"https://b{i % BRANDS + 1}.example.com/products/p{i}"}
+            for i in range(start, min(n, start + 50_000))
+        ])
+    db.execute(insert(models.Policy), [
+        {"brand_id": b, "kind": "return", "url": f"https://b{b}.example.com/policies/refund-policy",
+         "content": f"Returns are accepted within {rng.choice((14, 30, 60))} days. "
+                    + ("Free returns on all orders." if b % 3 == 0 else "Return shipping is paid by the customer.")}
+        for b in range(1, BRANDS + 1)
+    ])
+    db.execute(insert(models.FAQ), [
+        {"brand_id": b, "question": f"Is the {rng.choice(WORDS)} safe for colored hair?", "answer": "Yes, it is sulfate free.", "url": None}
+        for b in range(1, BRANDS + 1) for _ in range(5)
+    ])
+    db.commit()
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bench_search.db")
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    init_db(engine)
+    db = sessionmaker(bind=engine, future=True)()
+    if not db.query(models.Product.id).first():
+        started = time.perf_counter()
+        build(db, n)
+        print(f"built {n} products in {time.perf_counter() - started:.1f}s ({path})")
+    for label, kwargs in QUERIES:
+        timings, found = [], 0
+        for _ in range(20):
+            started = time.perf_counter()
+            result = search(db, **kwargs)
+            timings.append(time.perf_counter() - started)
+            found = len(result.get("results", result.get("brands", [])))
+        timings.sort()
+        print(f"{label:<20} p50 {statistics.median(timings) * 1000:8.2f} ms  p95 {timings[int(len(timings) * 0.95) - 1] * 1000:8.2f} ms  ({found} rows)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Competitor ranking latency with the TF-IDF similarity index.
+
+    python -m benchmarks.bench_similarity [n_brands] [terms_per_brand]
+
+Fills a SimilarityIndex with n_brands (default 50k) synthetic catalogs drawn
+from 40 topics over a 30k-term vocabulary, then reports build time, the
+latency of ranking one brand against all others, and the cost of a
+re-persisted brand (incremental update + query).
+"""
+from __future__ import annotations
+import random, statistics, sys, time
+from collections import Counter
+from app.services.similarity import SimilarityIndex
+
+TOPICS = 40
+VOCAB = 30000
+
+def catalog(rng: random.Random, topic_terms, size: int) -> Counter:
+    topic = topic_terms[rng.randrange(TOPICS)]
+    # mostly on-topic words, some long-tail noise
+    words = [rng.choice(topic) if rng.random() < 0.8 else f"w{rng.randrange(VOCAB)}" for _ in range(size * 4)]
+    return Counter(words)
+
+def timed(fn, repeat: int = 200):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return statistics.median(timings) * 1000, timings[int(len(timings) * 0.95) - 1] * 1000
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    rng = random.Random(7)
+    topic_terms = [[f"w{rng.randrange(VOCAB)}" for _ in range(400)] for _ in range(TOPICS)]
+    index = SimilarityIndex()
+
+    catalogs = [catalog(rng, topic_terms, size) for _ in range(n)]
+    started = time.perf_counter()
+    for brand_id, counts in enumerate(catalogs):
+        index.set_brand(brand_id, f"https://s{brand_id}.example.com", counts)
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    index.similar_to_brand(0)  # first query builds the matrix
+    print(f"{n} brands, {index.stats()['terms']} terms: vectors {loaded:.1f}s, matrix build {time.perf_counter() - started:.2f}s")
+
+    p50, p95 = timed(lambda: index.similar_to_brand(rng.randrange(n)))
+    print(f"rank stored brand       p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+    query = catalog(rng, topic_terms, size)
+    p50, p95 = timed(lambda: index.similar(query))
+    print(f"rank unsaved catalog    p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+    def update_and_query():
+        brand_id = rng.randrange(n)
+        index.set_brand(brand_id, f"https://s{brand_id}.example.com", catalogs[rng.randrange(n)])
+        index.similar_to_brand(brand_id)
+    p50, p95 = timed(update_and_query, repeat=500)
+    print(f"re-persist + rank       p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  (includes periodic rebuilds)")
+
+if __name__ == "__main__":
+    main()
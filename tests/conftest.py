@@ -0,0 +1,123 @@
+"""Shared fixtures: a Shopify-like store served in process through httpx.MockTransport."""
+from __future__ import annotations
+import asyncio
+import json
+import tempfile
+from typing import Any, Callable, Dict, List, Union
+import httpx
+import pytest
+from app.config import settings
+from app.scraper import utils
+
+# app.models.db binds its engines to the default database on import (and
+# app.main creates its tables): keep that out of the working tree
+settings.sqlite_url = f"sqlite:///{tempfile.mkdtemp(prefix='insights-tests-')}/insights.db"
+
+Route = Union[str, dict, tuple, Callable[[httpx.Request], Any]]
+
+class Store:
+    """
+    MockTransport handler. `routes` maps a path to a body (str, or dict for
+    JSON), a (status, body) or (status, body, headers) tuple, or a callable
+    taking the request and returning one of those. Unknown paths are 404.
+    `delays` holds seconds to wait before answering a path. `peak` is the most
+    requests ever in flight at once.
+    """
+    def __init__(self, routes: Dict[str, Route], delays: Dict[str, float] | None = None):
+        self.routes = dict(routes)
+        self.delays = dict(delays or {})
+        self.requests: List[str] = []
+        self.active = 0
+        self.peak = 0
+
+    def count(self, path: str) -> int:
+        return self.requests.count(path)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await self._respond(request)
+        finally:
+            self.active -= 1
+
+    async def _respond(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        if path in self.delays:
+            await asyncio.sleep(self.delays[path])
+        route = self.routes.get(path)
+        if callable(route):
+            route = route(request)
+        if route is None:
+            return httpx.Response(404, text="not found")
+        status, body, headers = 200, route, {}
+        if isinstance(route, tuple):
+            status, body, *rest = route
+            headers = rest[0] if rest else {}
+        if isinstance(body, (dict, list)):
+            return httpx.Response(status, content=json.dumps(body).encode(),
+                                  headers={"Content-Type": "application/json", **headers})
+        ctype = "application/xml" if path.endswith(".xml") else "text/html; charset=utf-8"
+        return httpx.Response(status, text=body, headers={"Content-Type": ctype, **headers})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self))
+
+def product_json(i: int) -> dict:
+    return {
+        "id": i, "handle": f"product-{i}", "title": f"Product {i}", "vendor": "Acme", "product_type": "Apparel",
+        "tags": ["summer"], "images": [{"src": f"//cdn.test/{i}.jpg"}], "updated_at": "2024-01-01T00:00:00Z",
+        "variants": [{"id": 10_000 + i, "title": "Default", "price": "19.99", "available": True}],
+    }
+
+def catalog(count: int, page_size: int | None = None) -> Callable[[httpx.Request], dict]:
+    """A /products.json route over products 1..count, paged by page or since_id like Shopify.
+    `page_size` caps the page whatever limit is asked for."""
+    products = [product_json(i) for i in range(1, count + 1)]
+
+    def route(request: httpx.Request) -> dict:
+        params = request.url.params
+        limit = min(int(params.get("limit", 30)), page_size or 250)
+        if "since_id" in params:
+            start = int(params["since_id"])  # ids are 1..count
+        else:
+            start = (int(params.get("page", 1)) - 1) * limit
+        return {"products": products[start:start + limit]}
+    return route
+
+POLICY_TEXT = "<html><body><h1>Policy</h1><p>" + "We explain in detail how this works. " * 10 + "</p></body></html>"
+
+def shop(products: int = 3) -> Dict[str, Route]:
+    """Routes for a small but complete store: homepage, catalog, policies, about and FAQ (no sitemap)."""
+    home = (
+        "<html><head><title>Acme Outfitters</title></head><body>"
+        "<a href='/products/product-1' title='Product 1'><img src='//cdn.test/1.jpg'></a>"
+        "<p>Write to hello@acme.test or call +1 (555) 010-9999.</p>"
+        "<footer><a href='/policies/privacy-policy'>Privacy policy</a><a href='/pages/about-us'>About us</a>"
+        "<a href='/pages/faq'>FAQ</a><a href='/pages/contact'>Contact</a>"
+        "<a href='https://instagram.com/acme'>Instagram</a></footer></body></html>"
+    )
+    return {
+        "/": home,
+        "/products.json": catalog(products),
+        "/policies/privacy-policy": POLICY_TEXT,
+        "/policies/refund-policy": POLICY_TEXT,
+        "/pages/about-us": POLICY_TEXT.replace("Policy", "About"),
+        "/pages/faq": "<html><body><h3>Do you ship abroad?</h3><p>Yes, to most countries.</p></body></html>",
+    }
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Route the scraper's shared client to a Store: serve(store) returns the store."""
+    def install(store: Store) -> Store:
+        monkeypatch.setattr(utils, "_shared_client", store.client())
+        return store
+    return install
+
+@pytest.fixture(autouse=True)
+def isolated_scraper(monkeypatch):
+    # per-host governors hold asyncio primitives bound to the loop that used them,
+    # and the HTTP cache would serve one test's pages to the next
+    monkeypatch.setattr(utils, "_hosts", type(utils._hosts)())
+    monkeypatch.setattr(settings, "http_cache_enabled", False)
@@ -0,0 +1,89 @@
+"""Read API over persisted brands: keyset pagination, projections and round trips."""
+from __future__ import annotations
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.models.db import get_db, init_db, make_engine
+from app.models.schemas import FAQ, BrandContext, ContactDetails, Policies, Policy, Product, ScrapeMeta
+from app.services.insights_service import persist_brand_context
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    factory = sessionmaker(bind=engine, future=True)
+
+    def override():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override
+    yield factory
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+@pytest.fixture
+def api(sessions):
+    # no `with`: the lifespan (shared client, writer thread, production DB) is not started
+    return TestClient(app)
+
+def brand(name: str, products: int = 0, **fields) -> BrandContext:
+    return BrandContext(
+        brand_name=name, website=f"https://{name}.test",
+        product_catalog=[Product(handle=f"p{i}", title=f"Product {i}", tags=["a", "b"],
+                                 price_range={"min": 10.0, "max": 12.5}, images=["//cdn.test/1.jpg"])
+                         for i in range(products)],
+        scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=1), **fields,
+    )
+
+def persist(sessions, *contexts):
+    with sessions() as db:
+        return [persist_brand_context(db, ctx)["brand_id"] for ctx in contexts]
+
+def test_brands_page_by_id(api, sessions):
+    persist(sessions, *(brand(f"b{i}", products=i) for i in range(5)))
+    first = api.get("/brands", params={"limit": 3}).json()
+    assert [b["name"] for b in first["brands"]] == ["b0", "b1", "b2"] and first["has_more"]
+    rest = api.get("/brands", params={"limit": 3, "after_id": first["next_after_id"]}).json()
+    assert [(b["name"], b["products"]) for b in rest["brands"]] == [("b3", 3), ("b4", 4)]
+    assert not rest["has_more"]
+
+def test_products_page_and_project(api, sessions):
+    brand_id, = persist(sessions, brand("shop", products=5))
+    page = api.get(f"/brands/{brand_id}/products", params={"limit": 2, "fields": "handle, title"}).json()
+    assert [set(p) for p in page["products"]] == [{"id", "handle", "title"}] * 2
+    handles = [p["handle"] for p in page["products"]]
+    while page["has_more"]:
+        page = api.get(f"/brands/{brand_id}/products",
+                       params={"limit": 2, "after_id": page["next_after_id"], "fields": "handle"}).json()
+        handles += [p["handle"] for p in page["products"]]
+    assert handles == [f"p{i}" for i in range(5)]
+    assert api.get(f"/brands/{brand_id}/products", params={"fields": "secret"}).status_code == 400
+
+def test_product_pages_walk_the_brand_index(sessions):
+    with sessions() as db:
+        plan = " ".join(row[3] for row in db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id, handle FROM products WHERE brand_id = 1 AND id > 0 ORDER BY id LIMIT 100"
+        )))
+    assert "ix_products_brand_id" in plan and "TEMP B-TREE" not in plan
+
+def test_persisted_brand_round_trips(api, sessions):
+    ctx = brand(
+        "round", products=2,
+        faqs=[FAQ(question="Ship?", answer="Yes", url="https://round.test/pages/faq")],
+        policies=Policies(privacy_policy=Policy(url="https://round.test/policies/privacy-policy", content="text")),
+        contact_details=ContactDetails(emails=["hi@round.test"], phones=[]),
+    )
+    persist(sessions, ctx)
+    served = BrandContext(**api.get("/brands/round.test").json())
+    assert served.product_catalog[0].price_range == {"min": 10.0, "max": 12.5}
+    assert served.product_catalog[0].tags == ["a", "b"] and served.product_catalog[0].images == ["//cdn.test/1.jpg"]
+    assert (served.faqs, served.policies, served.contact_details) == (ctx.faqs, ctx.policies, ctx.contact_details)
+    assert api.get("/brands/unknown.test").status_code == 404
+
+def test_search_rejects_unknown_options(api, sessions):
+    persist(sessions, brand("shop", products=1))
+    assert api.get("/search", params={"q": "product", "mode": "fuzzy"}).status_code == 400
+    assert api.get("/search", params={"q": "product", "kinds": "reviews"}).status_code == 400
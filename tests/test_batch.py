@@ -0,0 +1,46 @@
+"""Batch scraping: bounded workers, one result per store, and a summary."""
+from __future__ import annotations
+import asyncio
+import pytest
+from pydantic import ValidationError
+from app.config import settings
+from app.models.schemas import BatchFetchRequest, BrandContext
+from app.services import batch
+
+@pytest.fixture
+def scrapes(monkeypatch):
+    state = {"running": 0, "peak": 0}
+
+    async def fake(url: str, persist: bool = True) -> BrandContext:
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        if "broken" in url:
+            raise ConnectionError("unreachable")
+        return BrandContext(website=url)
+
+    monkeypatch.setattr(batch, "fetch_and_optionally_persist", fake)
+    monkeypatch.setattr(settings, "batch_concurrency", 3)
+    return state
+
+def collect(urls, concurrency=None):
+    async def go():
+        return [r async for r in batch.run_batch(urls, persist=False, concurrency=concurrency)]
+    return asyncio.run(go())
+
+def test_concurrency_is_capped_by_settings(scrapes):
+    results = collect([f"https://s{i}.test" for i in range(12)], concurrency=1000)
+    assert scrapes["peak"] == 3
+    assert results[-1]["summary"]["workers"] == 3
+
+def test_each_store_once_with_failures_reported(scrapes):
+    results = collect(["https://a.test", "a.test/", "https://broken.test"], concurrency=2)
+    stores, summary = results[:-1], results[-1]["summary"]
+    assert sorted(r["website_url"] for r in stores) == ["https://a.test", "https://broken.test"]
+    assert (summary["succeeded"], summary["failed"], summary["workers"]) == (1, 1, 2)
+    assert "ConnectionError" in next(r["error"] for r in stores if not r["ok"])
+
+def test_request_rejects_non_positive_concurrency():
+    with pytest.raises(ValidationError):
+        BatchFetchRequest(website_urls=["https://a.test"], concurrency=0)
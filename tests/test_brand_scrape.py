@@ -0,0 +1,94 @@
+"""build_brand_context end to end against an in-process store."""
+from __future__ import annotations
+import asyncio
+import time
+from collections import Counter
+import pytest
+from app.config import settings
+from app.scraper.shopify_scraper import build_brand_context
+from app.scraper.utils import PageCache
+from conftest import Store, catalog, shop
+
+BASE = "https://acme.test"
+
+def test_each_page_is_fetched_once_per_scrape(serve):
+    store = serve(Store(shop()))
+    ctx = asyncio.run(build_brand_context(BASE))
+    assert ctx.brand_name == "Acme Outfitters"
+    assert len(ctx.product_catalog) == 3 and [p.handle for p in ctx.hero_products] == ["product-1"]
+    assert ctx.policies.privacy_policy.url == f"{BASE}/policies/privacy-policy"
+    assert ctx.about_us.url == f"{BASE}/pages/about-us"
+    assert [f.question for f in ctx.faqs] == ["Do you ship abroad?"]
+    assert ctx.contact_details.emails == ["hello@acme.test"]
+    # the homepage feeds the title, hero products, links and contacts; footer
+    # links repeat the probes' own candidates
+    assert {path: n for path, n in Counter(store.requests).items() if n > 1} == {}
+    assert ctx.scrape_meta.cache_hits > 0
+
+def test_concurrent_readers_share_one_fetch():
+    store = Store({"/pages/faq": "<html><body><p>faq</p></body></html>"}, delays={"/pages/faq": 0.05})
+
+    async def run():
+        async with store.client() as client:
+            pages = PageCache(client)
+            texts = await asyncio.gather(*(pages.text(f"{BASE}/pages/faq") for _ in range(3)),
+                                         pages.text(f"{BASE.upper()}/pages/faq#top"))
+            first, _ = await pages.soup(f"{BASE}/pages/faq")
+            again, _ = await pages.soup(f"{BASE}/pages/faq")
+            return texts, first is again, (pages.hits, pages.misses)
+
+    texts, same_soup, (hits, misses) = asyncio.run(run())
+    assert len({t for t in texts}) == 1 and store.count("/pages/faq") == 1
+    assert same_soup
+    assert (hits, misses) == (5, 1)
+
+SLOW = ("/products.json", "/policies/privacy-policy", "/policies/refund-policy", "/pages/about-us", "/pages/faq")
+
+def test_stages_run_concurrently(serve, monkeypatch):
+    monkeypatch.setattr(settings, "per_host_burst", 50)
+    store = serve(Store(shop(), delays={path: 0.3 for path in SLOW}))
+    started = time.perf_counter()
+    asyncio.run(build_brand_context(BASE))
+    # one after another the slow pages alone would take 1.5s
+    assert time.perf_counter() - started < 0.9
+    assert store.peak > 1
+
+def test_per_host_limit_holds_across_scrapes(serve, monkeypatch):
+    monkeypatch.setattr(settings, "per_host_concurrency", 2)
+    monkeypatch.setattr(settings, "per_host_burst", 50)
+    store = serve(Store(shop(), delays={path: 0.05 for path in SLOW}))
+
+    async def run():
+        return await asyncio.gather(build_brand_context(BASE), build_brand_context(BASE))
+
+    first, second = asyncio.run(run())
+    assert first.policies.privacy_policy and second.policies.privacy_policy
+    assert store.peak == 2
+
+def test_cut_catalog_keeps_the_pages_it_read(serve, monkeypatch):
+    monkeypatch.setattr(settings, "catalog_page_size", 2)
+    monkeypatch.setitem(settings.stage_budget_seconds, "catalog", 0.5)
+    routes = {**shop(), "/products.json": catalog(20)}
+    serve(Store(routes, delays={"/products.json": 0.2}))
+    ctx = asyncio.run(build_brand_context(BASE))
+    meta = ctx.scrape_meta
+    assert meta.cut_stages == ["catalog"] and not meta.catalog_complete
+    assert 0 < len(ctx.product_catalog) == 2 * meta.catalog_pages < 20
+    assert any("catalog" in e for e in meta.errors)
+
+def test_slow_stage_is_cut_without_holding_up_the_rest(serve, monkeypatch):
+    monkeypatch.setitem(settings.stage_budget_seconds, "about", 0.3)
+    monkeypatch.setattr(settings, "per_host_burst", 50)
+    serve(Store(shop(), delays={"/pages/about-us": 5.0}))
+    started = time.perf_counter()
+    ctx = asyncio.run(build_brand_context(BASE))
+    assert time.perf_counter() - started < 2.0
+    assert ctx.about_us is None and ctx.scrape_meta.cut_stages == ["about"]
+    # the catalog and the other pages were unaffected
+    assert ctx.scrape_meta.catalog_complete and ctx.policies.privacy_policy is not None
+
+def test_deadline_bounds_the_homepage(serve, monkeypatch):
+    monkeypatch.setattr(settings, "scrape_deadline_seconds", 0.3)
+    serve(Store(shop(), delays={"/": 5.0}))
+    with pytest.raises(ConnectionError, match="not loaded within"):
+        asyncio.run(build_brand_context(BASE))
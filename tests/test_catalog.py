@@ -0,0 +1,84 @@
+"""Paginated /products.json: every page read once, prefetch, caps and fallbacks."""
+from __future__ import annotations
+import asyncio
+import pytest
+from app.config import settings
+from app.models.schemas import ScrapeMeta
+from app.scraper.shopify_scraper import iter_products_catalog
+from app.scraper.utils import PageCache
+from conftest import Store, catalog, product_json
+
+BASE = "https://catalog.test"
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(settings, "catalog_page_size", 2)
+    monkeypatch.setattr(settings, "per_host_burst", 50)
+
+def read(store: Store):
+    meta = ScrapeMeta(requested_at="", success=True)
+
+    async def go():
+        async with store.client() as client:
+            return [p async for p in iter_products_catalog(PageCache(client), BASE, meta)]
+
+    return asyncio.run(go()), meta
+
+@pytest.mark.parametrize("pagination", ["page", "since_id"])
+def test_every_page_is_read(monkeypatch, pagination):
+    monkeypatch.setattr(settings, "catalog_pagination", pagination)
+    products, meta = read(Store({"/products.json": catalog(5)}))
+    assert [p.id for p in products] == [1, 2, 3, 4, 5]
+    assert products[0].price_range == {"min": 19.99, "max": 19.99}
+    assert (meta.catalog_pages, meta.catalog_complete) == (3, True)
+
+def test_page_cap_marks_catalog_incomplete(monkeypatch):
+    monkeypatch.setattr(settings, "catalog_max_pages", 2)
+    products, meta = read(Store({"/products.json": catalog(9)}))
+    assert len(products) == 4
+    assert not meta.catalog_complete and "page cap" in meta.errors[0]
+
+def test_store_ignoring_the_page_parameter_stops():
+    products, meta = read(Store({"/products.json": {"products": [product_json(1), product_json(2)]}}))
+    assert [p.id for p in products] == [1, 2]
+    assert meta.catalog_pages == 2 and meta.catalog_complete
+
+def test_failed_later_page_marks_catalog_incomplete():
+    pages = catalog(6)
+
+    def flaky(request):
+        return (404, "gone") if request.url.params["page"] == "2" else pages(request)
+
+    products, meta = read(Store({"/products.json": flaky}))
+    assert [p.id for p in products] == [1, 2]
+    assert not meta.catalog_complete
+
+def test_blocked_json_falls_back_to_the_collection():
+    store = Store({
+        "/products.json": (401, "password"),
+        "/collections/all": "<html><body><a href='/products/linen-shirt'>Linen Shirt</a></body></html>",
+    })
+    products, meta = read(store)
+    assert [(p.handle, p.title) for p in products] == [("linen-shirt", "Linen Shirt")]
+    assert not meta.catalog_complete
+
+def test_next_page_is_requested_while_the_current_one_is_consumed():
+    requested = []
+    pages = catalog(6)
+
+    def route(request):
+        requested.append(request.url.params["page"])
+        return pages(request)
+
+    store = Store({"/products.json": route})
+
+    async def go():
+        async with store.client() as client:
+            catalog_iter = iter_products_catalog(PageCache(client), BASE)
+            await catalog_iter.__anext__()
+            await asyncio.sleep(0.05)  # the consumer is busy with product 1
+            seen = list(requested)
+            await catalog_iter.aclose()
+            return seen
+
+    assert asyncio.run(go()) == ["1", "2"]
@@ -0,0 +1,37 @@
+"""The process-wide pooled client and its settings."""
+from __future__ import annotations
+import asyncio
+from app.config import settings
+from app.scraper import utils
+
+def test_client_follows_settings(monkeypatch):
+    monkeypatch.setattr(settings, "http_max_connections", 7)
+    monkeypatch.setattr(settings, "http_max_keepalive_connections", 3)
+    monkeypatch.setattr(settings, "http_keepalive_expiry_seconds", 12.0)
+    monkeypatch.setattr(settings, "http2", True)
+    monkeypatch.setattr(utils, "_http2_available", lambda: False)
+    pool = utils.create_client()._transport._pool
+    assert (pool._max_connections, pool._max_keepalive_connections, pool._keepalive_expiry) == (7, 3, 12.0)
+    # without the h2 package the client stays on HTTP/1.1 instead of failing
+    assert not pool._http2
+
+def test_scrapes_borrow_the_shared_client():
+    async def run():
+        shared = await utils.open_shared_client()
+        try:
+            assert await utils.open_shared_client() is shared
+            async with utils.borrow_client() as first, utils.borrow_client() as second:
+                assert first is second is shared
+        finally:
+            await utils.close_shared_client()
+        assert shared.is_closed and utils._shared_client is None
+
+    asyncio.run(run())
+
+def test_client_outside_the_app_is_closed_after_use():
+    async def run():
+        async with utils.borrow_client() as client:
+            assert not client.is_closed
+        return client
+
+    assert asyncio.run(run()).is_closed
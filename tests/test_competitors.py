@@ -0,0 +1,99 @@
+"""Competitor pipeline: stored edges, fresh rows served from the database, concurrent scrapes under a budget."""
+from __future__ import annotations
+import asyncio
+import time
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.models.db import init_db, make_engine
+from app.models.models import Competitor
+from app.models.schemas import BrandContext, Product, ScrapeMeta
+from app.services import competitor
+from app.services.insights_service import persist_brand_context
+from conftest import Store
+
+SHOP = "https://shop.test"
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(competitor, "SessionLocal", factory)
+    monkeypatch.setattr(competitor, "WriteSessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+@pytest.fixture
+def scrapes(monkeypatch):
+    """Stands in for fetch_and_optionally_persist; `delays` per website, "down" websites fail."""
+    calls, delays = [], {}
+
+    async def fake(website_url, persist=False, force_refresh=False, wait_for_persist=True):
+        calls.append(website_url)
+        await asyncio.sleep(delays.get(website_url, 0.1))
+        if "down" in website_url:
+            raise ConnectionError("unreachable")
+        return BrandContext(website=website_url, brand_name="scraped")
+
+    monkeypatch.setattr(competitor, "fetch_and_optionally_persist", fake)
+    return calls, delays
+
+def similar(monkeypatch, *websites):
+    async def ranked(website_url, brand=None):
+        return list(websites)
+    monkeypatch.setattr(competitor, "similar_competitors", ranked)
+
+def edges(sessions):
+    with sessions() as db:
+        return list(db.scalars(select(Competitor.competitor_website).where(Competitor.website_url == SHOP)))
+
+def test_similar_stores_replace_the_stored_edges(sessions, scrapes, monkeypatch):
+    competitor._save_competitors(SHOP, ["https://old.test", "https://kept.test"])
+    similar(monkeypatch, "https://kept.test", "https://new.test")
+    found = asyncio.run(competitor.find_competitors(SHOP))
+    assert sorted(edges(sessions)) == ["https://kept.test", "https://new.test"]
+    assert [c.website for c in found] == ["https://kept.test", "https://new.test"]
+    # saving the same edges again is a no-op, not an integrity error
+    competitor._save_competitors(SHOP, ["https://kept.test", "https://new.test"])
+    assert len(edges(sessions)) == 2
+
+def test_recently_persisted_competitors_are_not_scraped(sessions, scrapes, monkeypatch):
+    calls, _ = scrapes
+    fresh = BrandContext(brand_name="Fresh", website="https://fresh.test",
+                         product_catalog=[Product(handle="tee", title="Tee")],
+                         scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=time.time()))
+    stale = fresh.model_copy(update={"website": "https://stale.test", "scrape_meta": ScrapeMeta(
+        requested_at="", success=True, scraped_at=time.time() - settings.competitor_fresh_seconds - 60)})
+    with sessions() as db:
+        persist_brand_context(db, fresh)
+        persist_brand_context(db, stale)
+    similar(monkeypatch, "https://fresh.test", "https://stale.test")
+    found = asyncio.run(competitor.find_competitors(SHOP))
+    assert calls == ["https://stale.test"]
+    assert [(c.website, c.brand_name) for c in found] == [("https://fresh.test", "Fresh"), ("https://stale.test", "scraped")]
+    assert [p.handle for p in found[0].product_catalog] == ["tee"]
+
+def test_competitors_are_scraped_concurrently_within_the_budget(sessions, scrapes, monkeypatch):
+    calls, delays = scrapes
+    monkeypatch.setattr(settings, "competitor_budget_seconds", 0.5)
+    monkeypatch.setattr(settings, "competitor_limit", 4)
+    delays["https://slow.test"] = 5.0
+    similar(monkeypatch, "https://a.test", "https://b.test", "https://slow.test", "https://down.test")
+    errors = []
+    started = time.perf_counter()
+    found = asyncio.run(competitor.find_competitors(SHOP, errors=errors))
+    assert time.perf_counter() - started < 1.0
+    assert [c.website for c in found] == ["https://a.test", "https://b.test"]
+    assert len(calls) == 4
+    assert errors == ["Competitor https://slow.test not scraped within 0.5s"]
+
+def test_own_scrape_is_reused_for_keyword_guesses(sessions, scrapes, serve, monkeypatch):
+    store = serve(Store({}))
+    similar(monkeypatch)
+    brand = BrandContext(website=SHOP, brand_name="Hair Studio")
+    found = asyncio.run(competitor.find_competitors(SHOP, brand=brand))
+    assert [c.website for c in found] == ["https://hairoriginals.com", "https://examplehair.com"]
+    assert store.requests == []  # the homepage was not fetched again
+    assert edges(sessions) == []  # guesses are not stored
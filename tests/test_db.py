@@ -0,0 +1,62 @@
+"""SQLite engine tuning: pragmas, WAL readers, BEGIN IMMEDIATE writers and savepoints."""
+from __future__ import annotations
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.config import settings
+from app.models.db import make_engine
+
+@pytest.fixture
+def url(tmp_path):
+    return f"sqlite:///{tmp_path / 'tuned.db'}"
+
+def test_every_connection_is_tuned(url, monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_busy_timeout_ms", 1234)
+    engine = make_engine(url)
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 1234
+        assert pragma("cache_size") == -settings.sqlite_cache_kib
+    engine.dispose()
+
+def test_readers_do_not_wait_for_the_writer(url):
+    writer, reader = make_engine(url, write=True), make_engine(url)
+    with writer.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (v INTEGER)")
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+    with writer.connect() as conn:
+        conn.begin()
+        conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+        # the write transaction is open: readers see the last commit, without waiting
+        with reader.connect() as read:
+            assert read.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        conn.commit()
+    writer.dispose()
+    reader.dispose()
+
+def test_write_transactions_take_the_lock_up_front(url, monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_busy_timeout_ms", 100)
+    engine = make_engine(url, write=True)
+    with engine.connect() as first, engine.connect() as second:
+        first.begin()
+        # a second writer waits (here: busy_timeout) at BEGIN, before it has read
+        # anything it might act on
+        with pytest.raises(OperationalError, match="locked"):
+            second.begin()
+        first.rollback()
+    engine.dispose()
+
+def test_savepoints_roll_back_alone(url):
+    engine = make_engine(url, write=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (v INTEGER)")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        nested = conn.begin_nested()
+        conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+        nested.rollback()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT v FROM t")).scalars().all() == [1]
+    engine.dispose()
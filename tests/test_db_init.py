@@ -0,0 +1,46 @@
+"""Schema creation/upgrade when several worker processes start at once."""
+from __future__ import annotations
+import multiprocessing
+import sqlite3
+from sqlalchemy import create_engine, inspect
+
+WORKERS = 4
+
+def _start_worker(url: str, barrier) -> None:
+    # what each `uvicorn --workers N` process does at import of app.main; the
+    # engines are built from settings when app.models.db is first imported
+    from app.config import settings
+    settings.database_url = url
+    from app.models.db import init_db
+    barrier.wait()
+    init_db()
+
+def _start_together(url: str) -> list:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(WORKERS)
+    procs = [ctx.Process(target=_start_worker, args=(url, barrier)) for _ in range(WORKERS)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+    return [proc.exitcode for proc in procs]
+
+def test_workers_create_a_fresh_database_together(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    assert _start_together(url) == [0] * WORKERS
+    tables = set(inspect(create_engine(url)).get_table_names())
+    assert {"brands", "products", "product_changes", "scrape_jobs", "products_fts"} <= tables
+
+def test_workers_upgrade_an_old_database_together(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        # a database from before scraped_at and the change feed existed
+        conn.execute("CREATE TABLE brands (id INTEGER PRIMARY KEY, name VARCHAR(255), website VARCHAR(512))")
+        conn.execute("INSERT INTO brands (name, website) VALUES ('Old', 'https://old.test')")
+    url = f"sqlite:///{path}"
+    assert _start_together(url) == [0] * WORKERS
+    inspector = inspect(create_engine(url))
+    assert "scraped_at" in {c["name"] for c in inspector.get_columns("brands")}
+    assert "product_changes" in inspector.get_table_names()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT website FROM brands").fetchall() == [("https://old.test",)]
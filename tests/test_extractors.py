@@ -0,0 +1,96 @@
+"""Single-pass extractors: homepage data and FAQs, checked against the soup-based originals."""
+from __future__ import annotations
+import pytest
+from app.scraper.extractors import ANSWER_CAP, extract_faqs, extract_homepage
+from app.scraper.utils import make_soup
+from benchmarks import bench_faqs, bench_homepage
+
+BASE = "https://acme.test"
+
+HOMEPAGE = """<!doctype html><html><head><title>
+  Acme &amp; Co
+</title><script>var support = "script@acme.test";</script><style>.a{}</style></head><body>
+<header><a href="/">Home</a><a href="/collections/all">Shop</a></header>
+<main>
+  <div class="card"><a href="/products/linen-shirt" title="Linen Shirt"><img src="//cdn.test/linen.jpg"></a>
+    <h3><a href="/products/linen-shirt?variant=2">Linen Shirt</a></h3></div>
+  <div class="card"><a href="https://acme.test/collections/tops/products/cotton-tee"><span>Cotton <b>Tee</b></span></a></div>
+  <template><a href="/products/hidden">Hidden</a></template>
+  <a href="https://other.test/products/elsewhere">Partner</a>
+  <p>Questions? hello@acme.test or +1 (555) 010-9999<!-- ops@acme.test --></p>
+</main>
+<footer>
+  <a href="/pages/contact">Contact Us</a>
+  <a href="https://instagram.com/acme"><svg></svg> Instagram</a>
+  <a href="/policies/privacy-policy">Privacy Policy</a>
+  <a>No link</a>
+  <p>Unclosed <b>markup
+</footer></body></html>"""
+
+def test_homepage_extract():
+    home = extract_homepage(HOMEPAGE, BASE)
+    assert home.title == "Acme & Co"
+    assert home.product_cards == [
+        ("linen-shirt", "Linen Shirt", "//cdn.test/linen.jpg"),
+        ("cotton-tee", "Cotton Tee", None),
+        ("hidden", None, None),  # template text is not visible
+        ("elsewhere", "Partner", None),
+    ]
+    assert home.footer_links == {
+        "contact us": f"{BASE}/pages/contact",
+        "instagram": "https://instagram.com/acme",
+        "privacy policy": f"{BASE}/policies/privacy-policy",
+    }
+    # scripts and comments are not visible text
+    assert "hello@acme.test" in home.text and "script@" not in home.text and "ops@" not in home.text
+
+@pytest.mark.parametrize("html", [
+    HOMEPAGE,
+    bench_homepage.synthetic_page(120),
+    "<html><body><footer><a href='/a'>A</a></body>",
+    "<p>no document at all <a href=/products/x>X</a>",
+])
+def test_homepage_matches_the_soup_walks(html):
+    assert bench_homepage.single_pass(html, BASE) == bench_homepage.legacy(html, BASE)
+
+FAQ_PAGE = """<html><body><div class="rte">
+<h2>Shipping</h2><p>We ship worldwide.</p><p>Orders leave within <b>2 days</b>.</p>
+<h2>Returns</h2><p>30 days, unworn.</p>
+<h3></h3><p>An empty heading asks nothing.</p>
+<dl><dt>Duties</dt><dt>Taxes</dt><dd>Included at checkout.</dd><dt>Gift wrap</dt></dl>
+<details><summary>Do you restock?</summary><p>Weekly.</p>
+  <details><summary>Which days?</summary><p>Mondays.</p></details></details>
+<h2>Shipping</h2><p>We ship worldwide.</p><p>Orders leave within <b>2 days</b>.</p>
+<script>var faq = "<h2>Not a question</h2>";</script>
+</div></body></html>"""
+
+def faq_pairs(faqs):
+    return [(f.question, f.answer) for f in faqs]
+
+def test_faq_patterns_in_document_order():
+    assert faq_pairs(extract_faqs(FAQ_PAGE, "u")) == [
+        ("Shipping", "We ship worldwide. Orders leave within 2 days ."),
+        ("Returns", "30 days, unworn."),
+        ("Duties", "Included at checkout."),
+        ("Taxes", "Included at checkout."),
+        ("Which days?", "Mondays."),
+        ("Do you restock?", "Weekly. Which days? Mondays."),
+    ]
+
+def test_faq_limits():
+    long_answer = "<h3>Long?</h3>" + "<p>" + "word " * 600 + "</p>"
+    long_question = "<h3>" + "why " * 60 + "</h3><p>because</p>"
+    many = "".join(f"<h3>Q{i}?</h3><p>A{i}</p>" for i in range(50))
+    faqs = extract_faqs(f"<html><body>{long_answer}{long_question}{many}</body></html>", "u", 10)
+    assert len(faqs) == 10 and faqs[-1].question == "Q8?"
+    assert len(faqs[0].answer) <= ANSWER_CAP
+    assert all(not f.question.startswith("why") for f in faqs)
+
+def test_flat_faq_page_matches_the_tree_walk():
+    html = "<html><body>" + "".join(
+        f"<h3>Question {i}?</h3><p>Answer {i} with <a href='#'>a link</a>.</p> tail {i}"
+        f"<dl><dt>Term {i}</dt><dd>Definition {i}</dd></dl><details><summary>More {i}</summary><p>Detail {i}</p></details>"
+        for i in range(40)
+    ) + "</body></html>"
+    reference = bench_faqs.faqs_from_soup(make_soup(html, "bs4"), "u")
+    assert sorted(faq_pairs(extract_faqs(html, "u", 10 ** 9))) == sorted(set(faq_pairs(reference)))
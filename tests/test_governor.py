@@ -0,0 +1,101 @@
+"""Per-host governor: retries, Retry-After, the rate limit and the circuit breaker."""
+from __future__ import annotations
+import asyncio
+import time
+from email.utils import formatdate
+import httpx
+import pytest
+from app.config import settings
+from app.scraper import utils
+from conftest import Store
+
+URL = "https://gov.test/products.json"
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(settings, "http_retry_base_seconds", 0.01)
+    monkeypatch.setattr(settings, "per_host_burst", 100)
+
+def sequence(*responses):
+    """A route answering with each response in turn, then the last one forever."""
+    queue = list(responses)
+
+    def route(request):
+        response = queue.pop(0) if len(queue) > 1 else queue[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return route
+
+def fetch(store: Store, *urls: str, each=utils.fetch_text):
+    async def run():
+        async with store.client() as client:
+            return [await each(client, url) for url in urls]
+    return asyncio.run(run())
+
+def test_server_errors_are_retried():
+    store = Store({"/products.json": sequence((503, "busy"), (502, "bad gateway"), "ok")})
+    assert fetch(store, URL) == [("ok", 200)]
+    assert store.count("/products.json") == 3
+
+def test_client_errors_are_not_retried():
+    store = Store({"/products.json": sequence((404, "missing"))})
+    assert fetch(store, URL) == [(None, 404)]
+    assert store.count("/products.json") == 1
+
+def test_connection_errors_are_retried():
+    store = Store({"/products.json": sequence(httpx.ConnectError("reset"), "ok")})
+    assert fetch(store, URL) == [("ok", 200)]
+
+def test_timeouts_are_not_retried():
+    store = Store({"/products.json": sequence(httpx.ReadTimeout("slow"), "ok")})
+    assert fetch(store, URL) == [(None, None)]
+    assert store.count("/products.json") == 1
+
+def test_retry_after_is_waited_out_and_slows_the_host():
+    store = Store({"/products.json": sequence((429, "slow down", {"Retry-After": "1"}), "ok")})
+    started = time.perf_counter()
+    assert fetch(store, URL) == [("ok", 200)]
+    assert time.perf_counter() - started >= 1.0
+    assert utils.host_state(URL).rate == settings.per_host_rate / 2 + 0.1
+
+def test_long_retry_after_is_not_waited(monkeypatch):
+    monkeypatch.setattr(settings, "retry_after_max_seconds", 5.0)
+    store = Store({"/products.json": sequence((429, "come back tomorrow", {"Retry-After": "86400"}))})
+    started = time.perf_counter()
+    assert fetch(store, URL) == [(None, 429)]
+    assert time.perf_counter() - started < 1.0 and store.count("/products.json") == 1
+
+def test_retry_after_forms():
+    assert utils._retry_after("7") == 7.0
+    assert 25 <= utils._retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert utils._retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert utils._retry_after("soon") is None
+
+def test_breaker_opens_then_half_opens(monkeypatch):
+    monkeypatch.setattr(settings, "http_retries", 0)
+    monkeypatch.setattr(settings, "breaker_failures", 3)
+    monkeypatch.setattr(settings, "breaker_cooldown_seconds", 0.2)
+    store = Store({"/products.json": sequence((500, "down"))})
+    # three failures open it; the next requests fail fast without reaching the store
+    assert fetch(store, *[URL] * 5) == [(None, 500)] * 3 + [(None, None)] * 2
+    assert store.count("/products.json") == 3
+    with pytest.raises(utils.HostUnavailable):
+        fetch(store, URL, each=utils._get)
+    time.sleep(0.25)
+    # after the cooldown one request goes through; failing again reopens at once
+    assert fetch(store, URL, URL) == [(None, 500), (None, None)]
+    assert store.count("/products.json") == 4
+    time.sleep(0.25)
+    store.routes["/products.json"] = "ok"
+    assert fetch(store, URL, URL) == [("ok", 200)] * 2
+    assert utils.host_state(URL).failures == 0
+
+def test_rate_limit_spaces_requests(monkeypatch):
+    monkeypatch.setattr(settings, "per_host_burst", 2)
+    monkeypatch.setattr(settings, "per_host_rate", 20.0)
+    store = Store({"/products.json": "ok"})
+    started = time.perf_counter()
+    fetch(store, *[URL] * 6)
+    # two from the burst, then one every 50ms
+    assert time.perf_counter() - started >= 0.18
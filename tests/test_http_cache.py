@@ -0,0 +1,112 @@
+"""HTTP response cache: revalidation, TTL hits, byte-bounded LRU and persistence."""
+from __future__ import annotations
+import asyncio
+import time
+import httpx
+import pytest
+from app.config import settings
+from app.scraper import utils
+from app.scraper.http_cache import HttpCache
+
+class StubStore:
+    """MockTransport handler serving one body per path with a fixed ETag."""
+    def __init__(self, bodies):
+        self.bodies = dict(bodies)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.url.path, request.headers.get("if-none-match")))
+        body = self.bodies.get(request.url.path)
+        if body is None:
+            return httpx.Response(404, text="nope")
+        etag = '"%x"' % (hash(body) & 0xffffffff)
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, text=body, headers={"ETag": etag, "Content-Type": "text/html"})
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = HttpCache(1024 * 1024, {"default": 0.0, "page": 60.0})
+    monkeypatch.setattr(utils, "http_cache", fresh)
+    monkeypatch.setattr(settings, "http_cache_enabled", True)
+    return fresh
+
+def fetch(store: StubStore, *urls: str):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(store)) as client:
+            return [await utils.fetch_text(client, url) for url in urls]
+    return asyncio.run(run())
+
+def test_expired_entry_is_revalidated_with_304(cache):
+    store = StubStore({"/": "<html>home</html>"})
+    first, second = fetch(store, "https://revalidate.test/", "https://revalidate.test/")
+    assert first == second == ("<html>home</html>", 200)
+    # default TTL is 0: the second GET is conditional and answered with 304
+    assert store.requests[1][1] is not None
+    assert cache.revalidated == 1 and cache.misses == 1
+
+def test_changed_body_replaces_entry(cache):
+    store = StubStore({"/": "old"})
+    fetch(store, "https://changed.test/")
+    store.bodies["/"] = "new"
+    assert fetch(store, "https://changed.test/") == [("new", 200)]
+    assert cache.get("https://changed.test/").body == "new"
+
+def test_fresh_entry_is_served_without_a_request(cache):
+    store = StubStore({"/pages/faq": "faq"})
+    fetch(store, "https://ttl.test/pages/faq", "https://ttl.test/pages/faq")
+    assert len(store.requests) == 1
+    assert cache.hits == 1
+
+def test_entry_past_its_ttl_is_revalidated(cache):
+    store = StubStore({"/pages/faq": "faq"})
+    fetch(store, "https://stale.test/pages/faq")
+    cache.get("https://stale.test/pages/faq").stored_at = time.time() - 120
+    fetch(store, "https://stale.test/pages/faq")
+    assert len(store.requests) == 2 and cache.revalidated == 1
+
+def test_errors_are_not_cached(cache):
+    store = StubStore({})
+    assert fetch(store, "https://missing.test/x") == [(None, 404)]
+    assert cache.get("https://missing.test/x") is None
+
+def test_lru_evicts_by_bytes():
+    cache = HttpCache(max_bytes=100, ttls={"default": 60.0})
+    for name in "abc":
+        cache.put(f"https://lru.test/{name}", 200, name * 10, None, None)
+    cache.get("https://lru.test/a")  # a is now the most recently used
+    for name in "defghijk":
+        cache.put(f"https://lru.test/{name}", 200, name * 10, None, None)
+    # 110 bytes put: the least recently used entry (b) went
+    assert cache.stats()["bytes"] == 100
+    assert cache.get("https://lru.test/b") is None
+    assert cache.get("https://lru.test/a") is not None
+    assert cache.get("https://lru.test/c") is not None
+
+def test_oversized_body_is_not_cached():
+    cache = HttpCache(max_bytes=1000, ttls={"default": 60.0})
+    cache.put("https://big.test/", 200, "x" * 200, None, None)
+    assert cache.get("https://big.test/") is None
+
+def test_save_and_load_round_trip(tmp_path):
+    cache = HttpCache(1024, {"default": 60.0})
+    cache.put("https://saved.test/", 200, "body", '"v1"', "Tue, 01 Oct 2024 00:00:00 GMT")
+    path = str(tmp_path / "http_cache.json")
+    cache.save(path)
+
+    loaded = HttpCache(1024, {"default": 60.0})
+    loaded.load(path)
+    entry = loaded.get("https://saved.test/")
+    assert (entry.status, entry.body, entry.etag) == (200, "body", '"v1"')
+    assert loaded.conditional_headers(entry) == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Tue, 01 Oct 2024 00:00:00 GMT",
+    }
+    assert loaded.is_fresh("https://saved.test/", entry)
+
+def test_load_ignores_missing_or_corrupt_file(tmp_path):
+    cache = HttpCache(1024, {"default": 60.0})
+    cache.load(str(tmp_path / "absent.json"))
+    corrupt = tmp_path / "corrupt.json"
+    corrupt.write_text("{not json")
+    cache.load(str(corrupt))
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,126 @@
+"""Re-scrape job queue: leases, adaptive intervals, backoff and the worker loop."""
+from __future__ import annotations
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.models import models
+from app.models.db import init_db, make_engine
+from app.models.schemas import BrandContext, ScrapeMeta
+from app.services import jobs
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(jobs, "WriteSessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+def add(sessions, *websites, **kwargs):
+    with sessions() as db:
+        return [jobs.enqueue(db, w, **kwargs).id for w in websites]
+
+def test_enqueue_updates_the_stores_job(sessions):
+    first = add(sessions, "acme.test", priority=1)
+    again = add(sessions, "https://acme.test/", priority=5, interval_seconds=60)
+    assert first == again
+    with sessions() as db:
+        job = db.get(models.ScrapeJob, first[0])
+        assert (job.website_url, job.priority, job.interval_seconds) == ("https://acme.test", 5, 60)
+
+def test_due_jobs_are_claimed_by_priority(sessions):
+    low, high = add(sessions, "low.test"), add(sessions, "high.test", priority=9)
+    add(sessions, "later.test", run_at=time.time() + 3600)
+    with sessions() as db:
+        assert [j.id for j in jobs.claim(db, "w1", 1)] == high
+        assert [j.id for j in jobs.claim(db, "w2", 5)] == low
+        assert jobs.claim(db, "w3", 5) == []
+
+def test_concurrent_claims_never_share_a_job(sessions):
+    add(sessions, *[f"s{i}.test" for i in range(20)])
+
+    def worker(n):
+        with sessions() as db:
+            return [j.id for j in jobs.claim(db, f"w{n}", 8)]
+
+    with ThreadPoolExecutor(4) as pool:
+        claimed = [job_id for ids in pool.map(worker, range(4)) for job_id in ids]
+    assert len(claimed) == len(set(claimed)) == 20
+
+def test_expired_lease_is_claimed_again(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "job_lease_seconds", -1.0)
+    job_id = add(sessions, "crashed.test")
+    with sessions() as db:
+        assert [j.id for j in jobs.claim(db, "dead", 1)] == job_id
+        assert [j.id for j in jobs.claim(db, "alive", 1)] == job_id
+        # the first owner lost its lease: its completion is ignored
+        jobs.complete(db, job_id[0], "dead", changed=True)
+        assert db.get(models.ScrapeJob, job_id[0]).lease_owner == "alive"
+
+def test_interval_adapts_to_changes(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "job_min_interval_seconds", 1000.0)
+    job_id = add(sessions, "adapt.test", interval_seconds=4000)[0]
+    with sessions() as db:
+        intervals = []
+        for changed in (True, True, True, False):
+            jobs.claim(db, "w", 1)
+            jobs.complete(db, job_id, "w", changed)
+            job = db.get(models.ScrapeJob, job_id)
+            intervals.append(job.interval_seconds)
+            db.execute(models.ScrapeJob.__table__.update().values(next_run_at=0))
+            db.commit()
+        assert intervals == [2000, 1000, 1000, 1500]
+        assert (job.runs, job.lease_owner, job.last_error) == (4, None, None)
+
+def test_failures_back_off_then_fall_back_to_the_schedule(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "job_retry_base_seconds", 10.0)
+    monkeypatch.setattr(settings, "job_max_attempts", 2)
+    job_id = add(sessions, "down.test", interval_seconds=5000)[0]
+    with sessions() as db:
+        delays = []
+        for _ in range(3):
+            db.execute(models.ScrapeJob.__table__.update().values(next_run_at=0))
+            db.commit()
+            jobs.claim(db, "w", 1)
+            started = time.time()
+            jobs.fail(db, job_id, "w", "ConnectError: refused")
+            delays.append(db.get(models.ScrapeJob, job_id).next_run_at - started)
+        assert 5 <= delays[0] <= 15 and 10 <= delays[1] <= 30
+        assert 2500 <= delays[2] <= 7500
+        assert db.get(models.ScrapeJob, job_id).last_error == "ConnectError: refused"
+        assert jobs.metrics(db)["retrying"] == 0
+
+def test_worker_runs_due_jobs(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "job_poll_seconds", 0.01)
+    scraped = []
+
+    async def fake(website_url, persist=False, force_refresh=False, wait_for_persist=True):
+        scraped.append(website_url)
+        if "broken" in website_url:
+            raise ConnectionError("unreachable")
+        meta = ScrapeMeta(requested_at="", success=True, persist_stats={"inserted": 1})
+        return BrandContext(website=website_url, scrape_meta=meta)
+
+    monkeypatch.setattr(jobs, "fetch_and_optionally_persist", fake)
+    ok, broken = add(sessions, "ok.test", "broken.test")
+
+    async def run():
+        stop = asyncio.Event()
+        worker = asyncio.ensure_future(jobs.run_worker(concurrency=2, stop=stop, worker_id="w"))
+        while len(scraped) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        stop.set()
+        await worker
+
+    asyncio.run(run())
+    assert sorted(scraped) == ["https://broken.test", "https://ok.test"]
+    with sessions() as db:
+        done, failed = db.get(models.ScrapeJob, ok), db.get(models.ScrapeJob, broken)
+        assert (done.runs, done.lease_owner, done.last_changed_at is not None) == (1, None, True)
+        assert (failed.attempts, failed.lease_owner) == (1, None)
+        assert "unreachable" in failed.last_error
@@ -0,0 +1,39 @@
+"""Parse process pool: extraction survives a worker that dies."""
+from __future__ import annotations
+import asyncio
+import os
+import signal
+import time
+import pytest
+from app.config import settings
+from app.scraper import offload
+from app.scraper.extractors import extract_faqs
+
+PAGE = "<html><body><h3>Do you ship abroad?</h3><p>Yes, to most countries.</p></body></html>"
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "parse_pool_workers", 1)
+    monkeypatch.setattr(settings, "parse_offload_min_bytes", 1)
+    yield
+    offload.shutdown_pool()
+
+def extract():
+    return asyncio.run(offload.run_cpu(extract_faqs, PAGE, "https://pool.test/pages/faq"))
+
+def test_killed_worker_does_not_break_later_extractions(pool):
+    expected = extract_faqs(PAGE, "https://pool.test/pages/faq")
+    assert extract() == expected
+    broken = offload._pool
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+    deadline = time.monotonic() + 10
+    while not broken._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    # the call that finds the pool broken is extracted inline...
+    assert extract() == expected
+    assert offload._pool is None
+    # ...and the next one runs in a fresh pool
+    assert extract() == expected
+    assert offload._pool is not None and offload._pool is not broken
@@ -0,0 +1,62 @@
+"""Streamed page text: stop reading at the text cap, reject from headers, match get_text."""
+from __future__ import annotations
+import asyncio
+import httpx
+import pytest
+from app.config import settings
+from app.scraper import utils
+from app.scraper.utils import make_soup
+
+URL = "https://stream.test/policies/privacy-policy"
+CHUNK = "<p>" + "Every clause of this policy is spelled out here. " * 20 + "</p>"
+
+class Streamer:
+    """Serves `chunks` of HTML lazily and counts how many were read."""
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+        self.sent = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        async def body():
+            for chunk in self.chunks:
+                self.sent += 1
+                yield chunk.encode()
+        return httpx.Response(200, headers=self.headers, content=body())
+
+def fetch(streamer: Streamer, cap: int):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(streamer)) as client:
+            return await utils.fetch_page_text(client, URL, cap)
+    return asyncio.run(run())
+
+def test_download_stops_at_the_text_cap():
+    chunks = ["<html><head><style>p{}</style><script>var x = 1;</script></head><body><h1>Privacy</h1>"]
+    chunks += [CHUNK] * 1000 + ["</body></html>"]
+    streamer = Streamer(chunks)
+    text, status = fetch(streamer, 2000)
+    assert status == 200
+    assert streamer.sent < 10
+    assert text == make_soup("".join(chunks), "bs4").get_text("\n", strip=True)[:2000]
+
+def test_whole_page_text_matches_get_text():
+    html = ("<html><body><div>Intro <b>bold</b> tail</div><!-- note --><template>hidden</template>"
+            "<ul><li>One</li><li> Two </li></ul><p>&amp; entities &eacute;</p></body></html>")
+    text, _ = fetch(Streamer([html[:40], html[40:90], html[90:]]), 15000)
+    assert text == make_soup(html, "bs4").get_text("\n", strip=True)
+
+@pytest.mark.parametrize("headers", [
+    {"Content-Type": "application/pdf"},
+    {"Content-Length": str(10 * 1024 * 1024)},
+])
+def test_rejected_from_headers_without_reading(headers):
+    streamer = Streamer([CHUNK] * 10, headers)
+    assert fetch(streamer, 2000) == (None, 200)
+    assert streamer.sent == 0
+
+def test_oversized_body_is_abandoned(monkeypatch):
+    monkeypatch.setattr(settings, "max_page_bytes", 20_000)
+    # text that never fills the cap: only markup
+    streamer = Streamer(["<html><body>"] + ["<div></div>" * 100] * 1000)
+    fetch(streamer, 15000)
+    assert streamer.sent < 30
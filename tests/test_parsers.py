@@ -0,0 +1,78 @@
+"""Parser backends: the lxml backend reads /collections/all exactly as the bs4 reference does."""
+from __future__ import annotations
+import asyncio
+import pytest
+from app.config import settings
+from app.scraper.shopify_scraper import _iter_collection_products
+from app.scraper.utils import PageCache
+from conftest import Store
+
+BASE = "https://store.test"
+
+# Trimmed from Dawn and Debut theme collection pages: product cards link the
+# same handle more than once, titles carry entities and nested markup, and
+# scripts mention /products/ URLs that are not links
+DAWN = """<!doctype html><html class="no-js" lang="en"><head>
+<meta charset="utf-8"><title>Products &ndash; Store</title>
+<script>window.ShopifyAnalytics = {"products": ["/products/hidden-in-script"]};</script>
+<link rel="preload" href="/products/not-an-anchor">
+</head><body>
+<ul id="product-grid" class="grid product-grid">
+<li class="grid__item"><div class="card-wrapper product-card-wrapper">
+  <div class="card card--standard card--media"><div class="card__inner">
+    <div class="card__media"><div class="media media--transparent">
+      <img srcset="//store.test/cdn/shop/files/linen.jpg?v=1&width=165 165w" src="//store.test/cdn/shop/files/linen.jpg?v=1&width=533" alt="Linen Shirt" loading="lazy">
+    </div></div></div>
+  <div class="card__content"><h3 class="card__heading h5">
+    <a href="/products/linen-shirt" id="CardLink-1" class="full-unstyled-link" aria-labelledby="CardLink-1 Badge-1">
+      Linen   Shirt &amp; Co
+    </a></h3>
+    <div class="price"><span class="price-item">$48.00</span></div>
+  </div></div></li>
+<li class="grid__item"><div class="card-wrapper">
+  <a href="/collections/all/products/cotton-tee?variant=4011" class="card__link" title="Cotton Tee &#8211; White">
+    <span class="visually-hidden">Cotton Tee</span>
+    <img src="//store.test/cdn/shop/files/tee.jpg?v=2" alt="">
+  </a>
+  <a href="/products/cotton-tee" class="quick-add">Quick add</a>
+</div></li>
+<li class="grid__item"><a href="https://store.test/products/wool_scarf.v2#reviews"><span>Wool <em>Scarf</em></span>
+  <template><span>Sold out</span></template></a></li>
+<li class="grid__item"><a href="/products/"><span>No handle</span></a>
+  <a href="/pages/about">About</a><a>no href</a>
+  <a href="/products/gift-card"><img data-src="/lazy.jpg"></a>
+</li>
+</ul>
+<div class="pagination"><a href="/collections/all?page=2">2</a>
+<p>unclosed <b>markup <a href="/products/last-one">Last one
+</body></html>"""
+
+def scrape(monkeypatch, backend: str, html: str):
+    monkeypatch.setattr(settings, "parser_backend", backend)
+
+    async def go():
+        async with Store({"/collections/all": html}).client() as client:
+            return [p async for p in _iter_collection_products(PageCache(client), BASE)]
+
+    return asyncio.run(go())
+
+def test_collection_fallback_reads_dawn_cards(monkeypatch):
+    products = scrape(monkeypatch, "bs4", DAWN)
+    assert [(p.handle, p.title, p.images) for p in products] == [
+        ("linen-shirt", "Linen   Shirt & Co", None),
+        ("cotton-tee", "Cotton Tee – White", ["//store.test/cdn/shop/files/tee.jpg?v=2"]),
+        ("wool_scarf.v2", "Wool Scarf", None),
+        ("gift-card", None, None),
+        ("last-one", "Last one", None),
+    ]
+    assert products[0].url == f"{BASE}/products/linen-shirt"
+
+@pytest.mark.parametrize("html", [
+    DAWN,
+    "",
+    "<html><body><a href='/products/only'>Only</a>",
+    "<a href='/products/bare'>no document</a><a href='/products/bare'>dupe</a>",
+])
+def test_lxml_backend_matches_reference(monkeypatch, html):
+    reference = [p.model_dump() for p in scrape(monkeypatch, "bs4", html)]
+    assert [p.model_dump() for p in scrape(monkeypatch, "lxml", html)] == reference
@@ -0,0 +1,133 @@
+"""Persistence: incremental product sync, the change feed and the FTS triggers, on a temporary SQLite file."""
+from __future__ import annotations
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.models import models
+from app.models.db import init_db, make_engine
+from app.models.schemas import FAQ, BrandContext, Product, ScrapeMeta
+from app.services import search
+from app.services.insights_service import persist_brand_context, product_changes
+
+WEBSITE = "https://persist.test"
+
+@pytest.fixture
+def db(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    with sessionmaker(bind=engine, future=True)() as session:
+        yield session
+    engine.dispose()
+
+def scrape(scraped_at: float, *titles: str, faqs=(), **meta) -> BrandContext:
+    return BrandContext(
+        brand_name="Persist", website=WEBSITE,
+        product_catalog=[Product(handle=t.lower().replace(" ", "-"), title=t) for t in titles],
+        faqs=[FAQ(question=q, answer="a") for q in faqs],
+        scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=scraped_at, **meta),
+    )
+
+def stored(db):
+    return {handle: id_ for id_, handle in db.execute(select(models.Product.id, models.Product.handle))}
+
+def feed(db, brand_id, **kwargs):
+    return product_changes(db, brand_id, **kwargs)["changes"]
+
+def test_change_feed_refers_to_stored_products(db):
+    stats = persist_brand_context(db, scrape(1, "Linen Shirt", "Cotton Tee"))
+    assert (stats["inserted"], stats["deleted"]) == (2, 0)
+    ids = stored(db)
+    assert {(c["change"], c["handle"], c["product_id"]) for c in feed(db, stats["brand_id"])} == {
+        ("added", "linen-shirt", ids["linen-shirt"]), ("added", "cotton-tee", ids["cotton-tee"]),
+    }
+
+    before = feed(db, stats["brand_id"])[-1]["id"]
+    ctx = scrape(2, "Linen Shirt", "Wool Scarf")
+    ctx.product_catalog[0].vendor = "Mill"
+    stats = persist_brand_context(db, ctx)
+    assert (stats["inserted"], stats["updated"], stats["deleted"]) == (1, 1, 1)
+    latest = {c["handle"]: c for c in feed(db, stats["brand_id"], after_id=before)}
+    assert latest["wool-scarf"]["change"] == "added" and latest["wool-scarf"]["product_id"] == stored(db)["wool-scarf"]
+    assert latest["linen-shirt"]["change"] == "changed" and latest["linen-shirt"]["fields"] == ["vendor"]
+    assert latest["cotton-tee"]["change"] == "removed" and latest["cotton-tee"]["product_id"] == ids["cotton-tee"]
+
+def test_change_feed_pages_by_id(db):
+    brand_id = persist_brand_context(db, scrape(1, *[f"Item {i}" for i in range(5)]))["brand_id"]
+    page = product_changes(db, brand_id, limit=3)
+    assert len(page["changes"]) == 3 and page["has_more"]
+    rest = product_changes(db, brand_id, after_id=page["next_after_id"], limit=3)
+    assert len(rest["changes"]) == 2 and not rest["has_more"]
+    assert {c["handle"] for c in page["changes"] + rest["changes"]} == {f"item-{i}" for i in range(5)}
+
+def test_incomplete_catalog_removes_nothing(db):
+    persist_brand_context(db, scrape(1, "Linen Shirt", "Cotton Tee"))
+    stats = persist_brand_context(db, scrape(2, "Linen Shirt", catalog_complete=False))
+    assert stats["deleted"] == 0
+    assert set(stored(db)) == {"linen-shirt", "cotton-tee"}
+    assert all(c["change"] != "removed" for c in feed(db, stats["brand_id"]))
+
+def test_older_scrape_is_not_persisted_again(db):
+    persist_brand_context(db, scrape(2, "Linen Shirt"))
+    stats = persist_brand_context(db, scrape(1, "Cotton Tee"))
+    assert stats["skipped"]
+    assert set(stored(db)) == {"linen-shirt"}
+
+def test_cut_stage_keeps_stored_rows(db):
+    persist_brand_context(db, scrape(1, "Linen Shirt", faqs=["Do you ship?"]))
+    persist_brand_context(db, scrape(2, "Linen Shirt", cut_stages=["faqs"]))
+    assert db.scalars(select(models.FAQ.question)).all() == ["Do you ship?"]
+
+def test_search_index_follows_product_writes(db):
+    if not search.search_available(db):
+        pytest.skip("SQLite without FTS5")
+    persist_brand_context(db, scrape(1, "Linen Shirt", "Cotton Tee"))
+    db.commit()
+    assert [r["title"] for r in search.search(db, "linen")["results"]] == ["Linen Shirt"]
+    persist_brand_context(db, scrape(2, "Cotton Tee"))
+    db.commit()
+    assert search.search(db, "linen")["results"] == []
+    with pytest.raises(ValueError):
+        search.search(db, "linen", mode="fuzzy")
+
+def test_added_ids_without_returning(db, monkeypatch):
+    monkeypatch.setattr(db.get_bind().dialect, "insert_executemany_returning", False)
+    persist_brand_context(db, scrape(1, "Linen Shirt"))
+    brand_id = persist_brand_context(db, scrape(2, "Linen Shirt", "Cotton Tee"))["brand_id"]
+    added = [c for c in feed(db, brand_id) if c["handle"] == "cotton-tee"]
+    assert [c["product_id"] for c in added] == [stored(db)["cotton-tee"]]
+
+@pytest.fixture
+def statements(db):
+    seen = []
+    engine = db.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement.split("(")[0].split(" WHERE")[0].strip())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+def test_catalog_is_written_in_chunked_batches(db, statements, monkeypatch):
+    monkeypatch.setattr(settings, "persist_chunk_size", 500)
+    stats = persist_brand_context(db, scrape(1, *[f"Item {i}" for i in range(1200)]))
+    assert stats["inserted"] == 1200
+    assert statements.count("INSERT INTO products") == 3
+    assert statements.count("INSERT INTO product_changes") == 3
+
+def test_unchanged_catalog_writes_no_product_rows(db, statements):
+    persist_brand_context(db, scrape(1, *[f"Item {i}" for i in range(50)]))
+    statements.clear()
+    stats = persist_brand_context(db, scrape(2, *[f"Item {i}" for i in range(50)]))
+    assert (stats["unchanged"], stats["inserted"], stats["updated"], stats["deleted"]) == (50, 0, 0, 0)
+    assert not [s for s in statements if s.startswith(("INSERT INTO product", "UPDATE products", "DELETE FROM products"))]
+
+def test_new_updated_at_refreshes_without_a_change(db):
+    persist_brand_context(db, scrape(1, "Linen Shirt"))
+    ctx = scrape(2, "Linen Shirt")
+    ctx.product_catalog[0].updated_at = "2024-02-01T00:00:00Z"
+    stats = persist_brand_context(db, ctx)
+    assert (stats["refreshed"], stats["updated"]) == (1, 0)
+    assert db.scalar(select(models.Product.updated_at)) == "2024-02-01T00:00:00Z"
+    assert [c["change"] for c in feed(db, stats["brand_id"])] == ["added"]
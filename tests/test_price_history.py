@@ -0,0 +1,53 @@
+"""Price history: change detection, and observations from processes that are not the writer."""
+from __future__ import annotations
+import os
+import pytest
+from app.models.schemas import Product, Variant
+
+np = pytest.importorskip("numpy")
+from app.services.price_history import SPOOL, PriceHistory  # noqa: E402
+
+def product(price: float) -> Product:
+    return Product(id=7, handle="tee", variants=[Variant(id=70, price=price), Variant(id=71, price=5.0)])
+
+def open_history(path) -> PriceHistory:
+    # flock conflicts between separate opens, so two instances stand in for two processes
+    return PriceHistory(str(path), segment_rows=1000, flush_seconds=3600)
+
+def changed(history: PriceHistory):
+    cols = history.changes(0)
+    return sorted(zip(cols["variant_id"].tolist(), cols["prev_price"].tolist(), cols["price"].tolist()))
+
+def test_price_change_is_recorded(tmp_path):
+    history = open_history(tmp_path)
+    history.record(1, [product(10.0)], observed_at=1000)
+    history.record(1, [product(12.5)], observed_at=2000)
+    assert changed(history) == [(70, 1000, 1250)]
+    history.flush()
+    assert changed(open_history(tmp_path)) == [(70, 1000, 1250)]
+
+def test_other_processes_spool_for_the_writer(tmp_path):
+    writer, worker = open_history(tmp_path), open_history(tmp_path)
+    assert writer.writable() and not worker.writable()
+    writer.record(1, [product(10.0)], observed_at=1000)
+    worker.record(1, [product(12.0)], observed_at=2000)
+    assert os.listdir(tmp_path / SPOOL)
+
+    # the writer folds the spooled batch in on its next read, flush or append
+    assert changed(writer) == [(70, 1000, 1200)]
+    writer.flush()
+    assert os.listdir(tmp_path / SPOOL) == []
+    assert changed(worker) == [(70, 1000, 1200)]
+
+def test_writer_role_moves_on_when_the_writer_exits(tmp_path):
+    writer, worker = open_history(tmp_path), open_history(tmp_path)
+    writer.record(1, [product(10.0)], observed_at=1000)
+    writer.flush()
+    worker.record(1, [product(11.0)], observed_at=2000)  # spooled, the writer never drains it
+    writer._writer.close()  # process exit releases the lock
+
+    worker.record(1, [product(9.0)], observed_at=3000)
+    assert worker.writable()
+    worker.flush()
+    assert changed(open_history(tmp_path)) == [(70, 1000, 1100), (70, 1100, 900)]
+    assert os.listdir(tmp_path / SPOOL) == []
@@ -0,0 +1,75 @@
+"""Brand result cache: single-flight scrapes, stale-while-revalidate and LRU eviction."""
+from __future__ import annotations
+import asyncio
+from app.models.schemas import BrandContext, Product, ScrapeMeta
+from app.services.result_cache import BrandResultCache, estimated_size
+
+class Loader:
+    """Stands in for a scrape; counts calls per store."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, website_url: str) -> BrandContext:
+        self.calls.append(website_url)
+        await asyncio.sleep(self.delay)
+        return BrandContext(website=website_url, brand_name=f"v{len(self.calls)}",
+                            scrape_meta=ScrapeMeta(requested_at="", success=True))
+
+def test_concurrent_requests_share_one_scrape():
+    cache, loader = BrandResultCache(60, 0, 10, 10**6), Loader(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("https://one.test", loader) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert loader.calls == ["https://one.test"]
+    assert {r.scrape_meta.result_cache for r in results} == {"miss"}
+    # each caller gets its own scrape_meta to mutate
+    results[0].scrape_meta.errors.append("mine")
+    assert results[1].scrape_meta.errors == []
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    cache, loader = BrandResultCache(0, 60, 10, 10**6), Loader()
+
+    async def run():
+        first = await cache.get("https://stale.test", loader)
+        second = await cache.get("https://stale.test", loader)
+        await asyncio.sleep(0.01)  # let the background refresh finish
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second.scrape_meta.result_cache == "stale" and second.brand_name == "v1"
+    assert len(loader.calls) == 2
+    assert cache._entries["https://stale.test"][0].brand_name == "v2"
+
+def test_eviction_is_least_recently_used():
+    cache, loader = BrandResultCache(60, 0, 2, 10**6), Loader()
+
+    async def run():
+        await cache.get("https://a.test", loader)
+        await cache.get("https://b.test", loader)
+        await cache.get("https://a.test", loader)  # a is now the most recently used
+        await cache.get("https://c.test", loader)
+
+    asyncio.run(run())
+    assert list(cache._entries) == ["https://a.test", "https://c.test"]
+
+def test_byte_bound_and_size_estimate():
+    products = [Product(id=i, handle=f"h{i}", title=f"Product {i}", tags=["a", "b"]) for i in range(1000)]
+    ctx = BrandContext(website="https://big.test", product_catalog=products)
+    exact = len(ctx.model_dump_json())
+    assert abs(estimated_size(ctx) - exact) < exact * 0.05
+
+    cache = BrandResultCache(60, 0, 10, exact * 3 // 2)
+
+    async def load(url: str) -> BrandContext:
+        return ctx.model_copy(update={"website": url})
+
+    async def run():
+        await cache.get("https://big1.test", load)
+        await cache.get("https://big2.test", load)
+
+    asyncio.run(run())
+    assert list(cache._entries) == ["https://big2.test"]
+    assert cache.bytes == cache._entries["https://big2.test"][2]
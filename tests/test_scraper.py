@@ -0,0 +1,56 @@
+"""Scrape pipeline against an in-process store: page probes and the sitemap."""
+from __future__ import annotations
+import asyncio
+import time
+from app.scraper.shopify_scraper import fetch_faqs, fetch_policy_page
+from app.scraper.utils import PageCache
+from conftest import Store
+
+BASE = "https://store.test"
+TEXT = "<html><body><p>" + "Our policy explains everything in detail. " * 10 + "</p></body></html>"
+
+def sitemap(*paths: str) -> dict:
+    urls = "".join(f"<url><loc>{BASE}{p}</loc></url>" for p in paths)
+    return {
+        "/sitemap.xml": f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        f"<sitemap><loc>{BASE}/sitemap_pages_1.xml</loc></sitemap></sitemapindex>",
+        "/sitemap_pages_1.xml": f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>',
+    }
+
+def run(store: Store, probe, sitemap_first: bool = False):
+    async def go():
+        async with store.client() as client:
+            pages = PageCache(client)
+            # as in _scrape_brand: the sitemap is read alongside everything else
+            reading = asyncio.ensure_future(pages.sitemap(BASE, 30))
+            if sitemap_first:
+                await reading
+            started = time.perf_counter()
+            try:
+                return await probe(pages), time.perf_counter() - started
+            finally:
+                reading.cancel()
+                pages.cancel_pending()
+    return asyncio.run(go())
+
+def test_first_candidate_does_not_wait_for_the_sitemap():
+    store = Store({**sitemap("/policies/privacy-policy"), "/policies/privacy-policy": TEXT},
+                  delays={"/sitemap.xml": 2.0})
+    policy, seconds = run(store, lambda pages: fetch_policy_page(pages, BASE, "privacy", {}))
+    assert policy.url == f"{BASE}/policies/privacy-policy"
+    assert seconds < 1.0
+
+def test_remaining_candidates_follow_the_sitemap():
+    # the theme default is missing; the sitemap lists the store's own page
+    store = Store({**sitemap("/pages/privacy-notice"), "/pages/privacy-notice": TEXT}, delays={"/sitemap.xml": 0.2})
+    policy, _ = run(store, lambda pages: fetch_policy_page(pages, BASE, "privacy", {}))
+    assert policy.url == f"{BASE}/pages/privacy-notice"
+    # candidates the sitemap rules out are never requested
+    assert store.count("/pages/privacy-policy") == store.count("/pages/privacy") == 0
+
+def test_read_sitemap_filters_every_candidate():
+    faq = "<html><body><h3>Do you ship abroad?</h3><p>Yes, to most countries.</p></body></html>"
+    store = Store({**sitemap("/pages/help"), "/pages/help": faq})
+    faqs, _ = run(store, lambda pages: fetch_faqs(pages, BASE, {}), sitemap_first=True)
+    assert [f.question for f in faqs] == ["Do you ship abroad?"]
+    assert store.count("/pages/faq") == store.count("/pages/support") == 0
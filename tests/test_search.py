@@ -0,0 +1,107 @@
+"""Full-text search: ranking, brand scoping and indexes from older schemas."""
+from __future__ import annotations
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.models.db import init_db, make_engine
+from app.models.schemas import FAQ, BrandContext, Policies, Policy, Product, ScrapeMeta
+from app.services import search
+from app.services.insights_service import persist_brand_context
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    with sessionmaker(bind=engine, future=True)() as db:
+        if not search.search_available(db):
+            pytest.skip("SQLite without FTS5")
+    yield engine
+    engine.dispose()
+
+def add(engine, website: str, *titles: str, **fields) -> int:
+    ctx = BrandContext(
+        brand_name=website, website=website,
+        product_catalog=[Product(handle=t.lower().replace(" ", "-"), title=t, tags=["summer"]) for t in titles],
+        scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=1), **fields,
+    )
+    with sessionmaker(bind=engine, future=True)() as db:
+        brand_id = persist_brand_context(db, ctx)["brand_id"]
+        db.commit()
+    return brand_id
+
+def titles(engine, q: str, **kwargs):
+    with sessionmaker(bind=engine, future=True)() as db:
+        return [r["title"] for r in search.search(db, q, kinds=["products"], **kwargs)["results"]]
+
+def test_brand_filter_ranks_within_the_brand(engine):
+    # the other brand's matches outrank this brand's, and would fill a global top-N
+    add(engine, "https://big.test", *[f"Linen Shirt {i}" for i in range(30)])
+    small = add(engine, "https://small.test", "Linen Blend Trousers", "Cotton Tee")
+    assert titles(engine, "linen", brand_id=small, limit=5) == ["Linen Blend Trousers"]
+    assert titles(engine, "linen", limit=5) != ["Linen Blend Trousers"]
+    # the filter never shows up in a snippet, and the brand id is not a search term
+    with sessionmaker(bind=engine, future=True)() as db:
+        hit = search.search(db, "summer", brand_id=small)["results"][0]
+    assert "[summer]" in hit["snippet"]
+    assert not {"Linen Blend Trousers", "Cotton Tee"} & set(titles(engine, str(small)))
+
+def test_brand_filter_applies_to_every_mode(engine):
+    add(engine, "https://big.test", "Linen Shirt", "Wool Scarf")
+    small = add(engine, "https://small.test", "Linen Trousers", "Wool Hat")
+    assert sorted(titles(engine, "linen wool", mode="any", brand_id=small)) == ["Linen Trousers", "Wool Hat"]
+    assert titles(engine, "linen trousers", mode="phrase", brand_id=small) == ["Linen Trousers"]
+    assert titles(engine, "lin*", brand_id=small) == ["Linen Trousers"]
+
+def test_index_without_brand_column_is_rebuilt(engine):
+    small = add(engine, "https://small.test", "Linen Trousers")
+    with engine.begin() as conn:
+        for suffix in ("ai", "ad", "au"):
+            conn.exec_driver_sql(f"DROP TRIGGER products_fts_{suffix}")
+        conn.exec_driver_sql("DROP TABLE products_fts")
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE products_fts USING fts5(title, vendor, product_type, tags, "
+            "content='products', content_rowid='id')"
+        )
+    init_db(engine)
+    with engine.connect() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(products_fts)"))]
+    assert columns[-1] == "brand_id"
+    assert titles(engine, "linen", brand_id=small) == ["Linen Trousers"]
+    add(engine, "https://other.test", "Linen Shirt")
+    assert titles(engine, "linen", brand_id=small) == ["Linen Trousers"]
+
+def test_title_matches_outrank_tag_matches(engine):
+    ctx_tags = BrandContext(
+        brand_name="tags", website="https://tags.test",
+        product_catalog=[Product(handle="scarf", title="Scarf", tags=["linen", "summer"])],
+        scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=1),
+    )
+    with sessionmaker(bind=engine, future=True)() as db:
+        persist_brand_context(db, ctx_tags)
+        db.commit()
+    add(engine, "https://titles.test", "Linen Scarf")
+    assert titles(engine, "linen") == ["Linen Scarf", "Scarf"]
+
+def test_user_input_is_never_query_syntax(engine):
+    add(engine, "https://shop.test", "Linen Shirt")
+    assert titles(engine, 'linen" OR title:* NEAR(') == []
+    assert titles(engine, "LINEN-shirt") == ["Linen Shirt"]
+    with sessionmaker(bind=engine, future=True)() as db, pytest.raises(ValueError):
+        search.search(db, "*** ---")
+
+def test_faqs_and_policies_are_searchable(engine):
+    add(engine, "https://help.test", "Linen Shirt",
+        faqs=[FAQ(question="Do you ship to Canada?", answer="Yes, in 5 days.")],
+        policies=Policies(return_policy=Policy(url="https://help.test/policies/refund-policy",
+                                               content="Returns within 30 days of delivery.")))
+    with sessionmaker(bind=engine, future=True)() as db:
+        hits = search.search(db, "days", kinds=["faqs", "policies"])["results"]
+    assert sorted((h["kind"], h["title"]) for h in hits) == [("faqs", "Do you ship to Canada?"), ("policies", "return")]
+    assert all("[days]" in h["snippet"] for h in hits)
+
+def test_brands_grouped_by_best_hit(engine):
+    many = add(engine, "https://many.test", "Wool Hat", "Wool Socks", "Wool Scarf")
+    best = add(engine, "https://best.test", "Wool")
+    with sessionmaker(bind=engine, future=True)() as db:
+        brands = search.search(db, "wool", by="brand")["brands"]
+    assert [(b["brand_id"], b["hits"]) for b in brands] == [(best, 1), (many, 3)]
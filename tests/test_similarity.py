@@ -0,0 +1,47 @@
+"""Competitor similarity index: website lookups and ranking off the event loop."""
+from __future__ import annotations
+import asyncio
+import threading
+import pytest
+from app.models.schemas import BrandContext, Product, ScrapeMeta
+
+pytest.importorskip("scipy")
+from app.services import competitor  # noqa: E402
+from app.services.similarity import SimilarityIndex, catalog_terms  # noqa: E402
+
+def catalog(*titles: str, product_type: str = "Apparel"):
+    return [Product(title=t, product_type=product_type) for t in titles]
+
+TEES = catalog("organic cotton tee", "linen shirt", "cotton hoodie")
+
+@pytest.fixture
+def index(monkeypatch):
+    idx = SimilarityIndex()
+    idx.set_brand(1, "https://a.test", catalog_terms(TEES))
+    idx.set_brand(2, "https://b.test", catalog_terms(catalog("cotton tee", "linen shirt", "hoodie")))
+    idx.set_brand(3, "https://c.test", catalog_terms(catalog("espresso machine", "coffee grinder", product_type="Kitchen")))
+    idx._rebuild()
+    idx.loaded = True
+    monkeypatch.setattr(competitor, "similarity_index", idx)
+    return idx
+
+def test_brand_id_follows_updates(index):
+    assert index.brand_id("https://b.test") == 2
+    index.set_brand(2, "https://b2.test", catalog_terms(TEES))
+    assert index.brand_id("https://b.test") is None
+    assert index.brand_id("https://b2.test") == 2
+    index.remove_brand(2)
+    assert index.brand_id("https://b2.test") is None
+
+def test_similar_competitors_rank_in_a_worker_thread(index, monkeypatch):
+    threads = []
+    lookup = index.brand_id
+    def brand_id(website):
+        threads.append(threading.current_thread())
+        return lookup(website)
+    monkeypatch.setattr(index, "brand_id", brand_id)
+
+    brand = BrandContext(website="https://a.test", product_catalog=TEES, scrape_meta=ScrapeMeta(requested_at="", success=True))
+    assert asyncio.run(competitor.similar_competitors("https://a.test", brand)) == ["https://b.test"]
+    assert asyncio.run(competitor.similar_competitors("https://a.test")) == ["https://b.test"]
+    assert threads and all(t is not threading.main_thread() for t in threads)
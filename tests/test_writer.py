@@ -0,0 +1,83 @@
+"""Writer thread: batched commits, a savepoint per brand, and draining on stop."""
+from __future__ import annotations
+import asyncio
+import threading
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from app.models import models
+from app.models.db import init_db, make_engine
+from app.models.schemas import BrandContext, Product, ScrapeMeta
+from app.services import insights_service, price_history, similarity, writer
+
+@pytest.fixture
+def persist(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'insights.db'}", write=True)
+    init_db(engine)
+    monkeypatch.setattr(writer, "WriteSessionLocal", sessionmaker(bind=engine, future=True))
+    threads = []
+    monkeypatch.setattr(similarity, "on_persisted", lambda *args: threads.append(threading.current_thread().name))
+    monkeypatch.setattr(price_history, "on_persisted", lambda *args: None)
+    monkeypatch.setattr(price_history.price_history, "flush", lambda: None)
+    yield engine, threads
+    engine.dispose()
+
+def brand(name: str) -> BrandContext:
+    return BrandContext(brand_name=name, website=f"https://{name}.test",
+                        product_catalog=[Product(handle=f"{name}-tee", title=f"{name} Tee")],
+                        scrape_meta=ScrapeMeta(requested_at="", success=True, scraped_at=1))
+
+def stored_brands(engine):
+    with engine.connect() as conn:
+        return sorted(conn.scalars(select(models.Brand.name)))
+
+def test_failed_brand_does_not_sink_the_batch(persist, monkeypatch):
+    engine, threads = persist
+    real = insights_service.persist_brand_context
+
+    def flaky(db, ctx, commit=True):
+        stats = real(db, ctx, commit=commit)
+        if ctx.brand_name == "bad":
+            raise RuntimeError("constraint failed")  # after its rows were written
+        return stats
+
+    monkeypatch.setattr(insights_service, "persist_brand_context", flaky)
+    batch = [writer.WriteJob(brand(name)) for name in ("good", "bad", "fine")]
+    writer.PersistWriter(10, 10)._write_batch(batch)
+
+    assert [job.status for job in batch] == ["done", "failed", "done"]
+    assert batch[1].error == "constraint failed" and batch[1].future.exception() is not None
+    assert batch[0].future.result()["inserted"] == 1
+    assert stored_brands(engine) == ["fine", "good"]
+    with engine.connect() as conn:
+        assert sorted(conn.scalars(select(models.Product.handle))) == ["fine-tee", "good-tee"]
+    assert all(job.ctx is None for job in batch)
+
+def test_jobs_are_written_on_the_writer_thread(persist):
+    engine, threads = persist
+    persist_writer = writer.PersistWriter(10, 10)
+
+    async def run():
+        jobs = [await persist_writer.submit(brand(name)) for name in ("one", "two", "three")]
+        return jobs, await asyncio.gather(*(job.wait() for job in jobs))
+
+    try:
+        jobs, stats = asyncio.run(run())
+    finally:
+        persist_writer.stop()
+    assert [s["inserted"] for s in stats] == [1, 1, 1]
+    assert persist_writer.get(jobs[0].id).describe()["status"] == "done"
+    assert set(threads) == {"persist-writer"}
+    assert stored_brands(engine) == ["one", "three", "two"]
+
+def test_stop_drains_queued_writes(persist):
+    engine, _ = persist
+    persist_writer = writer.PersistWriter(10, 2)
+
+    async def submit():
+        return [await persist_writer.submit(brand(f"b{i}")) for i in range(5)]
+
+    jobs = asyncio.run(submit())
+    persist_writer.stop()
+    assert [job.status for job in jobs] == ["done"] * 5
+    assert len(stored_brands(engine)) == 5